@@ -0,0 +1,119 @@
+from shared.constants.json import JSON as Keys
+
+"""
+Stats read from each skater in a box score's 'playerByGameStats' forwards and
+defense lists, as (key, default) pairs.  The default is stored when the key
+is missing.  Rows use the same keys as the skater_stats columns.  Values are
+stored as the API sent them, neither converted nor checked against the
+column types; SQLite's column affinity applies when they are written.
+"""
+SkaterFields = (
+    (Keys.player_id, 0),
+    (Keys.position, None),
+    (Keys.goals, 0),
+    (Keys.assists, 0),
+    (Keys.points, 0),
+    (Keys.plus_minus, 0),
+    (Keys.pim, 0),
+    (Keys.hits, 0),
+    (Keys.power_play_goals, 0),
+    (Keys.sog, 0),
+    (Keys.faceoff_winning_pctg, 0),
+    (Keys.toi, 0),
+    (Keys.blocked_shots, 0),
+    (Keys.shifts, 0),
+    (Keys.giveaways, 0),
+    (Keys.takeaways, 0)
+)
+
+"""
+Stats read from each goalie in a box score's 'playerByGameStats' goalies
+list, like SkaterFields.
+"""
+GoalieFields = (
+    (Keys.player_id, 0),
+    (Keys.even_strength_shots_against, 0),
+    (Keys.power_play_shots_against, 0),
+    (Keys.shorthanded_shots_against, 0),
+    (Keys.save_shots_against, 0),
+    (Keys.save_pctg, 0),
+    (Keys.even_strength_goals_against, 0),
+    (Keys.power_play_goals_against, 0),
+    (Keys.shorthanded_goals_against, 0),
+    (Keys.pim, 0),
+    (Keys.goals_against, 0),
+    (Keys.toi, 0),
+    (Keys.starter, 0),
+    (Keys.decision, 0),
+    (Keys.shots_against, 0),
+    (Keys.saves, 0)
+)
+
+"""
+Turns the player entries of a box score into stat rows.
+
+Each row is built from the field list with one dict.get per field, the
+default already in place.  Fields of the payload that are not in the list,
+like names and sweater numbers, are never touched.
+"""
+class RowExtractor:
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+
+    def extract(self, players, game_id, team_id):
+        fields = self.fields
+        return [
+            {
+                Keys.game_id: game_id,
+                Keys.team_id: team_id,
+                **{key: get(key, default) for key, default in fields}
+            }
+            for get in (player.get for player in players)
+        ]
+
+SkaterExtractor = RowExtractor(SkaterFields)
+GoalieExtractor = RowExtractor(GoalieFields)
+
+"""
+Decodes the parts of a box score that are stored: the game row and a stat
+row for every skater and goalie.
+"""
+class BoxScoreDecoder:
+
+    """
+    The game, skater and goalie rows of a box score, or None if the rosters
+    have not been published yet.
+    """
+    @staticmethod
+    def decode(box_score):
+        player_stats = box_score.get(Keys.player_by_game_stats)
+        if player_stats is None:
+            return None
+
+        game_id = box_score.get(Keys.id, 0)
+        home_team = box_score.get(Keys.home_team, {})
+        away_team = box_score.get(Keys.away_team, {})
+        home_team_id = home_team.get(Keys.id, 0)
+        away_team_id = away_team.get(Keys.id, 0)
+        home_players = player_stats[Keys.home_team]
+        away_players = player_stats[Keys.away_team]
+
+        game_row = {
+            Keys.game_id: game_id,
+            Keys.season: box_score[Keys.season],
+            Keys.game_type: box_score[Keys.game_type],
+            Keys.game_state: box_score[Keys.game_state],
+            Keys.game_date: box_score.get(Keys.game_date),
+            Keys.home_team_id: home_team_id,
+            Keys.away_team_id: away_team_id,
+            Keys.home_score: home_team.get(Keys.score, 0),
+            Keys.away_score: away_team.get(Keys.score, 0)
+        }
+        skater_rows = []
+        goalie_rows = []
+        for players, team_id in [(home_players, home_team_id), (away_players, away_team_id)]:
+            skater_rows += SkaterExtractor.extract(players[Keys.forwards], game_id, team_id)
+            skater_rows += SkaterExtractor.extract(players[Keys.defense], game_id, team_id)
+            goalie_rows += GoalieExtractor.extract(players[Keys.goalies], game_id, team_id)
+        return game_row, skater_rows, goalie_rows
@@ -1,22 +1,42 @@
 import json
-from datetime import datetime, timezone
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import List
 
 from ansimarkup import ansiprint as print
 
 import shared.execution_context
-from model.game_state import GameState, GameStatesForDataset
-from model.game_type import GameType, SupportedGameTypes
+from builder.box_score_decoder import BoxScoreDecoder
+from builder.checkpoint import BuildStage, Checkpoint
+from builder.game_plan import GamePlan
+from builder.pipeline import Pipeline, Stage
+from model.game_state import GameState
 from model.seasons import Seasons
-from model.team_map import TeamMap
 from shared.constants.database import Database as DB
 from shared.constants.json import JSON as Keys
 from shared.logging_config import LoggingConfig
+from shared.payload_archive import BoxScoreKind, PlayerKind
+from shared.repository import Repository, SchemaOutOfDateError
 from shared.utility import Utility as utl
 
 logger = LoggingConfig.get_logger(__name__)
 execution_context = shared.execution_context.ExecutionContext()
 
+"""
+Tables written along with every game, see Repository.add_game.
+"""
+GameTables = [
+    DB.games_table_name,
+    DB.skater_stats_table_name,
+    DB.goalie_stats_table_name,
+    DB.player_index_table_name
+]
+
 class Builder:
     
     @staticmethod
@@ -25,296 +45,812 @@ class Builder:
         all_seasons: bool = False
     ):
         if all_seasons:
-            Builder.build_seasons()
+            seasons = [season.value for season in Seasons.items()]
         elif seasons is not None:
-            Builder.build_seasons(seasons)
+            # Formatting a Seasons member gives 'Seasons._20222023' rather
+            # than the season, so hand the values on.
+            seasons = [season.value for season in seasons]
         else:
             logger.error("Invalid season specification, cannot build data set.")
+            return
+
+        if execution_context.processes > 1:
+            Builder.build_sharded(seasons)
+        else:
+            Builder.build_seasons(seasons)
         logger.info("Call to build_games is complete.")
     
+    """
+    Report on the data set from the counters kept in the meta table, without
+    scanning any table.  With 'as_json' the report is written to stdout as
+    JSON for monitoring instead of as tables.
+    """
     @staticmethod
-    def report():
+    def report(as_json: bool = False):
         logger.info("Start dataset report.")
-        data = utl.get_db_connections(
-            DB.players_table_name,
-            DB.skater_stats_table_name,
-            DB.goalie_stats_table_name,
-            DB.games_table_name,
-            DB.meta_table_name,
-            read_only=True
+        try:
+            repository = Repository(read_only=True)
+        except SchemaOutOfDateError as e:
+            Builder.print_schema_error(e)
+            return
+
+        try:
+            report = Builder.get_report(repository)
+        finally:
+            repository.close()
+
+        if as_json:
+            sys.stdout.write(json.dumps(report, indent=4) + "\n")
+            return
+
+        tables_table = [["Table", "Rows", "Data (MB)", "Last Updated"]]
+        for table_name, stats in report["tables"].items():
+            tables_table.append([
+                table_name,
+                str(stats["rows"]),
+                f"{stats['dataBytes'] / 1024 / 1024:.1f}",
+                str(stats["lastUpdated"])
+            ])
+        seasons_table = [["Season", "Games"]]
+        seasons_table.extend(
+            [season, str(games)] for season, games in report["seasons"].items()
         )
-        games_db = data[DB.games_table_name]
-        players_db = data[DB.players_table_name]
-        skaters_db = data[DB.skater_stats_table_name]
-        goalies_db = data[DB.goalie_stats_table_name]
-        meta_db = data[DB.meta_table_name]
-
-        # Summarize the games table
-        games_summary_table = []
-        games_summary_table.append(["Num. Rows", str(len(games_db))])
-        games_summary_table.append([
-            "Last Updated",
-            str(meta_db[DB.games_table_name][Keys.last_update])
-        ])
-
-        # Summarize the players table
-        players_summary_table = []
-        players_summary_table.append(["Num. Rows", str(len(players_db))])
-        players_summary_table.append([
-            "Last Updated",
-            str(meta_db[DB.players_table_name][Keys.last_update])
-        ])
-
-        # Summarize the skaters table
-        skaters_summary_table = []
-        skaters_summary_table.append(["Num. Rows", str(len(skaters_db))])
-        skaters_summary_table.append([
-            "Last Updated",
-            str(meta_db[DB.skater_stats_table_name][Keys.last_update])
-        ])
-
-        # Summarize the goalies table
-        goalies_summary_table = []
-        goalies_summary_table.append(["Num. Rows", str(len(goalies_db))])
-        goalies_summary_table.append([
-            "Last Updated",
-            str(meta_db[DB.goalie_stats_table_name][Keys.last_update])
-        ])
-        
+        history_table = [["Finished", "Seasons", "Planned", "Failed", "Games Added", "Stat Lines Added", "Games/s"]]
+        for entry in report[Keys.ingest_history][-10:]:
+            history_table.append([
+                entry["finished"][:19],
+                ", ".join(str(season) for season in entry[Keys.seasons]),
+                str(entry["gamesPlanned"]),
+                str(entry["gamesFailed"]),
+                str(entry["gamesAdded"]),
+                str(entry["skaterRowsAdded"] + entry["goalieRowsAdded"]),
+                f"{entry['gamesPerSecond']:.1f}"
+            ])
+
         # Print all the tables
-        print("\n<b><green>GAMES:</green></b>")
-        print("<blue>The total number of historical games processed.</blue>")
-        utl.print_table(games_summary_table)
-        print("\n<b><green>PLAYERS:</green></b>")
-        print("<blue>The number of unique players encountered during processing.</blue>")
-        utl.print_table(players_summary_table)
-        print("\n<b><green>SKATERS:</green></b>")
-        print("<blue>The number of skater stat records.  This should be appx. <num_games> * 36</blue>")
-        utl.print_table(skaters_summary_table)
-        print("\n<b><green>GOALIES:</green></b>")
-        print("<blue>The number of goalie stat records.  This should be appx. <num_games> * 4</blue>")
-        utl.print_table(goalies_summary_table)
+        print("\n<b><green>TABLES:</green></b>")
+        print(
+            "<blue>Players are the unique players with a stored profile, the player index "
+            "holds every player encountered during processing. Expect appx. "
+            "<num_games> * 36 skater and <num_games> * 4 goalie stat records.</blue>"
+        )
+        utl.print_table(tables_table, hasHeader=True)
+        print(
+            f"<blue>Database file: {report['database']['fileBytes'] / 1024 / 1024:.1f} MB "
+            f"({report['database']['name']})</blue>"
+        )
+        print("\n<b><green>GAMES BY SEASON:</green></b>")
+        utl.print_table(seasons_table, hasHeader=True)
+        print("\n<b><green>INGEST HISTORY:</green></b>")
+        print("<blue>The most recent builds, newest last.</blue>")
+        utl.print_table(history_table, hasHeader=True)
         print("\n")
-        print(f"<magenta>Note: Current time UTC is: {datetime.now(timezone.utc)}</magenta>")
+        print(f"<magenta>Note: Current time UTC is: {report['generated']}</magenta>")
         print("\n")
 
+    """
+    The data set report as a dict that can be written as JSON.
+    """
+    @staticmethod
+    def get_report(repository):
+        tables, seasons = repository.get_counters()
+        for table_name, stats in tables.items():
+            last_update = repository.get_last_update(table_name)
+            stats["lastUpdated"] = last_update.isoformat() if last_update else None
+        database_file = Path(repository.db_name)
+        file_bytes = sum(
+            path.stat().st_size
+            for path in [database_file, Path(f"{repository.db_name}-wal")]
+            if path.exists()
+        )
+        return {
+            "generated": datetime.now(timezone.utc).isoformat(),
+            "database": {"name": str(database_file.absolute()), "fileBytes": file_bytes},
+            "tables": tables,
+            "seasons": {str(season): games for season, games in seasons.items()},
+            Keys.ingest_history: repository.get_ingest_history()
+        }
+
     @staticmethod
     def build_seasons(
         seasons: List[str] = [x.value for  x in Seasons.items()],
+        resume: bool = False
     ):
         logger.info("Start building seasons.")
-        data = utl.get_db_connections(
-            DB.players_table_name,
-            DB.skater_stats_table_name,
-            DB.goalie_stats_table_name,
-            DB.games_table_name,
-            DB.meta_table_name,
-            update_db=execution_context.allow_update
-        )
-        
-        for season in seasons:
-            logger.info(f"Start of processing for season '{season}'.")
-            for team in TeamMap:
-                logger.info(f"Start processing for team '{team}' in season '{season}'.")
-                try:
-                    games_raw = execution_context.client.schedule.team_season_schedule(team, season)[Keys.games]
-                    logger.info(f"Found '{len(games_raw)}' games for team '{team}' in season '{season}'.")
-                    Builder.process_team_games(games_raw, data)
-                    logger.info(f"Completed processing games for team. Team:'{team}'.")
-                except Exception as e:
-                    print("\033[31mException occured. Check logs.\033[0m")
-                    logger.exception(
-                        f"Exception processing team_season_schedule query. "
-                        f"Games: '{json.dumps(games_raw, indent=4)}',"
-                        f"Exception: '{str(e)}'.",
-                        stack_info=True)
-
-        Builder.process_players(Builder.get_all_playerids(data), data)
-    
+        try:
+            repository = Repository()
+        except SchemaOutOfDateError as e:
+            Builder.print_schema_error(e)
+            return
+
+        # Anything not yet committed when the build is interrupted is rolled
+        # back, the next 'build --resume' picks up from the last commit.
+        try:
+            checkpoint = Checkpoint.load(repository) if resume else None
+            if checkpoint is not None:
+                print(
+                    f"<blue>Resuming build of seasons {checkpoint.seasons} started "
+                    f"{checkpoint.started}, stage '{checkpoint.stage.value}'.</blue>"
+                )
+                plan = GamePlan.load(checkpoint, repository)
+            else:
+                if resume and seasons is None:
+                    print("<blue>No interrupted build found, nothing to resume.</blue>")
+                    return
+                if resume:
+                    print("<blue>No interrupted build found, starting a new build.</blue>")
+                if execution_context.allow_update:
+                    repository.clear()
+                    repository.commit()
+                checkpoint = Checkpoint(seasons, execution_context.incremental)
+                with execution_context.profiler.stage("schedule fetch"):
+                    plan = GamePlan.create(seasons, repository, checkpoint.incremental)
+                checkpoint.full_seasons = plan.full_seasons
+                checkpoint.failed_seasons = plan.failed_seasons
+                checkpoint.watermark_seasons = plan.watermark_seasons
+                plan.save(repository)
+                checkpoint.save(repository)
+                repository.commit()
+            plan.report()
+
+            if checkpoint.stage == BuildStage.Games:
+                started = time.perf_counter()
+                rows_before, _ = repository.get_counters()
+                failed_games = Builder.process_games(plan.games.values(), repository)
+                Builder.record_progress(plan, failed_games, repository)
+                Builder.record_ingest(
+                    repository, plan.seasons, started, rows_before,
+                    len(plan.games), len(failed_games)
+                )
+                checkpoint.stage = BuildStage.Players
+                checkpoint.save(repository)
+                repository.commit()
+
+            Builder.process_players(repository.get_player_ids(), repository, checkpoint.started)
+
+            Checkpoint.clear(repository)
+            repository.commit()
+            execution_context.rate_limiter.report()
+            logger.info("Build complete.")
+        finally:
+            repository.close()
+
+    """
+    Build each season in its own worker process, writing to its own shard
+    database, and merge the shards into the main database as they finish.
+    Workers plan against the main database, so games merged by an earlier
+    run are not fetched again and a season whose worker failed can be rebuilt
+    on its own.  Player profiles are refreshed once all shards are merged.
+    """
     @staticmethod
-    def process_team_games(games_raw, data):
-        games_db = data[DB.games_table_name]
-        meta_db = data[DB.meta_table_name]
+    def build_sharded(seasons):
+        logger.info(f"Start sharded build. Seasons: '{seasons}'.")
+        try:
+            repository = Repository()
+        except SchemaOutOfDateError as e:
+            Builder.print_schema_error(e)
+            return
 
         try:
-            for game in games_raw:
-                try:
-                    if game[Keys.id] in games_db:
-                        logger.info(
-                            f"Skipping game '{game[Keys.id]}' which was already "
-                            "processed."
-                        )
-                        continue
-                    if (GameType(utl.json_value_or_default(game, Keys.game_type, default=GameType.Preseason))
-                        not in SupportedGameTypes):
-                        logger.info(
-                            f"Skipping game '{game[Keys.id]}' which is not a "
-                            f"supported game type. Type: '{game[Keys.game_type]}'."
+            if execution_context.allow_update:
+                repository.clear()
+                repository.commit()
+
+            settings = {
+                "incremental": execution_context.incremental,
+                "concurrency": execution_context.concurrency,
+                "batch_size": execution_context.batch_size,
+                "use_cache": execution_context.use_cache,
+                "api_base_url": execution_context.api_base_url,
+                "max_rps": execution_context.max_rps,
+                "max_retries": execution_context.max_retries,
+                "use_archive": execution_context.use_archive,
+                "profile": execution_context.profile
+            }
+            shards_table = []
+            started = time.perf_counter()
+            rows_before, _ = repository.get_counters()
+            total_planned = 0
+            total_failed = 0
+            # Spawned rather than forked, so workers don't inherit this
+            # process's open database connections.
+            with ProcessPoolExecutor(
+                max_workers=min(execution_context.processes, len(seasons)),
+                mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                futures = {
+                    executor.submit(Builder.build_shard, season, settings): season
+                    for season in seasons
+                }
+                for future in as_completed(futures):
+                    season = futures[future]
+                    shard_name = utl.get_shard_name(season)
+                    try:
+                        plan, planned_games, failed_games, profile = future.result()
+                    except Exception as e:
+                        print("\033[31mException occured. Check logs.\033[0m")
+                        logger.exception(
+                            f"Exception building shard. Season: '{season}', "
+                            f"Exception: '{str(e)}'.",
+                            stack_info=True
                         )
+                        shards_table.append([season, "failed", "-", "-"])
                         continue
-                    if (GameState(utl.json_value_or_default(game, Keys.game_state, default=GameState.Future))
-                        not in GameStatesForDataset):
-                        logger.info(
-                            f"Skipping game '{game[Keys.id]}' which is not a "
-                            f"supported game state. State: '{game[Keys.game_state]}'."
-                        )
-                    # game ID is the primary key for the games DB
-                    games_db[game[Keys.id]] = {
-                        Keys.season: game[Keys.season],
-                        Keys.game_type: game[Keys.game_type],
-                        Keys.game_state: game[Keys.game_state]
-                    }
-                except Exception as e:
-                    print("\033[31mException occured. Check logs.\033[0m")
-                    logger.exception(
-                        f"Exception adding game data to database. Exception: "
-                        f"'{str(e)}'.",
-                        stack_info=True
-                    )
 
-                try:
-                    box_score = execution_context.client.game_center.boxscore(game[Keys.id])
-                    Builder.process_box_score(box_score, data)
-                except Exception as e:
-                    print("\033[31mException occured. Check logs.\033[0m")
-                    logger.exception(
-                        f"Exception processing box_score query. Exception: "
-                        f"'{str(e)}', box_score: '{json.dumps(box_score, indent=4)}'.",
-                        stack_info=True
+                    # Whatever the shard committed is complete, keep it.
+                    execution_context.profiler.merge(profile)
+                    with execution_context.profiler.stage("shard merge", planned_games):
+                        repository.merge(shard_name)
+                    Builder.record_progress(plan, failed_games, repository)
+                    repository.commit()
+                    total_planned += planned_games
+                    total_failed += len(failed_games)
+                    Path(shard_name).unlink(missing_ok=True)
+                    shards_table.append([
+                        season,
+                        "merged",
+                        str(planned_games),
+                        str(len(failed_games))
+                    ])
+                    logger.info(
+                        f"Merged shard. Season: '{season}', "
+                        f"Games: '{planned_games}', Failed: '{len(failed_games)}'."
                     )
 
-            meta_db[DB.games_table_name] = {
-                Keys.last_update: datetime.now(timezone.utc)
-            }
-        except Exception as e:
-            print("\033[31mException occured. Check logs.\033[0m")
-            logger.exception(
-                f"Exception processing team_season_schedule query. Exception: "
-                f"'{str(e)}', games: '{json.dumps(games_raw, indent=4)}', "
-                f"box_score: '{json.dumps(box_score, indent=4)}'.", stack_info=True
+            print("\n<b><green>SHARDS:</green></b>")
+            utl.print_table([["Season", "Status", "Games", "Failed"]] + shards_table, hasHeader=True)
+            print("\n")
+            Builder.record_ingest(
+                repository, seasons, started, rows_before, total_planned, total_failed
             )
+            Builder.commit(repository, *GameTables)
+
+            Builder.process_players(repository.get_player_ids(), repository)
+            execution_context.rate_limiter.report()
+        finally:
+            repository.close()
+
+    """
+    Worker process of a sharded build: plan one season against the main
+    database and write its games to the season's shard database.  Returns the
+    plan without its games, the number of games planned, the games that
+    failed and the worker's profiler snapshot.
+    """
+    @staticmethod
+    def build_shard(season, settings):
+        for name, value in settings.items():
+            setattr(execution_context, name, value)
+
+        main_repository = Repository(read_only=True)
+        shard_repository = Repository(utl.get_shard_name(season))
+        try:
+            with execution_context.profiler.stage("schedule fetch"):
+                plan = GamePlan.create([season], main_repository, execution_context.incremental)
+            failed_games = Builder.process_games(
+                plan.games.values(), shard_repository, report=False
+            )
+        finally:
+            shard_repository.close()
+            main_repository.close()
+        logger.info(
+            f"Shard API client stats. Season: '{season}', "
+            f"Stats: '{execution_context.rate_limiter.stats()}'."
+        )
+
+        planned_games = len(plan.games)
+        plan.games = {}
+        return plan, planned_games, failed_games, execution_context.profiler.snapshot()
 
     @staticmethod
-    def process_box_score(box_score, data):
-        logger.info("Processing players.")
-        
-        if Keys.player_by_game_stats not in box_score:
-            logger.warning("Roster not published yet")
-            return None
-        
-        home_team = utl.json_value_or_default(box_score, Keys.player_by_game_stats, Keys.home_team)
-        away_team = utl.json_value_or_default(box_score, Keys.player_by_game_stats, Keys.away_team)
+    def print_schema_error(e):
+        logger.error(f"Database schema is out of date. Exception: '{str(e)}'.")
+        print(
+            f"<red>{str(e)} Run the 'migrate' command to upgrade the "
+            f"database.</red>"
+        )
+    
+    """
+    Resume the build left unfinished by an interrupted run, or start a new one
+    for the given seasons if there is nothing to resume.
+    """
+    @staticmethod
+    def resume(seasons, all_seasons: bool = False):
+        if all_seasons:
+            Builder.build_seasons(resume=True)
+        else:
+            Builder.build_seasons(
+                [season.value for season in seasons] if seasons is not None else None,
+                resume=True
+            )
 
-        Builder.process_skaters(home_team[Keys.forwards] + home_team[Keys.defense], data, utl.json_value_or_default(box_score, Keys.id))
-        Builder.process_goalies(home_team[Keys.goalies], data, utl.json_value_or_default(box_score, Keys.id))
-        Builder.process_skaters(away_team[Keys.forwards] + away_team[Keys.defense], data, utl.json_value_or_default(box_score, Keys.id))
-        Builder.process_goalies(away_team[Keys.goalies], data, utl.json_value_or_default(box_score, Keys.id))
+    """
+    Derive the data set again.  With 'from_archive' it is derived from the
+    payload archive without downloading anything, otherwise every season in
+    the data set is cleared and built again from the API.
+    """
+    @staticmethod
+    def rebuild(from_archive: bool = False):
+        if from_archive:
+            Builder.rebuild_from_archive()
+            return
 
-        logger.info("Player stats by game processed.")
+        try:
+            repository = Repository()
+        except SchemaOutOfDateError as e:
+            Builder.print_schema_error(e)
+            return
+        try:
+            _, seasons = repository.get_counters()
+        finally:
+            repository.close()
+        if not seasons:
+            print("<blue>The data set is empty, nothing to rebuild.</blue>")
+            return
+
+        execution_context.allow_update = True
+        seasons = [str(season) for season in seasons]
+        if execution_context.processes > 1:
+            Builder.build_sharded(seasons)
+        else:
+            Builder.build_seasons(seasons)
 
+    """
+    Clear the data set and derive it again from the archived box scores and
+    player profiles, see PayloadArchive.  Box scores go through the same
+    parse and write stages as a build's.  Seasons marked complete and games
+    waiting to be retried are kept.  Games whose archived box score can't be
+    read or parsed are added to the games to retry, so the next incremental
+    build fetches them from the API.  An interrupted rebuild leaves part of
+    the data set, run it again to finish it.
+    """
     @staticmethod
-    def process_skaters(skaters, data, game_id):
-        skater_stats_db = data[DB.skater_stats_table_name]
-        meta_db = data[DB.meta_table_name]
-
-        for skater in skaters:
-            skater_stats_db[len(skater_stats_db)+1] = {
-                Keys.game_id: game_id,
-                Keys.player_id: utl.json_value_or_default(skater, Keys.player_id),
-                Keys.goals: utl.json_value_or_default(skater, Keys.goals),
-                Keys.assists: utl.json_value_or_default(skater, Keys.assists),
-                Keys.points: utl.json_value_or_default(skater, Keys.points),
-                Keys.plus_minus: utl.json_value_or_default(skater, Keys.plus_minus),
-                Keys.pim: utl.json_value_or_default(skater, Keys.pim),
-                Keys.hits: utl.json_value_or_default(skater, Keys.hits),
-                Keys.power_play_goals: utl.json_value_or_default(skater, Keys.power_play_goals),
-                Keys.sog : utl.json_value_or_default(skater, Keys.sog),
-                Keys.faceoff_winning_pctg: utl.json_value_or_default(skater, Keys.faceoff_winning_pctg),
-                Keys.toi: utl.json_value_or_default(skater, Keys.toi),
-                Keys.blocked_shots: utl.json_value_or_default(skater, Keys.blocked_shots),
-                Keys.shifts: utl.json_value_or_default(skater, Keys.shifts),
-                Keys.giveaways: utl.json_value_or_default(skater, Keys.giveaways),
-                Keys.takeaways: utl.json_value_or_default(skater, Keys.takeaways)
-            }
+    def rebuild_from_archive():
+        logger.info("Start rebuild from payload archive.")
+        try:
+            repository = Repository()
+        except SchemaOutOfDateError as e:
+            Builder.print_schema_error(e)
+            return
 
-        meta_db[DB.skater_stats_table_name] = {
-            Keys.last_update: datetime.now(timezone.utc)
-        }
+        archive = execution_context.payload_archive
+        try:
+            # Only box scores of finished games are archived.  The game type
+            # is the 5th and 6th digits of the game ID.
+            games = [
+                {
+                    Keys.id: game_id,
+                    Keys.season: season,
+                    Keys.game_type: game_id // 10000 % 100,
+                    Keys.game_state: GameState.Official.value
+                }
+                for game_id, season, _ in archive.get_entries(BoxScoreKind)
+            ]
+            if not games:
+                print("<blue>The payload archive is empty, nothing to rebuild.</blue>")
+                return
+
+            complete_seasons = repository.get_complete_seasons()
+            retry_games = repository.get_meta(Keys.retry_games, [])
+            repository.clear()
+            for season in complete_seasons:
+                repository.set_season_complete(season)
+            repository.set_meta(Keys.retry_games, retry_games)
+            repository.commit()
+
+            started = time.perf_counter()
+            rows_before, _ = repository.get_counters()
+            failed_games = Builder.process_games(
+                games, repository, fetch=Builder.fetch_archived_box_score
+            )
+            repository.set_meta(
+                Keys.retry_games,
+                retry_games + [GamePlan.get_entry(game) for game in failed_games]
+            )
+            Builder.record_ingest(
+                repository,
+                {game[Keys.season] for game in games if game[Keys.season] is not None},
+                started,
+                rows_before,
+                len(games),
+                len(failed_games)
+            )
+            repository.commit()
 
+            Builder.rebuild_players(archive, repository)
+            logger.info(
+                f"Rebuild from payload archive complete. Games: '{len(games)}', "
+                f"Failed: '{len(failed_games)}'."
+            )
+        finally:
+            repository.close()
+
+    """
+    Store every archived player profile, recording it as refreshed when it
+    was archived.
+    """
     @staticmethod
-    def process_goalies(goalies, data, game_id):
-        goalie_stats_db = data[DB.goalie_stats_table_name]
-        meta_db = data[DB.meta_table_name]
-
-        for goalie in goalies:
-            goalie_stats_db[len(goalie_stats_db)+1] = {
-                Keys.game_id: game_id,
-                Keys.player_id: utl.json_value_or_default(goalie, Keys.player_id),
-                Keys.even_strength_shots_against: utl.json_value_or_default(goalie, Keys.even_strength_shots_against),
-                Keys.power_play_shots_against: utl.json_value_or_default(goalie, Keys.power_play_shots_against),
-                Keys.shorthanded_shots_against: utl.json_value_or_default(goalie, Keys.power_play_shots_against),
-                Keys.save_shots_against: utl.json_value_or_default(goalie, Keys.save_shots_against),
-                Keys.save_pctg: utl.json_value_or_default(goalie, Keys.save_pctg),
-                Keys.even_strength_goals_against: utl.json_value_or_default(goalie, Keys.even_strength_goals_against),
-                Keys.power_play_goals_against: utl.json_value_or_default(goalie, Keys.power_play_goals_against),
-                Keys.shorthanded_goals_against: utl.json_value_or_default(goalie, Keys.shorthanded_goals_against),
-                Keys.pim: utl.json_value_or_default(goalie, Keys.pim),
-                Keys.goals_against: utl.json_value_or_default(goalie, Keys.goals_against),
-                Keys.toi: utl.json_value_or_default(goalie, Keys.toi),
-                Keys.starter: utl.json_value_or_default(goalie, Keys.starter),
-                Keys.decision: utl.json_value_or_default(goalie, Keys.decision),
-                Keys.shots_against: utl.json_value_or_default(goalie, Keys.shots_against),
-                Keys.saves: utl.json_value_or_default(goalie, Keys.saves)
-            }
+    def rebuild_players(archive, repository):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        entries = archive.get_entries(PlayerKind)
+        pending_players = 0
+        for player_id, _, archived in entries:
+            is_active = Builder.store_player(player_id, archive.get_player(player_id), repository)
+            repository.set_player_refreshed(
+                player_id, datetime.fromisoformat(archived), is_active
+            )
+            pending_players += 1
+            if pending_players >= execution_context.batch_size:
+                Builder.commit(repository, DB.players_table_name)
+                pending_players = 0
+        Builder.commit(repository, DB.players_table_name)
+        execution_context.profiler.record(
+            "player rebuild",
+            time.perf_counter() - start,
+            time.process_time() - cpu_start,
+            len(entries)
+        )
 
-        meta_db[DB.goalie_stats_table_name] = {
-            Keys.last_update: datetime.now(timezone.utc)
+    """
+    Remember the games that failed so the next incremental build retries them,
+    and mark seasons that ended before this build as complete if every
+    schedule and game in them was processed.
+    """
+    @staticmethod
+    def record_progress(plan, failed_games, repository):
+        retry_games = [
+            game for game in repository.get_meta(Keys.retry_games, [])
+            if game.get(Keys.season) not in plan.seasons
+        ]
+        retry_games.extend(GamePlan.get_entry(game) for game in failed_games)
+        repository.set_meta(Keys.retry_games, retry_games)
+
+        failed_seasons = plan.failed_seasons | {
+            game.get(Keys.season) for game in failed_games
         }
-    
+        # A season planned from its watermarks after it ended was walked to
+        # its last game, so it is as complete as one built in full.
+        for season in (plan.full_seasons | plan.watermark_seasons) - failed_seasons:
+            if GamePlan.is_season_over(season):
+                logger.info(f"Marking season '{season}' as complete.")
+                repository.set_season_complete(season)
+
+    """
+    Append an entry to the ingest history kept in the meta table: how many
+    games were planned, failed and added, how many stat lines were added and
+    how fast.  'rows_before' are the counters read before the games were
+    written.  Does not commit.
+    """
     @staticmethod
-    def get_all_playerids(data):
-        skaters_db = data[DB.skater_stats_table_name]
-        goalies_db = data[DB.goalie_stats_table_name]
-        player_ids = set()
-        for record in skaters_db:
-            player_ids.add(skaters_db[record][Keys.player_id])
-        for record in goalies_db:
-            player_ids.add(goalies_db[record][Keys.player_id])
-        return player_ids
+    def record_ingest(repository, seasons, started, rows_before, planned_games, failed_games):
+        seconds = time.perf_counter() - started
+        rows_after, _ = repository.get_counters()
+        added = {
+            table_name: rows_after[table_name]["rows"] - rows_before[table_name]["rows"]
+            for table_name in [
+                DB.games_table_name,
+                DB.skater_stats_table_name,
+                DB.goalie_stats_table_name
+            ]
+        }
+        entry = {
+            "finished": datetime.now(timezone.utc).isoformat(),
+            Keys.seasons: sorted(int(season) for season in seasons),
+            "gamesPlanned": planned_games,
+            "gamesFailed": failed_games,
+            "gamesAdded": added[DB.games_table_name],
+            "skaterRowsAdded": added[DB.skater_stats_table_name],
+            "goalieRowsAdded": added[DB.goalie_stats_table_name],
+            "seconds": round(seconds, 3),
+            "gamesPerSecond": round((planned_games - failed_games) / seconds, 1) if seconds else 0.0
+        }
+        repository.add_ingest_record(entry)
+        logger.info(f"Recorded ingest. Entry: '{entry}'.")
+
+    """
+    Fetch, parse and store the given games.  Fetching, parsing and writing
+    run as stages of a Pipeline, so box scores are requested while earlier
+    ones are parsed and written, and memory use does not grow with the number
+    of games.  Each game's games, skater and goalie rows are written together
+    and committed in batches of 'batch_size' games, so an interrupted build
+    never leaves a game partially written.  Games that fail to fetch or parse
+    are not written and are returned so they can be picked up again by the
+    next build.  Box scores are fetched from the API unless another 'fetch'
+    is given, called with a game ID.
+    """
+    @staticmethod
+    def process_games(games, repository, report=True, fetch=None):
+        fetch = fetch if fetch is not None else Builder.fetch_box_score
+        progress = {"pending": 0, "games": 0, "rows": 0}
+        failed_games = []
+
+        def write(item):
+            game, rows = item
+            if rows is None:
+                failed_games.append(game)
+                return
+            game_row, skater_rows, goalie_rows = rows
+            repository.add_game(game_row, skater_rows, goalie_rows)
+            progress["pending"] += 1
+            progress["games"] += 1
+            progress["rows"] += 1 + len(skater_rows) + len(goalie_rows)
+            if progress["pending"] >= execution_context.batch_size:
+                Builder.commit(repository, *GameTables)
+                progress["pending"] = 0
+
+        start = time.perf_counter()
+        pipeline = Pipeline(
+            [
+                Stage(
+                    "fetch",
+                    lambda game: (game, fetch(game[Keys.id])),
+                    workers=execution_context.concurrency
+                ),
+                Stage("parse", Builder.parse_box_score)
+            ],
+            Stage("write", write),
+            queue_size=execution_context.concurrency * 2
+        )
+        pipeline.run(games)
+        Builder.commit(repository, *GameTables)
+        if report:
+            pipeline.report()
+        for stage, name in zip(
+            pipeline.stages + [pipeline.sink],
+            ["box score fetch", "box score parse", "DB write"]
+        ):
+            execution_context.profiler.record(
+                name, stage.wall_seconds, stage.cpu_seconds, stage.items
+            )
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Games processed. Games: '{progress['games']}', Rows: '{progress['rows']}', "
+            f"Seconds: '{elapsed:.2f}', "
+            f"Rows per second: '{progress['rows'] / elapsed if elapsed else 0:.0f}'."
+        )
+        return failed_games
 
+    """
+    Pipeline stage turning a (game, box_score) pair into (game, rows), see
+    process_box_score.  Rows are None if the box score could not be fetched
+    or parsed.
+    """
     @staticmethod
-    def process_players(players, data):
-        players_db = data[DB.players_table_name]
-        meta_db = data[DB.meta_table_name]
+    def parse_box_score(item):
+        game, box_score = item
+        if box_score is None:
+            return game, None
+        try:
+            return game, Builder.process_box_score(box_score)
+        except Exception as e:
+            print("\033[31mException occured. Check logs.\033[0m")
+            logger.exception(
+                f"Exception processing box_score query. Exception: "
+                f"'{str(e)}', box_score: '{json.dumps(box_score, indent=4)}'.",
+                stack_info=True
+            )
+            return game, None
 
-        for player_id in players:
-            stats = execution_context.client.stats.player_career_stats(player_id)
-            first_name = utl.json_value_or_default(stats, Keys.first_name, Keys.default, default="")
-            last_name = utl.json_value_or_default(stats, Keys.last_name, Keys.default, default="")
-            if not utl.json_value_or_default(stats, Keys.is_Active, default=False):
+    """
+    Record the update time of the given tables and commit everything written
+    since the last commit as a single transaction.
+    """
+    @staticmethod
+    def commit(repository, *table_names):
+        now = datetime.now(timezone.utc)
+        for table_name in table_names:
+            repository.set_last_update(table_name, now)
+        repository.commit()
+
+    """
+    Call fetch for each item on a bounded pool of worker threads, yielding
+    (item, result) pairs in the same order as the items were given.  At most
+    'concurrency' requests are in flight at once and at most twice that many
+    results are held waiting to be consumed.
+    """
+    @staticmethod
+    def fetch_concurrently(items, fetch):
+        window = execution_context.concurrency * 2
+        with ThreadPoolExecutor(max_workers=execution_context.concurrency) as executor:
+            pending = deque()
+            for item in items:
+                pending.append((item, executor.submit(fetch, item)))
+                if len(pending) >= window:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+
+    @staticmethod
+    def fetch_box_score(game_id):
+        try:
+            box_score = execution_context.client.game_center.boxscore(game_id)
+        except Exception as e:
+            print("\033[31mException occured. Check logs.\033[0m")
+            logger.exception(
+                f"Exception fetching box_score. GameId: '{game_id}', "
+                f"Exception: '{str(e)}'.",
+                stack_info=True
+            )
+            return None
+        if execution_context.use_archive:
+            Builder.archive(execution_context.payload_archive.put_box_score, box_score)
+        return box_score
+
+    """
+    A box score from the payload archive, or None if it isn't archived or
+    can't be read.
+    """
+    @staticmethod
+    def fetch_archived_box_score(game_id):
+        try:
+            return execution_context.payload_archive.get_box_score(game_id)
+        except Exception as e:
+            print("\033[31mException occured. Check logs.\033[0m")
+            logger.exception(
+                f"Exception reading archived box_score. GameId: '{game_id}', "
+                f"Exception: '{str(e)}'.",
+                stack_info=True
+            )
+            return None
+
+    """
+    Store a fetched payload in the payload archive.  A payload that can't be
+    archived is logged, the build carries on without it.
+    """
+    @staticmethod
+    def archive(put, *arguments):
+        try:
+            put(*arguments)
+        except Exception as e:
+            logger.exception(
+                f"Exception archiving payload. Exception: '{str(e)}'.",
+                stack_info=True
+            )
+
+    """
+    Extract the game row and the skater and goalie stat rows from a box score.
+    Returns None if the roster has not been published yet.
+    """
+    @staticmethod
+    def process_box_score(box_score):
+        rows = BoxScoreDecoder.decode(box_score)
+        if rows is None:
+            logger.warning("Roster not published yet")
+        return rows
+
+    """
+    Refresh the profiles of the given players.  Active players are stored,
+    retired players are removed from the players table.  Every profile that
+    was fetched is recorded in player_refresh so later builds, and a resumed
+    build started at 'build_started', can skip it.
+    """
+    @staticmethod
+    def process_players(players, repository, build_started=None):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        players = Builder.get_stale_players(players, repository, build_started)
+        pending_players = 0
+        failed_players = 0
+
+        # Profiles are fetched concurrently, writes stay on this thread.
+        for player_id, stats in Builder.fetch_concurrently(players, Builder.fetch_player):
+            if stats is None:
+                failed_players += 1
+                continue
+            is_active = Builder.store_player(player_id, stats, repository)
+            # Profiles served by the cache were fetched by an earlier run.
+            fetched = execution_context.player_stats_cache.get_fetched(player_id)
+            repository.set_player_refreshed(
+                player_id,
+                datetime.fromtimestamp(fetched, timezone.utc) if fetched is not None
+                else datetime.now(timezone.utc),
+                is_active
+            )
+
+            pending_players += 1
+            if pending_players >= execution_context.batch_size:
+                Builder.commit(repository, DB.players_table_name)
+                pending_players = 0
+
+        Builder.commit(repository, DB.players_table_name)
+
+        elapsed = time.perf_counter() - start
+        execution_context.profiler.record(
+            "player refresh", elapsed, time.process_time() - cpu_start, len(players)
+        )
+        logger.info(
+            f"Players processed. Players: '{len(players)}', "
+            f"Failed: '{failed_players}', Seconds: '{elapsed:.2f}'."
+        )
+        execution_context.player_stats_cache.report()
+
+    """
+    Store an active player's profile, or remove a retired player from the
+    players table.  Returns whether the player is active.
+    """
+    @staticmethod
+    def store_player(player_id, stats, repository):
+        first_name = utl.json_value_or_default(stats, Keys.first_name, Keys.default, default="")
+        last_name = utl.json_value_or_default(stats, Keys.last_name, Keys.default, default="")
+        is_active = utl.json_value_or_default(stats, Keys.is_Active, default=False)
+        if not is_active:
+            logger.info(
+                f"Skipping inactive player. PlayerId: '{player_id}', "
+                f"Name: '{first_name} {last_name}'."
+            )
+            if repository.has_player(player_id):
                 logger.info(
-                    f"Skipping inactive player. PlayerId: '{stats[Keys.player_id]}', "
+                    f"Deleting inactive player in database. "
+                    f"PlayerId: '{player_id}', "
                     f"Name: '{first_name} {last_name}'."
                 )
-                if player_id in players_db:
-                    logger.info(
-                        f"Deleting inactive player in database. "
-                        f"PlayerId: '{stats[Keys.player_id]}', "
-                        f"Name: '{stats[Keys.first_name]} {stats[Keys.last_name]}'."
-                    )
-                    del players_db[player_id]
-            else:
-                players_db[player_id] = {
-                    Keys.current_team_id: utl.json_value_or_default(stats, Keys.current_team_id),
-                    Keys.first_name: first_name,
-                    Keys.last_name: last_name,
-                    Keys.height_in_cm: utl.json_value_or_default(stats, Keys.height_in_cm),
-                    Keys.weight_in_kg: utl.json_value_or_default(stats, Keys.weight_in_kg)
-                }
+                repository.delete_player(player_id)
+        else:
+            repository.upsert_player({
+                Keys.player_id: player_id,
+                Keys.current_team_id: utl.json_value_or_default(stats, Keys.current_team_id),
+                Keys.first_name: first_name,
+                Keys.last_name: last_name,
+                Keys.height_in_cm: utl.json_value_or_default(stats, Keys.height_in_cm),
+                Keys.weight_in_kg: utl.json_value_or_default(stats, Keys.weight_in_kg)
+            })
+        return is_active
+
+    """
+    The players whose profiles need fetching, in ID order.  Players refreshed
+    since the build started and retired players are left out, as are players
+    refreshed within the last 'player_max_age' hours unless a full refresh was
+    asked for.  With 'refresh_seen_players', players who appeared in a game
+    stored since their last refresh are always fetched.
+    """
+    @staticmethod
+    def get_stale_players(players, repository, build_started=None):
+        now = datetime.now(timezone.utc)
+        cutoff = build_started if build_started is not None else now
+        if not execution_context.refresh_all_players:
+            cutoff = min(cutoff, now - timedelta(hours=execution_context.player_max_age))
+
+        fresh_players = repository.get_fresh_player_ids(
+            cutoff, include_retired=not execution_context.refresh_all_players
+        )
+        if execution_context.refresh_seen_players:
+            fresh_players -= repository.get_seen_player_ids()
+        stale_players = sorted(
+            player_id for player_id in players if player_id not in fresh_players
+        )
+        logger.info(
+            f"Player refresh planned. Stale: '{len(stale_players)}', "
+            f"Skipped: '{len(players) - len(stale_players)}'."
+        )
+        return stale_players
 
-        meta_db[DB.players_table_name] = {
-            Keys.last_update: datetime.now(timezone.utc)
-        }
+    """
+    A player's career stats, from the player stats cache unless every
+    profile, or those of players seen in new games, must be fetched again.
+    Fetched profiles are cached, and archived with it.
+    """
+    @staticmethod
+    def fetch_player(player_id):
+        cache = execution_context.player_stats_cache
+        if not (execution_context.refresh_all_players or execution_context.refresh_seen_players):
+            stats = cache.get(player_id)
+            if stats is not None:
+                return stats
+        try:
+            stats = execution_context.client.stats.player_career_stats(player_id)
+        except Exception as e:
+            print("\033[31mException occured. Check logs.\033[0m")
+            logger.exception(
+                f"Exception fetching player_career_stats. PlayerId: '{player_id}', "
+                f"Exception: '{str(e)}'.",
+                stack_info=True
+            )
+            return None
+        cache.put(player_id, stats)
+        return stats
 
 
     # TODO: Keep for reference while updating other modules.
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from enum import Enum
+
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+The stages of a build, in the order they run.
+"""
+class BuildStage(str, Enum):
+    Games = "games"
+    Players = "players"
+
+"""
+Durable record of a build in progress, stored in the meta table.
+
+A checkpoint is written once the game plan has been saved, moved to the
+players stage once every planned game has been processed, and removed when
+the build completes.  Progress within a stage is not recorded here: games
+and player profiles are committed in batches, so a resumed build skips the
+games already stored and the profiles refreshed since the build started.
+"""
+class Checkpoint:
+
+    def __init__(
+        self,
+        seasons,
+        incremental=False,
+        started=None,
+        stage=BuildStage.Games,
+        full_seasons=(),
+        failed_seasons=(),
+        watermark_seasons=()
+    ):
+        self.seasons = [int(season) for season in seasons]
+        self.incremental = incremental
+        self.started = started if started is not None else datetime.now(timezone.utc)
+        self.stage = BuildStage(stage)
+        self.full_seasons = set(full_seasons)
+        self.failed_seasons = set(failed_seasons)
+        self.watermark_seasons = set(watermark_seasons)
+
+    """
+    The checkpoint left behind by an interrupted build, or None.
+    """
+    @classmethod
+    def load(cls, repository):
+        value = repository.get_meta(Keys.build_checkpoint)
+        if value is None:
+            return None
+        return cls(
+            value[Keys.seasons],
+            value[Keys.incremental],
+            datetime.fromisoformat(value[Keys.started]),
+            value[Keys.stage],
+            value[Keys.full_seasons],
+            value[Keys.failed_seasons],
+            # Absent from checkpoints saved by older builds.
+            value.get(Keys.watermark_seasons, [])
+        )
+
+    def save(self, repository):
+        repository.set_meta(Keys.build_checkpoint, {
+            Keys.stage: self.stage.value,
+            Keys.seasons: self.seasons,
+            Keys.incremental: self.incremental,
+            Keys.started: self.started.isoformat(),
+            Keys.full_seasons: sorted(self.full_seasons),
+            Keys.failed_seasons: sorted(self.failed_seasons),
+            Keys.watermark_seasons: sorted(self.watermark_seasons)
+        })
+        logger.info(
+            f"Saved build checkpoint. Stage: '{self.stage.value}', "
+            f"Seasons: '{self.seasons}'."
+        )
+
+    @staticmethod
+    def clear(repository):
+        repository.delete_meta(Keys.build_checkpoint)
+        repository.clear_plan()
@@ -0,0 +1,264 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from ansimarkup import ansiprint as print
+
+import shared.execution_context
+from builder.builder import Builder
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+from shared.repository import Repository, Schema, SchemaOutOfDateError
+from shared.utility import Utility as utl
+
+logger = LoggingConfig.get_logger(__name__)
+execution_context = shared.execution_context.ExecutionContext()
+
+# Version of the exported files' layout and types.  Raising it rewrites every
+# partition on the next export.
+ExportVersion = 1
+ManifestName = "_manifest.json"
+DataFileName = "part-0.parquet"
+
+"""
+Tables exported with one partition per season, '<table>/season=<season>/'.
+The season is read back from the directory name, it is not stored in the
+files.  Other tables are exported to a single partition, '<table>/'.
+"""
+SeasonTables = [
+    DB.games_table_name,
+    DB.skater_stats_table_name,
+    DB.goalie_stats_table_name
+]
+ExportedTables = SeasonTables + [DB.players_table_name]
+
+"""
+Arrow type of a column, by its SQLite type.  ColumnTypes overrides it for
+columns that are flags or have only a handful of distinct values; the latter
+are dictionary encoded, so pandas reads them as categoricals.
+"""
+SqliteTypes = {
+    "INTEGER": pa.int64(),
+    "REAL": pa.float64(),
+    "TEXT": pa.string()
+}
+ColumnTypes = {
+    Keys.game_type: pa.int8(),
+    Keys.game_state: pa.dictionary(pa.int8(), pa.string()),
+    Keys.position: pa.dictionary(pa.int8(), pa.string()),
+    Keys.decision: pa.dictionary(pa.int8(), pa.string()),
+    Keys.starter: pa.bool_()
+}
+
+"""
+Writes the games, stat lines and players of the data set to Parquet files,
+for loading in bulk with pandas or pyarrow.
+
+Exports are incremental.  A manifest in the export directory records a
+fingerprint of the data behind every partition it wrote: the number of games
+in the season and the time one was last written, both kept in the meta
+table by triggers, or the counters and update time of the players table.
+Partitions whose fingerprint has not changed are left alone and partitions
+of seasons no longer in the data set are removed.
+"""
+class Exporter:
+
+    @staticmethod
+    def export(output_dir=None, full=False):
+        output_dir = Path(output_dir if output_dir is not None else utl.get_export_dir())
+        logger.info(f"Start data set export. Directory: '{output_dir}', Full: '{full}'.")
+        try:
+            repository = Repository(read_only=True)
+        except SchemaOutOfDateError as e:
+            Builder.print_schema_error(e)
+            return
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest = Exporter.read_manifest(output_dir)
+        results = []
+        try:
+            # A single read transaction, so the rows written match their
+            # fingerprints even if a build commits while the export runs.
+            repository.begin()
+            partitions = Exporter.get_partitions(repository)
+            for partition, (table_name, season, fingerprint) in partitions.items():
+                entry = manifest["partitions"].get(partition)
+                if (
+                    not full
+                    and entry is not None
+                    and entry["fingerprint"] == fingerprint
+                    and (output_dir / partition / DataFileName).exists()
+                ):
+                    results.append((table_name, "unchanged", entry["rows"], entry["fileBytes"]))
+                    continue
+
+                with execution_context.profiler.stage(f"export {table_name}"):
+                    rows, file_bytes = Exporter.write_partition(
+                        repository, output_dir / partition, table_name, season
+                    )
+                manifest["partitions"][partition] = {
+                    "fingerprint": fingerprint,
+                    "rows": rows,
+                    "fileBytes": file_bytes,
+                    "exported": datetime.now(timezone.utc).isoformat()
+                }
+                # Saved as each partition is written, so an interrupted
+                # export does not rewrite them again.
+                Exporter.write_manifest(output_dir, manifest)
+                results.append((table_name, "written", rows, file_bytes))
+                logger.info(
+                    f"Partition exported. Partition: '{partition}', Rows: '{rows}', "
+                    f"Bytes: '{file_bytes}'."
+                )
+
+            for partition in sorted(set(manifest["partitions"]) - set(partitions)):
+                shutil.rmtree(output_dir / partition, ignore_errors=True)
+                del manifest["partitions"][partition]
+                results.append((partition.split("/")[0], "removed", 0, 0))
+                logger.info(f"Partition removed. Partition: '{partition}'.")
+            Exporter.write_manifest(output_dir, manifest)
+        finally:
+            repository.close()
+
+        Exporter.report(output_dir, results)
+
+    """
+    Every partition the data set exports to, as a dict of partition path to
+    (table name, season or None, fingerprint).
+    """
+    @staticmethod
+    def get_partitions(repository):
+        tables, seasons = repository.get_counters()
+        season_updates = repository.get_season_updates()
+        partitions = {}
+        for season, games in seasons.items():
+            fingerprint = {
+                "version": ExportVersion,
+                "games": games,
+                "updated": season_updates.get(season)
+            }
+            for table_name in SeasonTables:
+                partitions[f"{table_name}/season={season}"] = (table_name, season, fingerprint)
+
+        players = tables[DB.players_table_name]
+        last_update = repository.get_last_update(DB.players_table_name)
+        partitions[DB.players_table_name] = (DB.players_table_name, None, {
+            "version": ExportVersion,
+            "rows": players["rows"],
+            "dataBytes": players["dataBytes"],
+            "updated": last_update.isoformat() if last_update else None
+        })
+        return partitions
+
+    """
+    Write the rows of a table, or of one season of it, to 'directory'.  The
+    file is written beside the old one and then moved over it, so readers
+    never see a partly written file.  Returns the number of rows and the
+    size of the file.
+    """
+    @staticmethod
+    def write_partition(repository, directory, table_name, season):
+        table = Exporter.get_table(
+            table_name, repository.get_rows(table_name, season), partitioned=season is not None
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / DataFileName
+        # Readers skip files starting with a dot.
+        temp_path = directory / f".{DataFileName}.tmp"
+        pq.write_table(table, temp_path, compression="zstd")
+        os.replace(temp_path, path)
+        return table.num_rows, path.stat().st_size
+
+    """
+    The Arrow schema of an exported table.  Columns that can't be NULL in
+    the database are not nullable.  Tables 'partitioned' by season leave out
+    the games table's season column.
+    """
+    @staticmethod
+    def get_schema(table_name, partitioned=False):
+        fields = []
+        for name, definition in Schema[table_name].items():
+            if partitioned and name == Keys.season:
+                continue
+            fields.append(pa.field(
+                name,
+                ColumnTypes.get(name, SqliteTypes[definition.split()[0]]),
+                nullable="NOT NULL" not in definition and "PRIMARY KEY" not in definition
+            ))
+        return pa.schema(fields)
+
+    """
+    Rows read by Repository.get_rows as an Arrow table.
+    """
+    @staticmethod
+    def get_table(table_name, rows, partitioned=False):
+        schema = Exporter.get_schema(table_name, partitioned)
+        names = list(Schema[table_name])
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        arrays = []
+        for field in schema:
+            values = columns[names.index(field.name)]
+            # Built with the column's SQLite type, then converted.
+            sqlite_type = SqliteTypes[Schema[table_name][field.name].split()[0]]
+            array = pa.array(values, type=sqlite_type)
+            arrays.append(array if sqlite_type == field.type else array.cast(field.type))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    """
+    Read an exported table into a pandas DataFrame.  Only the given columns
+    are read and, for tables exported by season, only the given seasons'
+    files.  Those tables have a 'season' column taken from the partition.
+    """
+    @staticmethod
+    def read(table_name, columns=None, seasons=None, export_dir=None):
+        path = Path(export_dir if export_dir is not None else utl.get_export_dir()) / table_name
+        filters = None
+        if seasons is not None:
+            filters = [(Keys.season, "in", [int(season) for season in seasons])]
+        # Without a schema the season would be read as a categorical.
+        partitioning = ds.partitioning(pa.schema([(Keys.season, pa.int32())]), flavor="hive")
+        return pq.read_table(
+            path, columns=columns, filters=filters, partitioning=partitioning
+        ).to_pandas()
+
+    @staticmethod
+    def read_manifest(output_dir):
+        path = output_dir / ManifestName
+        if not path.exists():
+            return {"partitions": {}}
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    @staticmethod
+    def write_manifest(output_dir, manifest):
+        path = output_dir / ManifestName
+        temp_path = output_dir / f".{ManifestName}.tmp"
+        manifest["exported"] = datetime.now(timezone.utc).isoformat()
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=4)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def report(output_dir, results):
+        table = [["Table", "Written", "Unchanged", "Removed", "Rows", "Size (MB)"]]
+        for table_name in ExportedTables:
+            table_results = [result for result in results if result[0] == table_name]
+            table.append([
+                table_name,
+                str(sum(1 for result in table_results if result[1] == "written")),
+                str(sum(1 for result in table_results if result[1] == "unchanged")),
+                str(sum(1 for result in table_results if result[1] == "removed")),
+                str(sum(result[2] for result in table_results)),
+                f"{sum(result[3] for result in table_results) / 1024 / 1024:.1f}"
+            ])
+        print("\n<b><green>EXPORT:</green></b>")
+        print("<blue>Partitions of each table, by what this export did with them.</blue>")
+        utl.print_table(table, hasHeader=True)
+        print(f"<blue>Exported to '{output_dir.absolute()}'.</blue>")
+        print("\n")
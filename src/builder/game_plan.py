@@ -0,0 +1,305 @@
+import json
+from datetime import date, timedelta
+
+from ansimarkup import ansiprint as print
+
+import shared.execution_context
+from model.game_state import GameState, GameStatesForDataset
+from model.game_type import GameType, SupportedGameTypes
+from model.team_map import TeamMap
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility as utl
+
+logger = LoggingConfig.get_logger(__name__)
+execution_context = shared.execution_context.ExecutionContext()
+
+"""
+The set of games a build will fetch box scores for.
+
+Every team schedule for the requested seasons is collected before any box
+score is requested.  Since each game appears on the schedule of both teams
+involved, games are deduplicated by ID and filtered by type, state and
+whether they are already in the database up front, so each box score is
+requested at most once per build.
+
+In incremental mode seasons that have watermarks are not planned from the
+team schedules.  Instead the league schedule is walked a week at a time from
+the earliest team watermark up to today, and seasons that were fully built
+after they ended are skipped altogether.  Games that failed during the last
+incremental build are planned again first, since the watermarks may already
+have moved past them.
+"""
+class GamePlan:
+
+    def __init__(self):
+        self.games = {}
+        self.schedule_calls = 0
+        self.schedule_calls_skipped = 0
+        self.schedule_failures = 0
+        self.weekly_schedule_calls = 0
+        self.complete_seasons_skipped = 0
+        self.seasons = set()
+        self.full_seasons = set()
+        self.failed_seasons = set()
+        # Seasons planned from their watermarks up to today or the season's
+        # end without a failed weekly schedule.
+        self.watermark_seasons = set()
+        # Every game ID add_game was given, planned or skipped.
+        self.seen_games = set()
+        self.duplicate_games = 0
+        self.processed_games = 0
+        self.unsupported_type_games = 0
+        self.unsupported_state_games = 0
+
+    """
+    Collect the schedules for every team in the given seasons and build the
+    plan from them.  If incremental, only look for games since each season's
+    watermarks, see plan_since_watermarks.
+    """
+    @classmethod
+    def create(cls, seasons, repository, incremental=False):
+        plan = cls()
+        plan.seasons = {int(season) for season in seasons}
+        teams = GamePlan.get_unique_teams()
+        complete_seasons = set()
+        if incremental:
+            complete_seasons = repository.get_complete_seasons()
+            for game in repository.get_meta(Keys.retry_games, []):
+                if game.get(Keys.season) in plan.seasons:
+                    plan.add_game(game, repository)
+
+        for season in seasons:
+            logger.info(f"Start planning for season '{season}'.")
+            if incremental:
+                if int(season) in complete_seasons:
+                    logger.info(f"Skipping season '{season}' which is complete.")
+                    plan.complete_seasons_skipped += 1
+                    continue
+                watermarks = repository.get_watermarks(season)
+                if watermarks:
+                    plan.plan_since_watermarks(season, watermarks, repository)
+                    continue
+
+            plan.full_seasons.add(int(season))
+            plan.schedule_calls_skipped += len(TeamMap) - len(teams)
+            for team in teams:
+                games_raw = plan.fetch_schedule(team, season)
+                for game in games_raw:
+                    plan.add_game(game, repository)
+
+        logger.info(
+            f"Game plan complete. Planned box score calls: '{len(plan.games)}', "
+            f"Skipped box score calls: '{plan.skipped_games}'."
+        )
+        return plan
+
+    """
+    Rebuild the plan of an interrupted build from the saved build plan.  Games
+    that were stored before the interruption are skipped.
+    """
+    @classmethod
+    def load(cls, checkpoint, repository):
+        plan = cls()
+        plan.seasons = set(checkpoint.seasons)
+        plan.full_seasons = set(checkpoint.full_seasons)
+        plan.failed_seasons = set(checkpoint.failed_seasons)
+        plan.watermark_seasons = set(checkpoint.watermark_seasons)
+        for game in repository.get_plan():
+            plan.add_game(game, repository)
+
+        logger.info(
+            f"Game plan loaded. Planned box score calls: '{len(plan.games)}', "
+            f"Skipped box score calls: '{plan.skipped_games}'."
+        )
+        return plan
+
+    """
+    Store the planned games so an interrupted build can be resumed without
+    walking the schedules again.
+    """
+    def save(self, repository):
+        repository.save_plan([
+            GamePlan.get_entry(game) for game in self.games.values()
+        ])
+
+    """
+    The parts of a schedule entry that add_game needs to plan the game again.
+    """
+    @staticmethod
+    def get_entry(game):
+        return {
+            Keys.id: game[Keys.id],
+            Keys.season: game.get(Keys.season),
+            Keys.game_type: game.get(Keys.game_type),
+            Keys.game_state: game.get(Keys.game_state)
+        }
+
+    """
+    Plan the games of a season from the league schedule, starting at the
+    earliest of the season's team watermarks.  Every team's games since its
+    own watermark are covered, games before it are already stored and are
+    filtered out by add_game.
+    """
+    def plan_since_watermarks(self, season, watermarks, repository):
+        start = date.fromisoformat(min(game_date for game_date, _ in watermarks.values()))
+        end = min(date.today(), GamePlan.get_season_end(season))
+        logger.info(
+            f"Planning season '{season}' from watermarks. Start: '{start}', "
+            f"End: '{end}'."
+        )
+
+        week = start
+        while week <= end:
+            games_raw = self.fetch_weekly_schedule(week)
+            if games_raw is None:
+                # Stop here so later games cannot move the watermarks past
+                # the games of the week that failed.
+                self.failed_seasons.add(int(season))
+                break
+            for game in games_raw:
+                if game.get(Keys.season) == int(season):
+                    self.add_game(game, repository)
+            week += timedelta(days=7)
+        if int(season) not in self.failed_seasons:
+            self.watermark_seasons.add(int(season))
+
+    """
+    The date after which no more games are played in a season.  The playoffs
+    end in June at the latest.
+    """
+    @staticmethod
+    def get_season_end(season):
+        return date(int(season) % 10000, 8, 1)
+
+    @staticmethod
+    def is_season_over(season):
+        return date.today() > GamePlan.get_season_end(season)
+
+    """
+    Team abbreviations to request schedules for.  Some franchises are listed
+    under more than one abbreviation for back compat (e.g. UTA and ARI), only
+    the first abbreviation for each franchise is used.  Games played under
+    the other abbreviation are still found on the opponents' schedules.
+    """
+    @staticmethod
+    def get_unique_teams():
+        franchises = {}
+        for team, franchise_id in TeamMap.items():
+            franchises.setdefault(franchise_id, team)
+        return list(franchises.values())
+
+    @property
+    def skipped_games(self):
+        return (
+            self.duplicate_games
+            + self.processed_games
+            + self.unsupported_type_games
+            + self.unsupported_state_games
+        )
+
+    def fetch_schedule(self, team, season):
+        logger.info(f"Fetching schedule for team '{team}' in season '{season}'.")
+        self.schedule_calls += 1
+        try:
+            games_raw = execution_context.client.schedule.team_season_schedule(team, season)[Keys.games]
+            logger.info(f"Found '{len(games_raw)}' games for team '{team}' in season '{season}'.")
+            return games_raw
+        except Exception as e:
+            self.schedule_failures += 1
+            self.failed_seasons.add(int(season))
+            print("\033[31mException occured. Check logs.\033[0m")
+            logger.exception(
+                f"Exception processing team_season_schedule query. Team: '{team}', "
+                f"Season: '{season}', Exception: '{str(e)}'.",
+                stack_info=True
+            )
+            return []
+
+    """
+    The games on the league schedule for the week starting at the given date,
+    or None if the schedule could not be fetched.
+    """
+    def fetch_weekly_schedule(self, week):
+        logger.info(f"Fetching weekly schedule for '{week}'.")
+        self.schedule_calls += 1
+        self.weekly_schedule_calls += 1
+        try:
+            schedule = execution_context.client.schedule.weekly_schedule(week.isoformat())
+            return [
+                game for day in schedule[Keys.game_week]
+                for game in day.get(Keys.games, [])
+            ]
+        except Exception as e:
+            self.schedule_failures += 1
+            print("\033[31mException occured. Check logs.\033[0m")
+            logger.exception(
+                f"Exception processing weekly_schedule query. Date: '{week}', "
+                f"Exception: '{str(e)}'.",
+                stack_info=True
+            )
+            return None
+
+    def add_game(self, game, repository):
+        try:
+            game_id = game[Keys.id]
+            # Skipped games are on both teams' schedules too, they are
+            # counted as skipped once.
+            if game_id in self.seen_games:
+                self.duplicate_games += 1
+                return
+            self.seen_games.add(game_id)
+            if repository.has_game(game_id):
+                logger.info(
+                    f"Skipping game '{game_id}' which was already "
+                    "processed."
+                )
+                self.processed_games += 1
+                return
+            if (GameType(utl.json_value_or_default(game, Keys.game_type, default=GameType.Preseason))
+                not in SupportedGameTypes):
+                logger.info(
+                    f"Skipping game '{game_id}' which is not a "
+                    f"supported game type. Type: '{game[Keys.game_type]}'."
+                )
+                self.unsupported_type_games += 1
+                return
+            if (GameState(utl.json_value_or_default(game, Keys.game_state, default=GameState.Future))
+                not in GameStatesForDataset):
+                logger.info(
+                    f"Skipping game '{game_id}' which is not a "
+                    f"supported game state. State: '{game[Keys.game_state]}'."
+                )
+                self.unsupported_state_games += 1
+                return
+            self.games[game_id] = game
+        except Exception as e:
+            print("\033[31mException occured. Check logs.\033[0m")
+            logger.exception(
+                f"Exception planning game. Game: '{json.dumps(game, indent=4)}', "
+                f"Exception: '{str(e)}'.",
+                stack_info=True
+            )
+
+    def report(self):
+        schedule_table = [
+            ["Schedule calls made", str(self.schedule_calls)],
+            ["  Weekly (incremental)", str(self.weekly_schedule_calls)],
+            ["Seasons skipped (complete)", str(self.complete_seasons_skipped)],
+            ["Schedule calls skipped (duplicate franchise)", str(self.schedule_calls_skipped)],
+            ["Schedule calls failed", str(self.schedule_failures)]
+        ]
+        games_table = [
+            ["Box score calls planned", str(len(self.games))],
+            ["Box score calls skipped", str(self.skipped_games)],
+            ["  Duplicate (home/away)", str(self.duplicate_games)],
+            ["  Already processed", str(self.processed_games)],
+            ["  Unsupported game type", str(self.unsupported_type_games)],
+            ["  Unsupported game state", str(self.unsupported_state_games)]
+        ]
+
+        print("\n<b><green>SCHEDULES:</green></b>")
+        utl.print_table(schedule_table)
+        print("\n<b><green>GAME PLAN:</green></b>")
+        utl.print_table(games_table)
+        print("\n")
@@ -0,0 +1,152 @@
+from datetime import datetime, timezone
+
+from ansimarkup import ansiprint as print
+from sqlitedict import decode
+
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+from shared.repository import Repository
+from shared.utility import Utility as utl
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+Upgrades an existing database to the current schema version.  Each migration
+runs inside a single transaction, so an interrupted migration leaves the
+database as it was.
+"""
+class Migration:
+
+    @staticmethod
+    def migrate():
+        logger.info("Start database migration.")
+        repository = Repository(check_schema=False)
+
+        version = repository.get_schema_version()
+        if version >= DB.schema_version:
+            print(f"<green>Database is up to date. Schema version: {version}.</green>")
+            return
+
+        try:
+            if version < 3:
+                Migration.migrate_legacy_tables(repository)
+            if version < 4:
+                Migration.add_watermarks(repository)
+            if version < 6:
+                # Version 5 adds the player_refresh table, every player is
+                # refreshed by the next build.  Version 6 adds build_plan.
+                repository.create_schema()
+            if version < 7:
+                Migration.add_player_index(repository)
+            if version < 8:
+                Migration.add_counters(repository)
+            repository.commit()
+        except Exception:
+            repository.rollback()
+            raise
+
+        print(
+            f"<green>Database migrated from schema version {version} to "
+            f"{DB.schema_version}.</green>"
+        )
+
+    """
+    Version 1/2 -> 3: move the pickled SqliteDict tables into the typed
+    relational tables.  Stat rows are keyed by (game ID, player ID), so
+    duplicate stat lines left behind by re-running a build in version 1
+    collapse onto the same row.  Columns that the old tables did not record
+    (game date, teams, scores, positions) are left empty; rebuild with
+    '--update' to fill them in.
+    """
+    @staticmethod
+    def migrate_legacy_tables(repository):
+        legacy_tables = repository.get_legacy_tables()
+
+        repository.begin()
+        for table_name in legacy_tables:
+            repository.execute(
+                f'ALTER TABLE "{table_name}" RENAME TO '
+                f'"{DB.legacy_table_prefix}{table_name}"'
+            )
+        repository.create_schema()
+
+        for table_name in legacy_tables:
+            legacy_rows = repository.execute(
+                f'SELECT key, value FROM "{DB.legacy_table_prefix}{table_name}"'
+            ).fetchall()
+            rows = [
+                Migration.convert_legacy_row(table_name, key, decode(value))
+                for key, value in legacy_rows
+            ]
+            rows = [row for row in rows if row is not None]
+
+            if table_name == DB.meta_table_name:
+                for name, row in rows:
+                    repository.set_meta(name, row)
+            else:
+                repository.upsert(table_name, rows)
+
+            repository.execute(f'DROP TABLE "{DB.legacy_table_prefix}{table_name}"')
+
+            logger.info(
+                f"Migrated legacy table. Table: '{table_name}', "
+                f"Legacy rows: '{len(legacy_rows)}', Rows: '{repository.count(table_name)}'."
+            )
+            print(
+                f"<blue>{table_name}: migrated {len(legacy_rows)} rows into "
+                f"{repository.count(table_name)} rows.</blue>"
+            )
+
+    """
+    Version 3 -> 4: add the watermarks table and seed it from the games
+    already stored.  Games migrated from version 1/2 have no date and are not
+    counted, seasons made up only of those games are fully re-planned by the
+    next incremental build.
+    """
+    @staticmethod
+    def add_watermarks(repository):
+        repository.create_schema()
+        repository.seed_watermarks()
+        logger.info(
+            f"Added watermarks table. Rows: "
+            f"'{repository.count(DB.watermarks_table_name)}'."
+        )
+
+    """
+    Version 6 -> 7: add the player index and fill it from the stat lines
+    already stored.
+    """
+    @staticmethod
+    def add_player_index(repository):
+        repository.create_schema()
+        repository.seed_player_index()
+        repository.set_last_update(DB.player_index_table_name, datetime.now(timezone.utc))
+        logger.info(
+            f"Added player index. Rows: "
+            f"'{repository.count(DB.player_index_table_name)}'."
+        )
+
+    """
+    Version 7 -> 8: add the triggers that keep the row counters and count
+    what is already stored.
+    """
+    @staticmethod
+    def add_counters(repository):
+        repository.create_schema()
+        repository.seed_counters()
+        logger.info(f"Added counters. Counters: '{repository.get_counters()}'.")
+
+    @staticmethod
+    def convert_legacy_row(table_name, key, value):
+        if table_name == DB.games_table_name:
+            return {**value, Keys.game_id: int(key)}
+        if table_name == DB.players_table_name:
+            return {**value, Keys.player_id: int(key)}
+        if table_name == DB.meta_table_name:
+            last_update = utl.json_value_or_default(value, Keys.last_update, default=None)
+            if last_update is None:
+                # Only the per table update times are carried over.
+                return None
+            return key, {Keys.last_update: last_update.isoformat()}
+        return value
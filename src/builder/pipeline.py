@@ -0,0 +1,271 @@
+import queue
+import threading
+import time
+
+from ansimarkup import ansiprint as print
+
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility as utl
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+Marks the end of a stage's input.
+"""
+_EndOfStream = object()
+
+"""
+A bounded queue between two stages that keeps count of the end of stream
+markers in it, so its depth counts only items.
+"""
+class _StageQueue(queue.Queue):
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.markers = 0
+
+    def _put(self, item):
+        if item is _EndOfStream:
+            self.markers += 1
+        super()._put(item)
+
+    def _get(self):
+        item = super()._get()
+        if item is _EndOfStream:
+            self.markers -= 1
+        return item
+
+    def depth(self):
+        with self.mutex:
+            return self._qsize() - self.markers
+
+"""
+One step of a Pipeline.  'function' is called with each item and its result
+is handed to the next stage.  Results of None are dropped.
+"""
+class Stage:
+
+    def __init__(self, name, function, workers=1):
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self.queue_samples = 0
+        self.queue_total = 0
+        self.queue_max = 0
+        self._lock = threading.Lock()
+
+    def process(self, item):
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        result = self.function(item)
+        elapsed = time.perf_counter() - start
+        cpu = time.thread_time() - cpu_start
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += elapsed
+            self.cpu_seconds += cpu
+        return result
+
+    def sample_queue(self, depth):
+        with self._lock:
+            self.queue_samples += 1
+            self.queue_total += depth
+            self.queue_max = max(self.queue_max, depth)
+
+    @property
+    def wall_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def throughput(self):
+        return self.items / self.wall_seconds if self.wall_seconds else 0.0
+
+    """
+    Fraction of the stage's worker time spent in 'function' rather than
+    waiting on the queues.  The busiest stage is the bottleneck.
+    """
+    @property
+    def utilization(self):
+        capacity = self.wall_seconds * self.workers
+        return self.busy_seconds / capacity if capacity else 0.0
+
+    @property
+    def queue_average(self):
+        return self.queue_total / self.queue_samples if self.queue_samples else 0.0
+
+"""
+Runs items through a chain of stages, each on its own threads, connected by
+bounded queues.  A stage that falls behind fills its input queue, which
+blocks the stages before it, so no more than 'queue_size' items wait between
+any two stages however many items the source yields.  Items come out of the
+pipeline in the order they finish, not the order they went in.
+
+The last stage, the sink, runs on the thread that calls run, so it can own
+resources that must not be shared between threads.  If the source, a stage
+or the sink raises, the pipeline stops, every thread is joined and run
+raises the first exception.
+"""
+class Pipeline:
+
+    def __init__(self, stages, sink, queue_size=16):
+        self.stages = stages
+        self.sink = sink
+        self.queue_size = queue_size
+        self._stop = threading.Event()
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    def run(self, source):
+        self._stop.clear()
+        self._error = None
+        queues = [_StageQueue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(
+            target=self._feed, args=(source, queues[0], self.stages[0].workers),
+            name="pipeline-source", daemon=True
+        )]
+        for index, stage in enumerate(self.stages):
+            next_workers = (
+                self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            )
+            remaining = [stage.workers]
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[index], queues[index + 1], remaining, next_workers),
+                    name=f"pipeline-{stage.name}-{worker}", daemon=True
+                ))
+
+        for thread in threads:
+            thread.start()
+        try:
+            self.sink.started = time.perf_counter()
+            while True:
+                item = self._get(queues[-1], self.sink)
+                # None if a stage failed and stopped the pipeline.
+                if item is _EndOfStream or item is None:
+                    break
+                self.sink.process(item)
+            self.sink.finished = time.perf_counter()
+        finally:
+            # Unblocks the workers if the sink failed or was interrupted.
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _feed(self, source, output, workers):
+        try:
+            for item in source:
+                if not self._put(output, item):
+                    return
+        except Exception as e:
+            self._fail("source", e)
+            return
+        for _ in range(workers):
+            self._put(output, _EndOfStream)
+
+    def _work(self, stage, input, output, remaining, next_workers):
+        with stage._lock:
+            if stage.started is None:
+                stage.started = time.perf_counter()
+        while True:
+            item = self._get(input, stage)
+            if item is _EndOfStream or item is None:
+                break
+            try:
+                result = stage.process(item)
+            except Exception as e:
+                self._fail(stage.name, e)
+                return
+            if result is not None and not self._put(output, result):
+                return
+
+        with stage._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+            if last:
+                stage.finished = time.perf_counter()
+        if last:
+            for _ in range(next_workers):
+                self._put(output, _EndOfStream)
+
+    """
+    Keep the first exception raised by the source or a stage for run to
+    raise, and stop the pipeline.
+    """
+    def _fail(self, name, e):
+        print("\033[31mException occured. Check logs.\033[0m")
+        logger.exception(
+            f"Exception in pipeline stage. Stage: '{name}', Exception: '{str(e)}'.",
+            stack_info=True
+        )
+        with self._error_lock:
+            if self._error is None:
+                self._error = e
+        self._stop.set()
+
+    """
+    Queue operations that give up once the pipeline is stopped.  _put returns
+    False and _get returns None if they did.
+    """
+    def _put(self, output, item):
+        while not self._stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, input, stage):
+        stage.sample_queue(input.depth())
+        while not self._stop.is_set():
+            try:
+                return input.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def get_stats(self):
+        return [
+            {
+                "stage": stage.name,
+                "workers": stage.workers,
+                "items": stage.items,
+                "seconds": round(stage.wall_seconds, 3),
+                "itemsPerSecond": round(stage.throughput, 1),
+                "utilization": round(stage.utilization, 3),
+                "queueAverage": round(stage.queue_average, 1),
+                "queueMax": stage.queue_max
+            }
+            for stage in self.stages + [self.sink]
+        ]
+
+    def report(self):
+        table = [["Stage", "Workers", "Items", "Items/s", "Busy", "Avg queue", "Max queue"]]
+        for stats in self.get_stats():
+            logger.info(f"Pipeline stage complete. Stats: '{stats}'.")
+            table.append([
+                stats["stage"],
+                str(stats["workers"]),
+                str(stats["items"]),
+                f"{stats['itemsPerSecond']:.1f}",
+                f"{stats['utilization']:.0%}",
+                f"{stats['queueAverage']:.1f}/{self.queue_size}",
+                str(stats["queueMax"])
+            ])
+        print("\n<b><green>PIPELINE:</green></b>")
+        print(
+            "<blue>Busy is the share of each stage's time spent working rather "
+            "than waiting. The busiest stage is the bottleneck.</blue>"
+        )
+        utl.print_table(table, hasHeader=True)
+        print("\n")
@@ -8,8 +8,13 @@ from model.algorithms import Algorithms
 from model.seasons import Seasons
 from model.summarizers import Summarizers
 from shared.execution_context import ExecutionContext
+from shared.profiler import CpuProfiler
 
 app = typer.Typer()
+cache_app = typer.Typer(help="Inspect and maintain the on-disk API response cache.")
+app.add_typer(cache_app, name="cache")
+archive_app = typer.Typer(help="Inspect the archive of raw box scores and player profiles.")
+app.add_typer(archive_app, name="archive")
 
 _summarizer = Annotated[Summarizers, typer.Option(
         help="Specify the algorithm to use to summarize roster strength.",
@@ -29,6 +34,52 @@ _app_dir = Annotated[Path, typer.Option(
     )
 )]
 
+_use_cache = Annotated[bool, typer.Option(
+    help=(
+        "Answer API requests from the on-disk response cache where possible. "
+        "Official box scores and completed schedules are cached permanently."
+    )
+)]
+
+_api_base_url = Annotated[Optional[str], typer.Option(
+    help=(
+        "Send NHL API requests to this host instead, for example the mock API "
+        "started by 'serve-mock' ('http://127.0.0.1:8765'). Responses are not "
+        "cached."
+    )
+)]
+
+_archive = Annotated[bool, typer.Option(
+    help=(
+        "Keep the raw box scores and player profiles fetched, compressed, in "
+        "'NHLArchive.sqlite', so the data set can be derived again with "
+        "'rebuild --from-archive' without downloading them."
+    )
+)]
+
+_profile = Annotated[bool, typer.Option(
+    help=(
+        "Record wall and CPU time for each stage and the count and latency of "
+        "API requests, print a summary and write it to '--profile-file'."
+    )
+)]
+
+_profile_file = Annotated[Optional[str], typer.Option(
+    help=(
+        "JSON file the '--profile' summary is written to. Defaults to "
+        "'<command>.profile.json'."
+    )
+)]
+
+_profile_cpu = Annotated[CpuProfiler, typer.Option(
+    help=(
+        "With '--profile', also profile CPU use. 'cprofile' traces the main "
+        "thread and writes a '.prof' file for pstats or snakeviz. 'sample' "
+        "samples every thread and writes a '.folded' file for flame graph tools."
+    ),
+    case_sensitive=False
+)]
+
 @app.command()
 def build(
     season: Annotated[Optional[List[Seasons]], typer.Option(
@@ -55,6 +106,86 @@ def build(
             "of data will occur."
         )
     )] = False,
+    json_output: Annotated[bool, typer.Option(
+        "--json",
+        help=(
+            "With '--report', write the report to stdout as JSON instead of "
+            "as tables."
+        )
+    )] = False,
+    resume: Annotated[bool, typer.Option(
+        help=(
+            "Continue the last build if it was interrupted, skipping the "
+            "schedule walk and any games and player profiles it already "
+            "stored. Starts a new build of the given seasons otherwise."
+        )
+    )] = False,
+    incremental: Annotated[bool, typer.Option(
+        help=(
+            "Only fetch games played since the last build of each season. "
+            "Seasons that were fully built after they ended are skipped."
+        )
+    )] = False,
+    concurrency: Annotated[int, typer.Option(
+        help=(
+            "Maximum number of box score or player profile requests to have in "
+            "flight at once. "
+            "Use 1 to fetch games sequentially."
+        ),
+        min=1
+    )] = 8,
+    batch_size: Annotated[int, typer.Option(
+        help=(
+            "Number of games (or players) written per database transaction. "
+            "Each game's rows are always committed together."
+        ),
+        min=1
+    )] = 50,
+    max_rps: Annotated[Optional[float], typer.Option(
+        help=(
+            "Most requests per second to send to the NHL API. Concurrency is "
+            "also cut back automatically whenever the API throttles or fails. "
+            "Applies per process when used with '--processes'."
+        ),
+        min=0.1
+    )] = None,
+    max_retries: Annotated[int, typer.Option(
+        help=(
+            "Times to retry a request that was throttled (429), failed (5xx) or "
+            "dropped before giving up on it."
+        ),
+        min=0
+    )] = 4,
+    processes: Annotated[int, typer.Option(
+        help=(
+            "Build each season in its own worker process, up to this many at "
+            "once, each writing to a shard database that is merged into the "
+            "data set when it finishes. Use 1 to build in a single process."
+        ),
+        min=1
+    )] = 1,
+    player_max_age: Annotated[int, typer.Option(
+        help=(
+            "Only fetch player profiles that were last refreshed more than this "
+            "many hours ago. Retired players are not fetched again."
+        ),
+        min=0
+    )] = 24,
+    refresh_all_players: Annotated[bool, typer.Option(
+        help="Fetch every player profile, regardless of when it was last refreshed."
+    )] = False,
+    refresh_seen_players: Annotated[bool, typer.Option(
+        help=(
+            "Also fetch the profiles of players who appeared in a game stored "
+            "since their profile was last refreshed, however recently that was."
+        )
+    )] = False,
+    use_cache: _use_cache = True,
+    api_base_url: _api_base_url = None,
+    archive: _archive = True,
+    profile: _profile = False,
+    profile_file: _profile_file = None,
+    profile_cpu: _profile_cpu = CpuProfiler.off,
     app_dir: _app_dir = None
 ):
     """
@@ -62,14 +193,129 @@ def build(
     """
     context = ExecutionContext()
     context.allow_update = update
+    context.incremental = incremental
+    context.concurrency = concurrency
+    context.batch_size = batch_size
+    context.processes = processes
+    context.max_rps = max_rps
+    context.max_retries = max_retries
+    context.player_max_age = player_max_age
+    context.refresh_all_players = refresh_all_players
+    context.refresh_seen_players = refresh_seen_players
+    context.use_cache = use_cache
+    context.api_base_url = api_base_url
+    context.use_archive = archive
+    context.profile = profile
     if app_dir:
         context.app_dir = app_dir
 
     from builder.builder import Builder
-    if report:
-        Builder.report()
-    else:
-        Builder.build(season, all_seasons)
+    with context.profiler.session("build", profile_file, profile_cpu):
+        if report:
+            Builder.report(json_output)
+        elif resume:
+            Builder.resume(season, all_seasons)
+        else:
+            Builder.build(season, all_seasons)
+
+@app.command()
+def rebuild(
+    from_archive: Annotated[bool, typer.Option(
+        help=(
+            "Derive every table from the payload archive kept by earlier "
+            "builds instead of downloading the games again. Only games and "
+            "players in the archive are restored."
+        )
+    )] = False,
+    concurrency: Annotated[int, typer.Option(
+        help=(
+            "Maximum number of box scores or player profiles to fetch or "
+            "decompress at once."
+        ),
+        min=1
+    )] = 8,
+    batch_size: Annotated[int, typer.Option(
+        help="Number of games (or players) written per database transaction.",
+        min=1
+    )] = 50,
+    processes: Annotated[int, typer.Option(
+        help=(
+            "Without '--from-archive', build each season in its own worker "
+            "process, up to this many at once. See 'build --processes'."
+        ),
+        min=1
+    )] = 1,
+    use_cache: _use_cache = True,
+    api_base_url: _api_base_url = None,
+    archive: _archive = True,
+    profile: _profile = False,
+    profile_file: _profile_file = None,
+    profile_cpu: _profile_cpu = CpuProfiler.off,
+    app_dir: _app_dir = None
+):
+    """
+    Clear the data set and derive it again, for example after adding a
+    column, either from the payload archive or by building every season in
+    it again.
+    """
+    context = ExecutionContext()
+    context.concurrency = concurrency
+    context.batch_size = batch_size
+    context.processes = processes
+    context.use_cache = use_cache
+    context.api_base_url = api_base_url
+    context.use_archive = archive
+    context.profile = profile
+    if app_dir:
+        context.app_dir = app_dir
+
+    from builder.builder import Builder
+    with context.profiler.session("rebuild", profile_file, profile_cpu):
+        Builder.rebuild(from_archive)
+
+@app.command()
+def migrate(
+    app_dir: _app_dir = None
+):
+    """
+    Upgrade an existing data set to the current database schema.
+    """
+    context = ExecutionContext()
+    if app_dir:
+        context.app_dir = app_dir
+
+    from builder.migration import Migration
+    Migration.migrate()
+
+@app.command()
+def export(
+    output: Annotated[Optional[Path], typer.Option(
+        help=(
+            "Directory to write the Parquet files to. Defaults to "
+            "'NHLPredictor.parquet' beside the database."
+        )
+    )] = None,
+    full: Annotated[bool, typer.Option(
+        help="Rewrite every partition, not only those whose data changed."
+    )] = False,
+    profile: _profile = False,
+    profile_file: _profile_file = None,
+    profile_cpu: _profile_cpu = CpuProfiler.off,
+    app_dir: _app_dir = None
+):
+    """
+    Export the games, stat lines and players to Parquet, partitioned by
+    season. Only partitions whose data changed since the last export are
+    written again.
+    """
+    context = ExecutionContext()
+    context.profile = profile
+    if app_dir:
+        context.app_dir = app_dir
+
+    from builder.exporter import Exporter
+    with context.profiler.session("export", profile_file, profile_cpu):
+        Exporter.export(output, full)
 
 @app.command()
 def train(
@@ -85,17 +331,30 @@ def train(
             "Allow serialized model to be overwritten."
         )
     )],
+    feature_cache: Annotated[bool, typer.Option(
+        help=(
+            "Read the data files through the feature cache, which keeps them "
+            "parsed as memory-mapped NumPy arrays in 'NHLFeatures.cache'. "
+            "Entries are rebuilt when a data file or the summarizer changes."
+        )
+    )] = True,
+    profile: _profile = False,
+    profile_file: _profile_file = None,
+    profile_cpu: _profile_cpu = CpuProfiler.off,
     app_dir: _app_dir = None
 ):
     """
     Train a model using the specified ML algorithm and data.
     """
     context = ExecutionContext()
+    context.use_feature_cache = feature_cache
+    context.profile = profile
     if app_dir:
         context.app_dir = app_dir
     
     from trainer.trainer import Trainer
-    Trainer.train(algorithm, output, data_file)
+    with context.profiler.session("train", profile_file, profile_cpu):
+        Trainer.train(algorithm, output, data_file)
 
 @app.command()
 def predict(
@@ -130,17 +389,105 @@ def predict(
             "may get more accuate results using current season stats."
         )
     )] = False,
+    use_cache: _use_cache = True,
+    api_base_url: _api_base_url = None,
+    profile: _profile = False,
+    profile_file: _profile_file = None,
+    profile_cpu: _profile_cpu = CpuProfiler.off,
     app_dir: _app_dir = None
 ):
     """
     Predict the outcome of a game(s) given the specified model.
     """
     context = ExecutionContext()
+    context.use_cache = use_cache
+    context.api_base_url = api_base_url
+    context.profile = profile
     if app_dir:
         context.app_dir = app_dir
     
     from predictor.predictor import Predictor
-    Predictor.predict(algorithm, model, summarizer, date, date_range)
+    with context.profiler.session("predict", profile_file, profile_cpu):
+        Predictor.predict(algorithm, model, summarizer, date, date_range)
+
+@cache_app.command("stats")
+def cache_stats():
+    """
+    Report the size and contents of the response cache.
+    """
+    ExecutionContext().response_cache.report()
+
+@cache_app.command("prune")
+def cache_prune(
+    max_mb: Annotated[Optional[int], typer.Option(
+        help=(
+            "Evict least recently used entries until the cache is no larger "
+            "than this. Defaults to the cache's configured maximum size."
+        ),
+        min=0
+    )] = None,
+    all_entries: Annotated[bool, typer.Option(
+        "--all",
+        help="Remove every entry, including permanent ones."
+    )] = False
+):
+    """
+    Remove expired entries and shrink the response cache.
+    """
+    cache = ExecutionContext().response_cache
+    if all_entries:
+        removed = cache.clear()
+    else:
+        removed = cache.prune(max_mb * 1024 * 1024 if max_mb is not None else None)
+    print(f"Removed {removed} entries from the response cache.")
+
+@archive_app.command("stats")
+def archive_stats():
+    """
+    Report the number, size and compression of the archived payloads.
+    """
+    ExecutionContext().payload_archive.report()
+
+@app.command("serve-mock")
+def serve_mock(
+    host: Annotated[str, typer.Option(
+        help="Address to listen on."
+    )] = "127.0.0.1",
+    port: Annotated[int, typer.Option(
+        help="Port to listen on."
+    )] = 8765,
+    latency_ms: Annotated[float, typer.Option(
+        help="Delay added to every response, in milliseconds.",
+        min=0
+    )] = 0,
+    jitter_ms: Annotated[float, typer.Option(
+        help="Random extra delay of up to this many milliseconds per response.",
+        min=0
+    )] = 0,
+    error_rate: Annotated[float, typer.Option(
+        help="Fraction of requests answered with a 429 or 503 error.",
+        min=0,
+        max=1
+    )] = 0,
+    seed: Annotated[int, typer.Option(
+        help="Seed for the random delays and errors."
+    )] = 0
+):
+    """
+    Serve a local stand-in for the NHL API, built from the payloads in
+    'reference/', for offline benchmarks. Point 'build' or 'predict' at it
+    with '--api-base-url'.
+    """
+    from mock_api.server import MockApiServer
+    server = MockApiServer(host, port, latency_ms / 1000, jitter_ms / 1000, error_rate, seed)
+    print(f"Serving mock NHL API on {server.base_url}. Press Ctrl-C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.report()
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -0,0 +1,213 @@
+import copy
+import json
+import random
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+from model.game_state import GameState
+from model.game_type import GameType
+from model.team_map import TeamMap
+from shared.constants.json import JSON as Keys
+
+ReferenceDir = Path(__file__).resolve().parents[2] / "reference"
+BoxScoreFile = "box_score.json"
+ScheduleFile = "games_before.json"
+PlayerFile = "player_stats.json"
+
+GamesPerTeam = 82
+DaysBetweenRounds = 2
+FirstPlayerId = 8400000
+PlayersPerTeam = 100
+
+"""
+Synthesizes NHL API payloads from the samples in the reference directory.
+
+Every season has the same league schedule: each team plays 82 regular season
+games against the other teams in a round robin, one round every other day
+starting in early October.  Games before today are official, later games are
+in the future.  Box scores reuse the reference box scores with the game,
+teams, scores and player IDs replaced, and each team has its own pool of
+player IDs so player profiles can be requested for every player seen.  All
+values are derived from the IDs in the request, so the same request always
+gets the same payload.
+"""
+class MockPayloads:
+
+    def __init__(self, today=None):
+        self.today = today if today is not None else date.today()
+        self.teams = MockPayloads.get_teams()
+        self.box_scores = MockPayloads.load(BoxScoreFile)
+        self.schedule_game = MockPayloads.load(ScheduleFile)[0]
+        self.player = MockPayloads.load(PlayerFile)
+
+    @staticmethod
+    def load(file_name):
+        with open(ReferenceDir / file_name, encoding="utf-8") as file:
+            return json.load(file)
+
+    """
+    One abbreviation per franchise, the franchise ID is used as the team ID.
+    """
+    @staticmethod
+    def get_teams():
+        teams = {}
+        for abbrev, team_id in TeamMap.items():
+            teams.setdefault(team_id, abbrev)
+        return [(team_id, abbrev) for team_id, abbrev in teams.items()]
+
+    @staticmethod
+    def get_season_start(season):
+        return date(int(season) // 10000, 10, 8)
+
+    """
+    All games in a season as (game ID, game date, home team, away team)
+    tuples, in date order.  Teams are scheduled with the circle method so no
+    team plays twice in a round.
+    """
+    @lru_cache(maxsize=None)
+    def get_season_games(self, season):
+        teams = list(self.teams)
+        start = MockPayloads.get_season_start(season)
+        games = []
+        for round_number in range(GamesPerTeam):
+            rotation = round_number % (len(teams) - 1)
+            order = [teams[0]] + teams[1:][rotation:] + teams[1:][:rotation]
+            game_date = start + timedelta(days=round_number * DaysBetweenRounds)
+            for i in range(len(order) // 2):
+                home, away = order[i], order[-1 - i]
+                if (round_number // (len(teams) - 1) + i) % 2:
+                    home, away = away, home
+                game_id = (
+                    (int(season) // 10000) * 1000000
+                    + int(GameType.RegularSeason.value) * 10000
+                    + len(games) + 1
+                )
+                games.append((game_id, game_date, home, away))
+        return games
+
+    def get_game(self, game_id):
+        season = self.get_season(game_id)
+        games = self.get_season_games(season)
+        index = game_id % 10000 - 1
+        if not 0 <= index < len(games):
+            return None
+        return games[index]
+
+    @staticmethod
+    def get_season(game_id):
+        year = game_id // 1000000
+        return f"{year}{year + 1}"
+
+    def get_game_state(self, game_date):
+        return GameState.Official if game_date < self.today else GameState.Future
+
+    def get_schedule_entry(self, season, game):
+        game_id, game_date, home, away = game
+        entry = copy.deepcopy(self.schedule_game)
+        entry.update({
+            Keys.id: game_id,
+            Keys.season: int(season),
+            Keys.game_type: int(GameType.RegularSeason.value),
+            Keys.game_date: game_date.isoformat(),
+            Keys.game_state: self.get_game_state(game_date).value,
+            "startTimeUTC": f"{game_date.isoformat()}T00:00:00Z"
+        })
+        for team_key, (team_id, abbrev) in [(Keys.home_team, home), (Keys.away_team, away)]:
+            entry[team_key] = {**entry[team_key], Keys.id: team_id, Keys.abbrev: abbrev}
+        return entry
+
+    def team_season_schedule(self, abbrev, season):
+        team_id = TeamMap.get(abbrev)
+        if team_id is None:
+            return None
+        games = [
+            self.get_schedule_entry(season, game)
+            for game in self.get_season_games(season)
+            if team_id in (game[2][0], game[3][0])
+        ]
+        return {"season": int(season), Keys.games: games}
+
+    """
+    The schedule for the seven days starting at the given date, like the
+    'schedule/{date}' endpoint.
+    """
+    def weekly_schedule(self, start):
+        start = date.fromisoformat(start)
+        season = start.year if start.month >= 8 else start.year - 1
+        seasons = [f"{season}{season + 1}"]
+        days = []
+        for offset in range(7):
+            day = start + timedelta(days=offset)
+            games = [
+                self.get_schedule_entry(season_name, game)
+                for season_name in seasons
+                for game in self.get_season_games(season_name)
+                if game[1] == day
+            ]
+            days.append({
+                "date": day.isoformat(),
+                "numberOfGames": len(games),
+                Keys.games: games
+            })
+        return {
+            "nextStartDate": (start + timedelta(days=7)).isoformat(),
+            "previousStartDate": (start - timedelta(days=7)).isoformat(),
+            Keys.game_week: days
+        }
+
+    def boxscore(self, game_id):
+        game_id = int(game_id)
+        game = self.get_game(game_id)
+        if game is None:
+            return None
+        _, game_date, home, away = game
+        game_state = self.get_game_state(game_date)
+        rng = random.Random(game_id)
+
+        box_score = copy.deepcopy(self.box_scores[game_id % len(self.box_scores)])
+        box_score.update({
+            Keys.id: game_id,
+            Keys.season: int(self.get_season(game_id)),
+            Keys.game_type: int(GameType.RegularSeason.value),
+            Keys.game_date: game_date.isoformat(),
+            Keys.game_state: game_state.value
+        })
+        for team_key, (team_id, abbrev) in [(Keys.home_team, home), (Keys.away_team, away)]:
+            box_score[team_key].update({
+                Keys.id: team_id,
+                Keys.abbrev: abbrev,
+                Keys.score: rng.randint(0, 6),
+                Keys.sog: rng.randint(20, 40)
+            })
+            if game_state != GameState.Official:
+                continue
+            roster = box_score[Keys.player_by_game_stats][team_key]
+            players = roster[Keys.forwards] + roster[Keys.defense] + roster[Keys.goalies]
+            for slot, player in enumerate(players):
+                player[Keys.player_id] = MockPayloads.get_player_id(team_id, slot)
+                if Keys.goals in player:
+                    player[Keys.goals] = rng.choice([0, 0, 0, 1, 1, 2])
+        if game_state != GameState.Official:
+            box_score.pop(Keys.player_by_game_stats, None)
+        return box_score
+
+    @staticmethod
+    def get_player_id(team_id, slot):
+        return FirstPlayerId + team_id * PlayersPerTeam + slot
+
+    def player_landing(self, player_id):
+        player_id = int(player_id)
+        team_id, slot = divmod(player_id - FirstPlayerId, PlayersPerTeam)
+        if team_id not in TeamMap.values():
+            return None
+        player = copy.deepcopy(self.player)
+        player.update({
+            Keys.player_id: player_id,
+            Keys.current_team_id: team_id,
+            # Roughly one player in ten has retired.
+            Keys.is_Active: random.Random(player_id).random() >= 0.1,
+            Keys.first_name: {Keys.default: f"Player{slot}"},
+            Keys.last_name: {Keys.default: f"Team{team_id}"}
+        })
+        return player
@@ -0,0 +1,126 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ansimarkup import ansiprint as print
+
+from mock_api.payloads import MockPayloads
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility as utl
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+Routes served by the mock API, as (name, path pattern, MockPayloads method).
+Paths match the NHL web API with its '/v1/' prefix.
+"""
+Routes = [
+    ("schedule", re.compile(r"^/v1/club-schedule-season/(\w+)/(\d{8})$"), "team_season_schedule"),
+    ("weekly", re.compile(r"^/v1/schedule/(\d{4}-\d{2}-\d{2})$"), "weekly_schedule"),
+    ("boxscore", re.compile(r"^/v1/gamecenter/(\d+)/boxscore$"), "boxscore"),
+    ("player", re.compile(r"^/v1/player/(\d+)/landing$"), "player_landing")
+]
+
+"""
+Stand-in for the NHL API serving payloads synthesized by MockPayloads.
+
+Each request is delayed by 'latency' seconds plus up to 'jitter' seconds, and
+fails with a 503 or 429 response with probability 'error_rate'.  The delays
+and failures are drawn from a random generator seeded with 'seed', so a run
+with one client thread sees the same sequence every time.
+"""
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for every connection a concurrent build opens at once, the default
+    # backlog of 5 drops connections and stalls clients for a second.
+    request_queue_size = 128
+
+    def __init__(self, host="127.0.0.1", port=8765, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        super().__init__((host, port), MockApiHandler)
+        self.payloads = MockPayloads()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = Counter()
+        self.errors = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    """
+    The delay and, if the request should fail, the status code to fail with.
+    """
+    def draw(self, route):
+        with self._lock:
+            self.requests[route] += 1
+            delay = self.latency + self._random.random() * self.jitter
+            status = None
+            if self._random.random() < self.error_rate:
+                status = self._random.choice([429, 503])
+                self.errors[route] += 1
+        return delay, status
+
+    def report(self):
+        table = [["Route", "Requests", "Errors"]]
+        table.extend(
+            [route, str(self.requests[route]), str(self.errors[route])]
+            for route, _, _ in Routes
+        )
+        table.append(["Total", str(sum(self.requests.values())), str(sum(self.errors.values()))])
+        print("\n<b><green>MOCK API REQUESTS:</green></b>")
+        utl.print_table(table, hasHeader=True)
+        print("\n")
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    # Keep connections open between requests, like the real API.
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        for route, pattern, method in Routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+
+            delay, status = self.server.draw(route)
+            time.sleep(delay)
+            if status is not None:
+                self.send_json(status, {"message": "Injected failure."})
+                return
+
+            try:
+                payload = getattr(self.server.payloads, method)(*match.groups())
+            except Exception as e:
+                logger.exception(
+                    f"Exception building mock payload. Path: '{path}', "
+                    f"Exception: '{str(e)}'.",
+                    stack_info=True
+                )
+                self.send_json(500, {"message": str(e)})
+                return
+            if payload is None:
+                self.send_json(404, {"message": f"No {route} for '{path}'."})
+            else:
+                self.send_json(200, payload)
+            return
+
+        self.send_json(404, {"message": f"Unknown resource '{path}'."})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Mock API request. Request: '{format % args}'.")
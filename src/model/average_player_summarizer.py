@@ -1,17 +1,26 @@
-import json
-import sys
+from datetime import date
 
+import numpy as np
 from nhlpy import NHLClient
 
 import shared.execution_context
+from model.historical_stats import HistoricalStats
 from model.player_info import GoalieInfo, SkaterInfo
+from model.summarizer import Summarizer
+from model.summary_engine import SkaterWidth, SummaryEngine
+from shared.constants.database import Database as DB
 from shared.constants.json import JSON as Keys
 from shared.logging_config import LoggingConfig
 
 logger = LoggingConfig.get_logger(__name__)
 execution_context = shared.execution_context.ExecutionContext()
 
-class AveragePlayerSummarizer:
+class AveragePlayerSummarizer(Summarizer):
+    name = "average"
+    # Raise when the features produced or their headers change, so data
+    # cached from an older version is rebuilt.  2: faceoff and save
+    # percentages and time on ice are written as floats even when zero.
+    version = "2"
 
     def summarize(self, homeRoster, awayRoster):
         logger.info("Summarizing home and away rosters.")
@@ -27,342 +36,118 @@ class AveragePlayerSummarizer:
 
         return homeSummary, awaySummary
 
-    def summarize_historical(self, homeRoster, awayRoster, use_season_totals):
-        logger.info("Summarizing home and away rosters.")
-        homeSummary = self.summarize_roster(
-            AveragePlayerSummarizer.historical_transform(homeRoster, use_season_totals)
-            )
-        awaySummary = self.summarize_roster(
-            AveragePlayerSummarizer.historical_transform(awayRoster, use_season_totals)
-            )
-
-        return homeSummary, awaySummary
+    """
+    Summarize the rosters of a game that is already stored in the data set.
+    """
+    def summarize_stored_game(self, game_id):
+        logger.info(f"Summarizing stored game. GameId: '{game_id}'.")
+        rosters = execution_context.database.get_rosters(game_id)
+        if rosters is None:
+            logger.warning(f"Game not found in the data set. GameId: '{game_id}'.")
+            return None
+        return self.summarize_db(*rosters)
 
-    def historical_transform(roster, use_season_totals):
-        # TODO: Actually implement this
+    """
+    Summarize the rosters of an upcoming game from each player's per game
+    averages before 'as_of_date' ('YYYY-MM-DD', today by default): over
+    their whole career in the data set, or with use_season_totals only the
+    current season.  Only player IDs are read from the rosters and no API
+    call is made, see HistoricalStats.
+    """
+    def summarize_historical(self, homeRoster, awayRoster, use_season_totals, as_of_date=None):
         logger.info("Summarizing home and away rosters with historical data.")
-        
-        for player in roster["forwards"]:
-            AveragePlayerSummarizer.get_historical_stats_for_player(
-                player["playerId"],
-                use_season_totals
-            )
-        for player in roster["defense"]:
-            AveragePlayerSummarizer.get_historical_stats_for_player(
-                player["playerId"],
+        as_of_date = as_of_date if as_of_date is not None else date.today().isoformat()
+        # Read both teams' players at once, the rosters are then memoized.
+        for table_name, groups in [
+            (DB.skater_stats_table_name, [Keys.forwards, Keys.defense]),
+            (DB.goalie_stats_table_name, [Keys.goalies])
+        ]:
+            self.historical_stats.get_averages(
+                table_name,
+                [player[Keys.player_id] for roster in [homeRoster, awayRoster]
+                 for group in groups for player in roster[group]],
+                as_of_date,
                 use_season_totals
             )
-        for player in roster["goalies"]:
-            AveragePlayerSummarizer.get_historical_stats_for_player(
-                player["playerId"],
-                use_season_totals
-            )
-        
-        print(json.dumps(roster, indent=4))
-        return roster
-    
-    def get_historical_stats_for_player(player_id, use_season_totals):
-        player_id = 8478402  #TODO: Remove
-        key = "seasonTotals" if use_season_totals else "careerTotals"
-        stats = execution_context.client.stats.player_career_stats(player_id)
-        stats = stats[key]["regularSeason"] # TODO: Do season stats have the exact same format?
-        total_games = stats["gamesPlayed"]
-        # TODO: Need to ensure that historical data has parity with statistical factors
-        result = {
-            "playerId": player_id,
-            "goals": stats["goals"]/total_games,
-            "assists": stats["assists"]/total_games,
-            "points": stats["points"]/total_games,
-            "plusMinus": stats["plusMinus"]/total_games,
-            "pim": stats["pim"]/total_games,
-            #"hits": stats[""],
-            "powerPlayGoals": stats["powerPlayGoals"]/total_games,
-            "sog": stats["shots"]/total_games,
-            "faceoffWinningPctg": stats["faceoffWinningPctg"],
-            "toi": stats["avgToi"],
-            #"blockedShots": stats[""],
-            #"shifts": 17,
-            #"giveaways": 1,
-            #"takeaways": 0
-        }
-        print(json.dumps(result, indent=4))
-        sys.exit(0)
-
-    def summarize_roster(self, roster):
-        logger.info(f"Summarizing roster. Roster: '{roster}'.")
-        forwards = self.summarize_skaters(roster["forwards"])
-        defense = self.summarize_skaters(roster["defense"])
-        goalies = self.summarize_goalies(roster["goalies"])
-        return f"{forwards},{defense},{goalies}"
-
-    def summarize_roster_db(self, roster):
-        logger.info(f"Summarizing roster. Roster: '{roster}'.")
-        forwards = self.summarize_skaters_db(roster["forwards"])
-        defense = self.summarize_skaters_db(roster["defense"])
-        goalies = self.summarize_goalies_db(roster["goalies"])
-        return {  Keys.forwards: forwards, Keys.defense: defense, Keys.goalies: goalies}
-
-    def summarize_skaters(self, players):
-        logger.info(f"Summarizing skaters. Skaters: '{players}'.")
-        player_objects = []
-        for player in players:
-            player_objects.append(SkaterInfo.from_json(player))
-
-        count = 0   
-        goals = 0
-        assists = 0
-        points = 0
-        plus_minus = 0
-        pim = 0
-        hits = 0
-        pp_goals = 0
-        sog = 0
-        faceoff_win_pct = 0
-        toi = 0
-        blocked_shots = 0
-        giveaways = 0
-        takeaways = 0
-
-        for player in player_objects:
-            logger.info(f"Adding skater to summary. Goalie: '{player}'.")
-            count += 1
-            goals += player.goals
-            assists += player.assists
-            points += player.points
-            plus_minus += player.plus_minus
-            pim += player.pim
-            hits += player.hits
-            pp_goals += player.pp_goals
-            sog += player.sog
-            faceoff_win_pct += player.faceoff_win_pct
-            toi += player.toi
-            blocked_shots += player.blocked_shots
-            giveaways += player.giveaways
-            takeaways += player.takeaways
-
-        # TODO: can't just average the FO %, it needs to be weighted    
-        summary = SkaterInfo(
-            goals,
-            assists,
-            points,
-            plus_minus,
-            pim,
-            hits,
-            pp_goals,
-            sog,
-            faceoff_win_pct,
-            toi,
-            blocked_shots,
-            giveaways,
-            takeaways
-        )
+        homeSummary = self.summarize_roster_historical(homeRoster, use_season_totals, as_of_date)
+        awaySummary = self.summarize_roster_historical(awayRoster, use_season_totals, as_of_date)
 
-        logger.info(f"Summarized goalies. Summary: '{summary}'.")
-        return repr(summary)
-
-    def summarize_skaters_db(self, players):
-        logger.info(f"Summarizing skaters. Skaters: '{players}'.")
-        player_objects = []
-        for player in players:
-            player_objects.append(SkaterInfo.from_json(player))
-
-        count = 0   
-        goals = 0
-        assists = 0
-        points = 0
-        plus_minus = 0
-        pim = 0
-        hits = 0
-        pp_goals = 0
-        sog = 0
-        faceoff_win_pct = 0
-        toi = 0
-        blocked_shots = 0
-        giveaways = 0
-        takeaways = 0
-
-        for player in player_objects:
-            logger.info(f"Adding skater to summary. Goalie: '{player}'.")
-            count += 1
-            goals += player.goals
-            assists += player.assists
-            points += player.points
-            plus_minus += player.plus_minus
-            pim += player.pim
-            hits += player.hits
-            pp_goals += player.pp_goals
-            sog += player.sog
-            faceoff_win_pct += player.faceoff_win_pct
-            toi += player.toi
-            blocked_shots += player.blocked_shots
-            giveaways += player.giveaways
-            takeaways += player.takeaways
-
-        # TODO: can't just average the FO %, it needs to be weighted    
-        summary = SkaterInfo(
-            goals,
-            assists,
-            points,
-            plus_minus,
-            pim,
-            hits,
-            pp_goals,
-            sog,
-            faceoff_win_pct,
-            toi,
-            blocked_shots,
-            giveaways,
-            takeaways
-        )
-
-        logger.info(f"Summarized goalies. Summary: '{summary}'.")
-        return summary
-
-    def summarize_goalies(self, players):
-        logger.info(f"Summarizing goalies. Goalies: '{players}'.")
-        player_objects = []
-        for player in players:
-            player_objects.append(GoalieInfo.from_json(player))
-
-        count = 0
-        es_shots_against = 0
-        es_saves = 0
-        pp_shots_against = 0
-        pp_saves = 0
-        sh_shots_against = 0
-        sh_saves = 0
-        save_shots_against = 0
-        save_pct = 0
-        es_goals_against = 0
-        pp_goals_against = 0
-        sh_goals_against = 0
-        pim = 0
-        goals_against = 0
-        toi = 0
-        # starter = 0
-        # decision = 0
-        shots_against = 0
-        saves = 0
+        return homeSummary, awaySummary
 
-        for player in player_objects:
-            logger.info(f"Adding goalie to summary. Goalie: '{player}'.")
-            count += 1
-            es_shots_against += player.es_shots_against
-            es_saves += player.es_saves
-            pp_shots_against += player.pp_shots_against
-            pp_saves += player.pp_saves
-            sh_shots_against += player.sh_shots_against
-            sh_saves += player.sh_saves
-            save_shots_against += player.save_shots_against
-            save_pct += player.save_pct
-            es_goals_against += player.es_goals_against
-            pp_goals_against += player.pp_goals_against
-            sh_goals_against += player.sh_goals_against
-            pim += player.pim
-            goals_against += player.goals_against
-            toi += player.toi
-            # starter += player.starter
-            # decision += player.decision
-            shots_against += player.shots_against
-            saves += player.saves
+    def summarize_roster_historical(self, roster, use_season_totals, as_of_date):
+        skater_ids = [
+            player[Keys.player_id] for player in roster[Keys.forwards] + roster[Keys.defense]
+        ]
+        goalie_ids = [player[Keys.player_id] for player in roster[Keys.goalies]]
+        skater_groups = [0] * len(roster[Keys.forwards]) + [1] * len(roster[Keys.defense])
+        summary = SummaryEngine.summarize_groups(
+            self.historical_stats.get_averages(
+                DB.skater_stats_table_name, skater_ids, as_of_date, use_season_totals
+            ),
+            np.array(skater_groups, dtype=np.int64),
+            self.historical_stats.get_averages(
+                DB.goalie_stats_table_name, goalie_ids, as_of_date, use_season_totals
+            ),
+            np.zeros(len(goalie_ids), dtype=np.int64),
+            1
+        )[0]
+        # Averages are fractional, unlike the counts of a single game.
+        return ",".join(str(value) for value in summary.tolist())
+
+    @property
+    def historical_stats(self):
+        if getattr(self, '_historical_stats', None) is None:
+            self._historical_stats = HistoricalStats()
+        return self._historical_stats
 
-        # TODO: can't just average the FO %, it needs to be weighted
-        summary = GoalieInfo(
-            es_shots_against,
-            es_saves,
-            pp_shots_against,
-            pp_saves,
-            sh_shots_against,
-            sh_saves,
-            save_shots_against,
-            save_pct,
-            es_goals_against,
-            pp_goals_against,
-            sh_goals_against,
-            pim,
-            goals_against,
-            toi,
-            # starter,
-            # decision,
-            shots_against,
-            saves
-        )
+    def summarize_roster(self, roster):
+        return AveragePlayerSummarizer.to_csv(SummaryEngine.summarize_rosters([roster])[0])
 
-        logger.info(f"Summarized goalies. Summary: '{summary}'.")
-        return repr(summary)
+    def summarize_roster_db(self, roster):
+        return AveragePlayerSummarizer.to_infos(SummaryEngine.summarize_rosters([roster])[0])
 
-    def summarize_goalies_db(self, players):
-        logger.info(f"Summarizing goalies. Goalies: '{players}'.")
-        player_objects = []
-        for player in players:
-            player_objects.append(GoalieInfo.from_json(player))
+    """
+    Summarize many games in one pass, see SummaryEngine.  'games' are (home
+    roster, away roster) pairs; the result has a row per game of the home
+    then the away roster's summary, in the order of the dataset headers.
+    """
+    def summarize_many(self, games):
+        return SummaryEngine.summarize_games(games)
 
-        count = 0
-        es_shots_against = 0
-        es_saves = 0
-        pp_shots_against = 0
-        pp_saves = 0
-        sh_shots_against = 0
-        sh_saves = 0
-        save_shots_against = 0
-        save_pct = 0
-        es_goals_against = 0
-        pp_goals_against = 0
-        sh_goals_against = 0
-        pim = 0
-        goals_against = 0
-        toi = 0
-        # starter = 0
-        # decision = 0
-        shots_against = 0
-        saves = 0
+    """
+    The roster columns of the dataset headers, every one a float64.
+    """
+    def get_schema(self):
+        return [(header, np.dtype(np.float64)) for header in self.get_headers()[5:-1]]
 
-        for player in player_objects:
-            logger.info(f"Adding goalie to summary. Goalie: '{player}'.")
-            count += 1
-            es_shots_against += player.es_shots_against
-            es_saves += player.es_saves
-            pp_shots_against += player.pp_shots_against
-            pp_saves += player.pp_saves
-            sh_shots_against += player.sh_shots_against
-            sh_saves += player.sh_saves
-            save_shots_against += player.save_shots_against
-            save_pct += player.save_pct
-            es_goals_against += player.es_goals_against
-            pp_goals_against += player.pp_goals_against
-            sh_goals_against += player.sh_goals_against
-            pim += player.pim
-            goals_against += player.goals_against
-            toi += player.toi
-            # starter += player.starter
-            # decision += player.decision
-            shots_against += player.shots_against
-            saves += player.saves
+    """
+    Summarize stored games from their games, skater_stats and goalie_stats
+    rows as DataFrames, like summarize_many, without reading any player in
+    Python.  See Exporter.read.
+    """
+    def summarize_stat_tables(self, games, skaters, goalies):
+        return SummaryEngine.summarize_stat_tables(games, skaters, goalies)
 
-        # TODO: can't just average the FO %, it needs to be weighted
-        summary = GoalieInfo(
-            es_shots_against,
-            es_saves,
-            pp_shots_against,
-            pp_saves,
-            sh_shots_against,
-            sh_saves,
-            save_shots_against,
-            save_pct,
-            es_goals_against,
-            pp_goals_against,
-            sh_goals_against,
-            pim,
-            goals_against,
-            toi,
-            # starter,
-            # decision,
-            shots_against,
-            saves
-        )
+    """
+    A roster summary row as the CSV string of its forwards, defense and
+    goalies summaries.
+    """
+    @staticmethod
+    def to_csv(summary):
+        return ",".join(str(value) for value in SummaryEngine.to_values(summary))
 
-        logger.info(f"Summarized goalies. Summary: '{summary}'.")
-        return summary
+    """
+    The forwards, defense and goalies summaries of a roster summary row.
+    """
+    @staticmethod
+    def to_infos(summary):
+        values = SummaryEngine.to_values(summary)
+        # TODO: can't just add up the FO and save %, they need to be weighted
+        return {
+            Keys.forwards: SkaterInfo(*values[:SkaterWidth]),
+            Keys.defense: SkaterInfo(*values[SkaterWidth:2 * SkaterWidth]),
+            Keys.goalies: GoalieInfo(*values[2 * SkaterWidth:])
+        }
 
     """
     Labels for the dataset columns represented as a list of strings.
@@ -454,7 +239,7 @@ class AveragePlayerSummarizer:
             "awayGoaliePowerPlayGoalsAgainst",
             "awayGoalieShortHandedGoalsAgainst",
             "awayGoaliePIM",
-            "awayGoalieGoalsAgainst"
+            "awayGoalieGoalsAgainst",
             "awayGoalieTOI",
             "awayGoalieShotsAgainst",
             "awayGoalieSaves",
@@ -0,0 +1,77 @@
+import numpy as np
+
+import shared.execution_context
+from model.summary_engine import (GoalieColumns, GoalieWidth, SkaterColumns,
+                                  SkaterWidth, SummaryEngine)
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+
+logger = LoggingConfig.get_logger(__name__)
+execution_context = shared.execution_context.ExecutionContext()
+
+"""
+Stats read for the players of each stat table.
+"""
+TableColumns = {
+    DB.skater_stats_table_name: SkaterColumns,
+    DB.goalie_stats_table_name: GoalieColumns
+}
+TableWidths = {
+    DB.skater_stats_table_name: SkaterWidth,
+    DB.goalie_stats_table_name: GoalieWidth
+}
+
+"""
+Per game averages of players' stats in the data set, read from the
+skater_stats and goalie_stats tables rather than the NHL API.
+
+Averages are rows of the SummaryEngine columns of the player's stat table,
+over every game before a date or only the games of that date's season.
+They are memoized by (player ID, date, season only), so summarizing a slate
+of games reads each player's history once.  Players without any games
+average zero.
+"""
+class HistoricalStats:
+
+    def __init__(self, repository=None):
+        self.repository = repository
+        self._memo = {table_name: {} for table_name in TableColumns}
+
+    """
+    Averages of the players of a stat table as a players by stats matrix,
+    in the order of 'player_ids'.
+    """
+    def get_averages(self, table_name, player_ids, as_of_date, season_only):
+        memo = self._memo[table_name]
+        missing = list(dict.fromkeys(
+            player_id for player_id in player_ids
+            if (player_id, as_of_date, season_only) not in memo
+        ))
+        if missing:
+            averages = self.read_averages(table_name, missing, as_of_date, season_only)
+            for player_id, average in zip(missing, averages):
+                memo[(player_id, as_of_date, season_only)] = average
+
+        return np.array(
+            [memo[(player_id, as_of_date, season_only)] for player_id in player_ids],
+            dtype=np.float64
+        ).reshape(len(player_ids), TableWidths[table_name])
+
+    def read_averages(self, table_name, player_ids, as_of_date, season_only):
+        repository = self.repository if self.repository is not None else execution_context.database
+        rows = repository.get_player_stats(table_name, player_ids, as_of_date, season_only)
+        index = {player_id: position for position, player_id in enumerate(player_ids)}
+        groups = np.array([index[row[Keys.player_id]] for row in rows], dtype=np.int64)
+        totals = SummaryEngine.sum_groups(
+            SummaryEngine.get_player_matrix(rows, TableColumns[table_name]),
+            groups,
+            len(player_ids)
+        )
+        games = np.bincount(groups, minlength=len(player_ids))
+        logger.info(
+            f"Read historical stats. Table: '{table_name}', Players: '{len(player_ids)}', "
+            f"Without games: '{int(np.sum(games == 0))}', Rows: '{len(rows)}', "
+            f"AsOf: '{as_of_date}', SeasonOnly: '{season_only}'."
+        )
+        return totals / np.maximum(games, 1)[:, np.newaxis]
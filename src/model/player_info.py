@@ -1,5 +1,6 @@
 from datetime import timedelta
 
+from shared.constants.json import JSON as Keys
 from shared.logging_config import LoggingConfig
 from shared.utility import Utility
 
@@ -7,15 +8,46 @@ logger = LoggingConfig.get_logger(__name__)
 
 """
 Super class for representing a single player's stats set.
+
+A full season parses hundreds of thousands of these, so they keep their
+fields in __slots__ instead of a __dict__ and don't log individually; the
+bulk constructors log once per batch.
 """
 class PlayerInfo:
+    __slots__ = ("pim", "toi")
+
     def __init__(
             self,
             pim,
             toi):
         self.pim = pim
         self.toi = toi
-        logger.info("Inititializing PlayerInfo.")
+
+    """
+    Build a SkaterInfo or GoalieInfo from each player's JSON data.
+    """
+    @classmethod
+    def from_json_many(cls, players):
+        infos = [cls.from_json(player) for player in players]
+        logger.info(f"Created {cls.__name__}s from JSON. Count: '{len(infos)}'.")
+        return infos
+
+    """
+    The stats of every player in a decoded box score, as a dict of home and
+    away team to forwards, defense and goalies lists of SkaterInfo and
+    GoalieInfo.
+    """
+    @staticmethod
+    def from_box_score(box_score):
+        rosters = {}
+        for team_key in [Keys.home_team, Keys.away_team]:
+            roster = box_score[Keys.player_by_game_stats][team_key]
+            rosters[team_key] = {
+                Keys.forwards: SkaterInfo.from_json_many(roster[Keys.forwards]),
+                Keys.defense: SkaterInfo.from_json_many(roster[Keys.defense]),
+                Keys.goalies: GoalieInfo.from_json_many(roster[Keys.goalies])
+            }
+        return rosters
 
     @staticmethod
     def parse_toi(json_data):
@@ -23,16 +55,17 @@ class PlayerInfo:
         # TODO: additional validation here? Could API provide a non-zero value without minutes?
         if toi == 0:
             return 0
-        parsed = timedelta(hours=int(toi[:-3]), minutes=int(toi[-2:])).total_seconds()
-        logger.info(f"Parsed TOI for PlayerInfo. TOI: '{parsed}'.")
-
-        return parsed
+        return timedelta(hours=int(toi[:-3]), minutes=int(toi[-2:])).total_seconds()
 
 """
 Class to represent a single skater's stats set.
 """
 class SkaterInfo(PlayerInfo):
-    
+    __slots__ = (
+        "goals", "assists", "points", "plus_minus", "hits", "pp_goals", "sog",
+        "faceoff_win_pct", "blocked_shots", "giveaways", "takeaways"
+    )
+
     def __init__(
             self,
             goals,
@@ -61,7 +94,6 @@ class SkaterInfo(PlayerInfo):
         self.blocked_shots = blocked_shots
         self.giveaways = giveaways
         self.takeaways = takeaways
-        logger.info("Initialized SkaterInfo.")
 
     """
     Initialize a SkaterInfo object from JSON data
@@ -70,7 +102,7 @@ class SkaterInfo(PlayerInfo):
     def from_json(cls, json_data):
         # TODO: Need to gracefully handle missing data
 
-        obj = cls(
+        return cls(
             Utility.json_value_or_default(json_data, "goals"),
             Utility.json_value_or_default(json_data, "assists"),
             Utility.json_value_or_default(json_data, "points"),
@@ -85,9 +117,6 @@ class SkaterInfo(PlayerInfo):
             Utility.json_value_or_default(json_data, "giveaways"),
             Utility.json_value_or_default(json_data, "takeaways")
         )
-        logger.info(f"Created SkaterInfo from JSON. SkaterInfo: '{obj}'.")
-        
-        return obj
     
     """
     serialize the player data as a csv string
@@ -108,6 +137,12 @@ class SkaterInfo(PlayerInfo):
 Class to represent a single goalie's stats set.
 """
 class GoalieInfo(PlayerInfo):
+    __slots__ = (
+        "es_shots_against", "es_saves", "pp_shots_against", "pp_saves",
+        "sh_shots_against", "sh_saves", "save_shots_against", "save_pct",
+        "es_goals_against", "pp_goals_against", "sh_goals_against",
+        "goals_against", "shots_against", "saves"
+    )
 
     def __init__(
             self,
@@ -147,7 +182,6 @@ class GoalieInfo(PlayerInfo):
         # self.decision = decision
         self.shots_against = shots_against
         self.saves = saves
-        logger.info("Initialized GoalieInfo.")
 
     """
     Initialize a GoalieInfo object from JSON data
@@ -155,7 +189,7 @@ class GoalieInfo(PlayerInfo):
     @classmethod
     def from_json(cls, json_data):
         # TODO: Need to gracefully handle missing data
-        obj = cls(
+        return cls(
             *GoalieInfo.split_save_try_pair(
                 Utility.json_value_or_default(json_data, "evenStrengthShotsAgainst")
             ),
@@ -180,9 +214,6 @@ class GoalieInfo(PlayerInfo):
             Utility.json_value_or_default(json_data, "shotsAgainst"),
             Utility.json_value_or_default(json_data, "saves")
         )
-        logger.info("Created GoalieInfo from JSON..")
-        
-        return obj
     
     """
     Some goalies stats are represented as a save/try pair.  For example, see
@@ -0,0 +1,88 @@
+import numpy as np
+
+from shared.logging_config import LoggingConfig
+
+logger = LoggingConfig.get_logger(__name__)
+
+DefaultBatchSize = 5000
+
+"""
+Interface every roster summarizer implements.
+
+A summarizer turns games, given as (home roster, away roster) pairs in the
+box score 'playerByGameStats' shape, into a games by features array with
+summarize_many, in one call for the whole batch.  get_schema declares the
+name and dtype of each of its columns, so callers can label, store and
+cache the output without knowing the summarizer.  'version' is raised
+whenever the features change, data derived from an older version is then
+rebuilt.  'name' is the key the summarizer is registered under, see
+SummarizerRegistry.
+"""
+class Summarizer:
+    name = None
+    version = None
+
+    def summarize_many(self, games) -> np.ndarray:
+        raise NotImplementedError
+
+    """
+    (column name, NumPy dtype) of each column returned by summarize_many.
+    """
+    def get_schema(self):
+        raise NotImplementedError
+
+    """
+    Summarize any number of games batch_size at a time, so memory stays
+    bounded however many there are.  The result is checked against the
+    schema.
+    """
+    def summarize_batches(self, games, batch_size=DefaultBatchSize) -> np.ndarray:
+        schema = self.get_schema()
+        games = list(games)
+        batches = [
+            self.summarize_many(games[start:start + batch_size])
+            for start in range(0, len(games), batch_size)
+        ]
+        summaries = (
+            np.vstack(batches) if batches else np.zeros((0, len(schema)), dtype=np.float64)
+        )
+        if summaries.shape != (len(games), len(schema)):
+            # TODO: Shouldn't throw generic Exception
+            raise Exception(
+                f"Summarizer '{self.name}' returned {summaries.shape} for "
+                f"{len(games)} games and {len(schema)} columns."
+            )
+        logger.info(
+            f"Summarized games. Summarizer: '{self.name}', Games: '{len(games)}', "
+            f"Batches: '{len(batches)}'."
+        )
+        return summaries
+
+"""
+The summarizers that can be selected, by name.  Summarizers are registered
+by model.summarizers: the built in ones and those installed packages list
+as entry points, see register_plugins.  register can also decorate a class.
+"""
+class SummarizerRegistry:
+    _summarizers = {}
+
+    @staticmethod
+    def register(summarizer_class):
+        SummarizerRegistry._summarizers[summarizer_class.name] = summarizer_class
+        return summarizer_class
+
+    @staticmethod
+    def get(name):
+        summarizer_class = SummarizerRegistry._summarizers.get(name)
+        if summarizer_class is None:
+            # TODO: Shouldn't throw generic Exception
+            raise Exception("Unsupported summarizer specified.")
+        return summarizer_class
+
+    @staticmethod
+    def create(name) -> Summarizer:
+        return SummarizerRegistry.get(name)()
+
+    @staticmethod
+    def get_names():
+        return sorted(SummarizerRegistry._summarizers)
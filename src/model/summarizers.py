@@ -1,21 +1,58 @@
 from __future__ import annotations
 
 from enum import Enum
+from importlib.metadata import entry_points
 
-import model.average_player_summarizer
+from model.average_player_summarizer import AveragePlayerSummarizer
+from model.summarizer import SummarizerRegistry
+from shared.logging_config import LoggingConfig
 
+logger = LoggingConfig.get_logger(__name__)
 
-class Summarizers(str, Enum):
-    average_player_summarizer = "average"
+# Entry point group installed packages list their Summarizer classes under.
+PluginGroup = "nhlstats.summarizers"
+
+"""
+Register the summarizers that ship with the predictor.
+"""
+def register_builtin():
+    SummarizerRegistry.register(AveragePlayerSummarizer)
+
+"""
+Register the summarizers of installed packages, listed as entry points in
+PluginGroup, so they can be chosen without changing the predictor.  A
+plugin that fails to load is logged and left out.
+"""
+def register_plugins():
+    for entry_point in entry_points(group=PluginGroup):
+        try:
+            SummarizerRegistry.register(entry_point.load())
+        except Exception as e:
+            logger.exception(
+                f"Exception loading summarizer plugin. Name: '{entry_point.name}', "
+                f"Exception: '{str(e)}'.",
+                stack_info=True
+            )
+
+register_builtin()
+register_plugins()
+
+class SummarizerChoice(str, Enum):
 
     """
     Build a summarizer instance from the specified summarizer type.
     """
     @staticmethod
-    def get_summarizer(summarizer: Summarizers):
-        match summarizer:
-            case Summarizers.average_player_summarizer:
-                return model.average_player_summarizer.AveragePlayerSummarizer()
-            case _:
-                # TODO: Shouldn't throw generic Exception
-                raise Exception("Unsupported summarizer specified.")
\ No newline at end of file
+    def get_summarizer(summarizer: SummarizerChoice):
+        if summarizer is None:
+            # TODO: Shouldn't throw generic Exception
+            raise Exception("Unsupported summarizer specified.")
+        return SummarizerRegistry.create(Summarizers(summarizer).value)
+
+"""
+Summarizers that can be chosen on the command line, a member for each
+registered name.
+"""
+Summarizers = SummarizerChoice(
+    "Summarizers", {name: name for name in SummarizerRegistry.get_names()}
+)
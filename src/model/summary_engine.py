@@ -0,0 +1,300 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+How a stat is read: as a number, as time on ice ('mm:ss'), as both halves
+of a 'saves/shots' pair or as only the second half of one.
+"""
+Number = "number"
+TimeOnIce = "toi"
+Pair = "pair"
+PairTotal = "pairTotal"
+
+"""
+Stats summed for each group of skaters, in the order of the SkaterInfo
+constructor and the dataset headers.
+"""
+SkaterColumns = [
+    (Keys.goals, Number),
+    (Keys.assists, Number),
+    (Keys.points, Number),
+    (Keys.plus_minus, Number),
+    (Keys.pim, Number),
+    (Keys.hits, Number),
+    (Keys.power_play_goals, Number),
+    (Keys.sog, Number),
+    (Keys.faceoff_winning_pctg, Number),
+    (Keys.toi, TimeOnIce),
+    (Keys.blocked_shots, Number),
+    (Keys.giveaways, Number),
+    (Keys.takeaways, Number)
+]
+
+"""
+Stats summed for the goalies, in the order of the GoalieInfo constructor.
+Pairs fill two columns.
+"""
+GoalieColumns = [
+    (Keys.even_strength_shots_against, Pair),
+    (Keys.power_play_shots_against, Pair),
+    (Keys.shorthanded_shots_against, Pair),
+    (Keys.save_shots_against, PairTotal),
+    (Keys.save_pctg, Number),
+    (Keys.even_strength_goals_against, Number),
+    (Keys.power_play_goals_against, Number),
+    (Keys.shorthanded_goals_against, Number),
+    (Keys.pim, Number),
+    (Keys.goals_against, Number),
+    (Keys.toi, TimeOnIce),
+    (Keys.shots_against, Number),
+    (Keys.saves, Number)
+]
+
+"""
+Stats that are fractions or seconds rather than counts.
+"""
+FloatStats = {Keys.faceoff_winning_pctg, Keys.save_pctg, Keys.toi}
+
+SkaterWidth = len(SkaterColumns)
+GoalieWidth = sum(2 if kind == Pair else 1 for _, kind in GoalieColumns)
+# Forwards, defense and goalies.
+RosterWidth = 2 * SkaterWidth + GoalieWidth
+
+TimeOnIcePattern = r"^(?P<minutes>\d+):(?P<seconds>\d\d)$"
+PairPattern = r"^(?P<first>\d+)/(?P<second>\d+)$"
+
+"""
+Summarizes rosters with array operations instead of one object per player.
+
+The players of every roster in a batch are read into one matrix per kind,
+players by stats, tagged with the group they belong to: the forwards,
+defense or goalies of a roster.  Each group's summary is the column sums of
+its rows, taken for the whole batch at once.  A roster's summary is a row
+of RosterWidth values: the forwards', the defense's and the goalies'
+summaries, in the order of the dataset headers.
+
+Missing stats count as zero.  Time on ice is read the way PlayerInfo has
+always read it, with the minutes as hours and the seconds as minutes, so
+summaries match the data sets already written.
+"""
+class SummaryEngine:
+
+    """
+    Summaries of rosters in the box score 'playerByGameStats' shape, with
+    forwards, defense and goalies lists.  Stored stat rows, see
+    Repository.get_rosters, have the same shape.
+    """
+    @staticmethod
+    def summarize_rosters(rosters):
+        skaters = []
+        skater_groups = []
+        goalies = []
+        goalie_groups = []
+        for index, roster in enumerate(rosters):
+            for offset, group in enumerate([Keys.forwards, Keys.defense]):
+                players = roster[group]
+                skaters += players
+                skater_groups += [2 * index + offset] * len(players)
+            goalies += roster[Keys.goalies]
+            goalie_groups += [index] * len(roster[Keys.goalies])
+
+        logger.info(
+            f"Summarizing rosters. Rosters: '{len(rosters)}', Skaters: '{len(skaters)}', "
+            f"Goalies: '{len(goalies)}'."
+        )
+        return SummaryEngine.summarize_groups(
+            SummaryEngine.get_player_matrix(skaters, SkaterColumns),
+            np.array(skater_groups, dtype=np.int64),
+            SummaryEngine.get_player_matrix(goalies, GoalieColumns),
+            np.array(goalie_groups, dtype=np.int64),
+            len(rosters)
+        )
+
+    """
+    Summaries of games given as (home roster, away roster) pairs, one row of
+    the home then the away roster's summary per game.
+    """
+    @staticmethod
+    def summarize_games(games):
+        rosters = [roster for game in games for roster in game]
+        return SummaryEngine.summarize_rosters(rosters).reshape(-1, 2 * RosterWidth)
+
+    """
+    Summaries of stored games from their rows in the games, skater_stats and
+    goalie_stats tables as DataFrames, for example as read from an export,
+    see Exporter.read.  One row per row of 'games', in the same order, like
+    summarize_games.  Stat columns are read whole, no row is visited in
+    Python.
+    """
+    @staticmethod
+    def summarize_stat_tables(games, skaters, goalies):
+        game_index = {
+            name: np.asarray(games[name].to_numpy(), dtype=np.int64)
+            for name in [Keys.game_id, Keys.home_team_id]
+        }
+        skater_rosters = SummaryEngine.get_roster_index(game_index, skaters)
+        goalie_rosters = SummaryEngine.get_roster_index(game_index, goalies)
+        is_defense = (skaters[Keys.position].to_numpy() == "D").astype(np.int64)
+        skater_groups = np.where(skater_rosters < 0, -1, 2 * skater_rosters + is_defense)
+
+        logger.info(
+            f"Summarizing stored games. Games: '{len(games)}', Skaters: '{len(skaters)}', "
+            f"Goalies: '{len(goalies)}'."
+        )
+        return SummaryEngine.summarize_groups(
+            SummaryEngine.get_matrix(skaters, SkaterColumns),
+            skater_groups,
+            SummaryEngine.get_matrix(goalies, GoalieColumns),
+            goalie_rosters,
+            2 * len(games)
+        ).reshape(-1, 2 * RosterWidth)
+
+    """
+    The roster each stat row belongs to, 2 * the game's position in 'games'
+    for the home team and one more for the away team, or -1 for rows of
+    games that are not in 'games'.
+    """
+    @staticmethod
+    def get_roster_index(game_index, rows):
+        order = np.argsort(game_index[Keys.game_id], kind="stable")
+        sorted_ids = game_index[Keys.game_id][order]
+        row_ids = np.asarray(rows[Keys.game_id].to_numpy(), dtype=np.int64)
+        if len(sorted_ids) == 0:
+            return np.full(len(row_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(sorted_ids, row_ids), len(sorted_ids) - 1)
+        found = sorted_ids[positions] == row_ids
+        games = order[positions]
+        is_away = (
+            np.asarray(rows[Keys.team_id].to_numpy(), dtype=np.int64)
+            != game_index[Keys.home_team_id][games]
+        ).astype(np.int64)
+        return np.where(found, 2 * games + is_away, -1)
+
+    """
+    The players by stats matrix of 'columns', read from a list of player
+    dicts.  Missing, None and 0 values are zero.
+    """
+    @staticmethod
+    def get_player_matrix(players, columns):
+        values = []
+        for key, kind in columns:
+            column = [player.get(key) or 0 for player in players]
+            if kind == Number:
+                values.append(column)
+            elif kind == TimeOnIce:
+                values.append([SummaryEngine.parse_toi(value) for value in column])
+            else:
+                pairs = [SummaryEngine.parse_pair(value) for value in column]
+                if kind == Pair:
+                    values.append([pair[0] for pair in pairs])
+                values.append([pair[1] for pair in pairs])
+        return np.array(values, dtype=np.float64).T.reshape(len(players), len(values))
+
+    @staticmethod
+    def parse_toi(value):
+        if not isinstance(value, str) or ":" not in value:
+            return 0
+        return int(value[:-3]) * 3600 + int(value[-2:]) * 60
+
+    @staticmethod
+    def parse_pair(value):
+        if not isinstance(value, str) or "/" not in value:
+            return (0, 0)
+        first, second = value.split("/")
+        return (int(first), int(second))
+
+    """
+    The players by stats matrix of 'columns', read from a DataFrame of stat
+    rows a column at a time.
+    """
+    @staticmethod
+    def get_matrix(values, columns):
+        rows = len(values)
+        width = sum(2 if kind == Pair else 1 for _, kind in columns)
+        matrix = np.zeros((rows, width), dtype=np.float64)
+        position = 0
+        for key, kind in columns:
+            column = values[key]
+            if kind == Number:
+                matrix[:, position] = pc.fill_null(
+                    pa.array(column, type=pa.float64(), from_pandas=True), 0
+                ).to_numpy()
+            elif kind == TimeOnIce:
+                minutes, seconds = SummaryEngine.get_parts(column, TimeOnIcePattern)
+                matrix[:, position] = minutes * 3600 + seconds * 60
+            else:
+                first, second = SummaryEngine.get_parts(column, PairPattern)
+                if kind == Pair:
+                    matrix[:, position] = first
+                    position += 1
+                matrix[:, position] = second
+            position += 1
+        return matrix
+
+    """
+    The two numbers captured by 'pattern' from each text value, as arrays.
+    Values that don't match are zero.
+    """
+    @staticmethod
+    def get_parts(column, pattern):
+        text = pc.cast(pa.array(column, from_pandas=True), pa.string())
+        parts = pc.extract_regex(text, pattern)
+        return [
+            pc.fill_null(pc.cast(pc.struct_field(parts, [index]), pa.float64()), 0).to_numpy()
+            for index in range(2)
+        ]
+
+    """
+    Sum the skater and goalie rows of each group into RosterWidth columns
+    per roster.  Skater groups are 2 * roster for forwards and one more for
+    defense, goalie groups are the roster.  Rows in group -1 are skipped.
+    """
+    @staticmethod
+    def summarize_groups(skaters, skater_groups, goalies, goalie_groups, roster_count):
+        skater_sums = SummaryEngine.sum_groups(skaters, skater_groups, 2 * roster_count)
+        goalie_sums = SummaryEngine.sum_groups(goalies, goalie_groups, roster_count)
+        return np.hstack([
+            skater_sums.reshape(roster_count, 2 * SkaterWidth),
+            goalie_sums
+        ])
+
+    @staticmethod
+    def sum_groups(matrix, groups, group_count):
+        keep = groups >= 0
+        groups = groups[keep]
+        matrix = matrix[keep]
+        return np.column_stack([
+            np.bincount(groups, weights=matrix[:, column], minlength=group_count)
+            for column in range(matrix.shape[1])
+        ]) if matrix.shape[1] else np.zeros((group_count, 0))
+
+    """
+    Whether each of a roster summary's RosterWidth values is a fraction or
+    seconds rather than a count.
+    """
+    @staticmethod
+    def get_float_columns():
+        skaters = [key in FloatStats for key, _ in SkaterColumns]
+        goalies = []
+        for key, kind in GoalieColumns:
+            goalies += [key in FloatStats] * (2 if kind == Pair else 1)
+        return skaters + skaters + goalies
+
+    """
+    A roster summary as Python numbers, counts as int and the rest as
+    float.  Fractions and seconds are floats even when they are zero.
+    """
+    @staticmethod
+    def to_values(summary):
+        return [
+            float(value) if is_float else int(value)
+            for value, is_float in zip(summary.tolist(), FloatColumns)
+        ]
+
+FloatColumns = SummaryEngine.get_float_columns()
@@ -1,3 +1,4 @@
+import time
 from datetime import timedelta
 from pickle import load
 
@@ -27,9 +28,14 @@ class PredictLinearRegression:
     ):
         data = []
         results_table = [["Game", "Predicted", "Actual"]]
-        with open(model_file_name, "rb") as file:
-            model = load(file)
-
+        profiler = execution_context.profiler
+        with profiler.stage("model load"):
+            with open(model_file_name, "rb") as file:
+                model = load(file)
+
+        # Timed by hand, the number of games is only known afterwards.
+        wall = time.perf_counter()
+        cpu = time.process_time()
         if date is not None:
             date = parser.parse(date)
             games, number_of_games = (
@@ -42,6 +48,12 @@ class PredictLinearRegression:
         else:
             logger.error("No valid date option supplied")
             return
+        profiler.record(
+            "schedule fetch",
+            time.perf_counter() - wall,
+            time.process_time() - cpu,
+            number_of_games
+        )
 
         if (number_of_games <= 0):
             logger.warning("No games on the schedule for chosen date(s).")
@@ -68,7 +80,8 @@ class PredictLinearRegression:
         targetsColumnName = df.columns[len(df.columns)-1]
         actuals = df[targetsColumnName].to_list()
         df.drop(targetsColumnName, axis=1, inplace=True)
-        data_pred = model.predict(df)
+        with profiler.stage("predict", len(df)):
+            data_pred = model.predict(df)
 
         if len(data_pred) != len(actuals):
             logger.error("Predictions and actual values vary in length")
@@ -4,6 +4,38 @@ class Database:
     players_table_name = "players"
     games_table_name = "games"
     meta_table_name = "meta"
-    
+    watermarks_table_name = "watermarks"
+    player_refresh_table_name = "player_refresh"
+    build_plan_table_name = "build_plan"
+    player_index_table_name = "player_index"
+    player_seasons_table_name = "player_seasons"
 
+    """
+    Schema versions, stored in the database's user_version:
+    1 - SqliteDict tables, stat tables keyed by a sequential row number.
+    2 - SqliteDict tables, stat tables keyed by game ID and player ID.
+    3 - Typed relational tables, see Repository.
+    4 - Adds the watermarks table used by incremental builds.
+    5 - Adds the player_refresh table.
+    6 - Adds the build_plan table used to resume interrupted builds.
+    7 - Adds the player_index and player_seasons tables.
+    8 - Adds triggers keeping row counters in the meta table.
+    """
+    schema_version = 8
+    legacy_table_prefix = "legacy_"
 
+    """
+    Columns of the meta table.
+    """
+    name_column = "name"
+    value_column = "value"
+
+    """
+    Prefixes of the counters kept in the meta table, followed by a table name
+    or, for season_games_prefix, a season.  season_updated_prefix is followed
+    by a season and holds the time a game of the season was last written.
+    """
+    row_count_prefix = "rowCount."
+    data_bytes_prefix = "dataBytes."
+    season_games_prefix = "seasonGames."
+    season_updated_prefix = "seasonUpdated."
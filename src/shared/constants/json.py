@@ -6,10 +6,12 @@ class JSON:
     Game related keys.
     """
     games = "games"
+    game_week = "gameWeek"
     id = "id"
     season = "season"
     game_type = "gameType"
     game_state = "gameState"
+    game_date = "gameDate"
     player_by_game_stats = "playerByGameStats"
     
     
@@ -18,6 +20,27 @@ class JSON:
     forwards = "forwards"
     defense = "defense"
     goalies = "goalies"
+    score = "score"
+    home_team_id = "homeTeamId"
+    away_team_id = "awayTeamId"
+    home_score = "homeScore"
+    away_score = "awayScore"
+    abbrev = "abbrev"
+    last_game_date = "lastGameDate"
+    last_game_id = "lastGameId"
+    first_game_date = "firstGameDate"
+    first_game_id = "firstGameId"
+    last_seen = "lastSeen"
+    complete_seasons = "completeSeasons"
+    retry_games = "retryGames"
+    build_checkpoint = "buildCheckpoint"
+    stage = "stage"
+    seasons = "seasons"
+    incremental = "incremental"
+    started = "started"
+    full_seasons = "fullSeasons"
+    failed_seasons = "failedSeasons"
+    watermark_seasons = "watermarkSeasons"
 
     """
     Stat related keys
@@ -55,9 +78,13 @@ class JSON:
     """
     player_id = "playerId"
     game_id = "gameId"
+    team_id = "teamId"
+    position = "position"
     is_Active = "isActive"
     first_name = "firstName"
     last_name = "lastName"
     current_team_id = "currentTeamId"
     height_in_cm = "heightInCentimeters"
-    weight_in_kg = "weightInKilograms"
\ No newline at end of file
+    weight_in_kg = "weightInKilograms"
+    last_refreshed = "lastRefreshed"
+    ingest_history = "ingestHistory"
\ No newline at end of file
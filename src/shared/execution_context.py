@@ -1,15 +1,25 @@
+import threading
 from pathlib import Path
 
 import typer
 from nhlpy import NHLClient
-from sqlitedict import SqliteDict
 
+from shared.http_cache import CachingHttpClient, ResponseCache
+from shared.http_redirect import RedirectingHttpClient
+from shared.payload_archive import PayloadArchive
+from shared.player_stats_cache import PlayerStatsCache
+from shared.profiler import Profiler, ProfilingHttpClient
+from shared.rate_limiter import RateLimitedHttpClient, RateLimiter
+from shared.repository import Repository
 from shared.utility import Utility
 
 
 class ExecutionContext:
     _app_name = "nhlpredictor"
     _app_dir_set = False
+    # Guards the lazily created shared objects, which may first be asked for
+    # by several worker threads at once.
+    _lock = threading.RLock()
     
     def __new__(cls):
         if not getattr(cls, '_instance', None):
@@ -19,9 +29,166 @@ class ExecutionContext:
     @property
     def client(self):
         if getattr(self, '_client', None) is None:
-            self._client = NHLClient()
+            with ExecutionContext._lock:
+                if getattr(self, '_client', None) is None:
+                    self._client = self.create_client()
         return self._client
+
+    """
+    An NHLClient whose requests go through the redirect, rate limiting and
+    caching layers selected by the settings.
+    """
+    def create_client(self):
+        client = NHLClient()
+        http_client = client._http_client
+        if self.api_base_url:
+            http_client = RedirectingHttpClient(http_client, self.api_base_url)
+        # Below the rate limiter, so each attempt is timed on its own and
+        # time spent waiting for the limiter is not counted as latency.
+        if self.profile:
+            http_client = ProfilingHttpClient(http_client, self.profiler)
+        http_client = RateLimitedHttpClient(http_client, self.rate_limiter)
+        # Responses from a stand-in API are never cached, so they can't be
+        # mistaken for real ones later.  Cache hits don't count against the
+        # rate limit.
+        if self.use_cache and not self.api_base_url:
+            http_client = CachingHttpClient(http_client, self.response_cache)
+        Utility.set_http_client(client, http_client)
+        return client
+
+    @property
+    def use_cache(self) -> bool:
+        return getattr(self, '_use_cache', True)
+
+    @use_cache.setter
+    def use_cache(self, value: bool):
+        self._use_cache = value
+
+    """
+    Read training data through the feature cache, see FeatureCache.
+    """
+    @property
+    def use_feature_cache(self) -> bool:
+        return getattr(self, '_use_feature_cache', True)
+
+    @use_feature_cache.setter
+    def use_feature_cache(self, value: bool):
+        self._use_feature_cache = value
+
+    """
+    Send NHL API requests to this host instead, see RedirectingHttpClient.
+    """
+    @property
+    def api_base_url(self) -> str:
+        return getattr(self, '_api_base_url', None)
+
+    @api_base_url.setter
+    def api_base_url(self, value: str):
+        self._api_base_url = value
+
+    """
+    Shared by every request made through 'client'.  Its concurrency cap
+    follows the 'concurrency' setting at the time it is created.
+    """
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        if getattr(self, '_rate_limiter', None) is None:
+            with ExecutionContext._lock:
+                if getattr(self, '_rate_limiter', None) is None:
+                    self._rate_limiter = RateLimiter(
+                        self.max_rps, self.concurrency, self.max_retries
+                    )
+        return self._rate_limiter
+
+    """
+    Most requests per second to send to the NHL API, None for no limit.
+    """
+    @property
+    def max_rps(self) -> float:
+        return getattr(self, '_max_rps', None)
+
+    @max_rps.setter
+    def max_rps(self, value: float):
+        if value is not None and value <= 0:
+            # TODO: shouldn't use general excdeption
+            raise Exception("Max requests per second must be positive.")
+        self._max_rps = value
+
+    @property
+    def max_retries(self) -> int:
+        return getattr(self, '_max_retries', 4)
+
+    @max_retries.setter
+    def max_retries(self, value: int):
+        if value < 0:
+            # TODO: shouldn't use general excdeption
+            raise Exception("Max retries must not be negative.")
+        self._max_retries = value
+
+    @property
+    def profiler(self) -> Profiler:
+        if getattr(self, '_profiler', None) is None:
+            with ExecutionContext._lock:
+                if getattr(self, '_profiler', None) is None:
+                    self._profiler = Profiler()
+        return self._profiler
+
+    """
+    Whether to profile the command, see Profiler.  Must be set before the
+    client is first used for API requests to be timed.
+    """
+    @property
+    def profile(self) -> bool:
+        return self.profiler.enabled
+
+    @profile.setter
+    def profile(self, value: bool):
+        self.profiler.enabled = value
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        if getattr(self, '_response_cache', None) is None:
+            with ExecutionContext._lock:
+                if getattr(self, '_response_cache', None) is None:
+                    self._response_cache = ResponseCache()
+        return self._response_cache
     
+    """
+    Keep the raw box scores and player profiles fetched by builds, see
+    PayloadArchive.
+    """
+    @property
+    def use_archive(self) -> bool:
+        return getattr(self, '_use_archive', True)
+
+    @use_archive.setter
+    def use_archive(self, value: bool):
+        self._use_archive = value
+
+    @property
+    def payload_archive(self) -> PayloadArchive:
+        if getattr(self, '_payload_archive', None) is None:
+            with ExecutionContext._lock:
+                if getattr(self, '_payload_archive', None) is None:
+                    self._payload_archive = PayloadArchive()
+        return self._payload_archive
+
+    """
+    Player career stats shared by every subsystem of the run, backed by the
+    payload archive when it is in use.  Active players' entries live for
+    'player_max_age' hours, see PlayerStatsCache.
+    """
+    @property
+    def player_stats_cache(self) -> PlayerStatsCache:
+        if getattr(self, '_player_stats_cache', None) is None:
+            with ExecutionContext._lock:
+                if getattr(self, '_player_stats_cache', None) is None:
+                    self._player_stats_cache = PlayerStatsCache(
+                        max_age=self.player_max_age * 60 * 60,
+                        archive=self.payload_archive if self.use_archive else None
+                    )
+        return self._player_stats_cache
+
     @property
     def summarizer_type(self):
         return self._summarizer
@@ -33,7 +200,7 @@ class ExecutionContext:
     @property
     def database(self):
         if getattr(self, '_database', None) is None:
-            self._database = SqliteDict(Utility.get_db_name())
+            self._database = Repository()
         return self._database
     
     @property
@@ -52,6 +219,82 @@ class ExecutionContext:
     def allow_update(self, value: bool):
         self._allow_update = value
 
+    @property
+    def incremental(self) -> bool:
+        return getattr(self, '_incremental', False)
+
+    @incremental.setter
+    def incremental(self, value: bool):
+        self._incremental = value
+
+    @property
+    def concurrency(self) -> int:
+        return getattr(self, '_concurrency', 1)
+
+    @concurrency.setter
+    def concurrency(self, value: int):
+        if value < 1:
+            # TODO: shouldn't use general excdeption
+            raise Exception("Concurrency must be at least 1.")
+        self._concurrency = value
+
+    @property
+    def batch_size(self) -> int:
+        return getattr(self, '_batch_size', 1)
+
+    @batch_size.setter
+    def batch_size(self, value: int):
+        if value < 1:
+            # TODO: shouldn't use general excdeption
+            raise Exception("Batch size must be at least 1.")
+        self._batch_size = value
+
+    """
+    Number of worker processes a sharded build may run at once.  1 builds
+    every season in this process.
+    """
+    @property
+    def processes(self) -> int:
+        return getattr(self, '_processes', 1)
+
+    @processes.setter
+    def processes(self, value: int):
+        if value < 1:
+            # TODO: shouldn't use general excdeption
+            raise Exception("Processes must be at least 1.")
+        self._processes = value
+
+    """
+    Player profiles refreshed more recently than this many hours ago are not
+    fetched again.
+    """
+    @property
+    def player_max_age(self) -> int:
+        return getattr(self, '_player_max_age', 24)
+
+    @player_max_age.setter
+    def player_max_age(self, value: int):
+        if value < 0:
+            # TODO: shouldn't use general excdeption
+            raise Exception("Player max age must not be negative.")
+        self._player_max_age = value
+
+    @property
+    def refresh_all_players(self) -> bool:
+        return getattr(self, '_refresh_all_players', False)
+
+    @refresh_all_players.setter
+    def refresh_all_players(self, value: bool):
+        self._refresh_all_players = value
+
+    @property
+    def refresh_seen_players(self) -> bool:
+        return getattr(self, '_refresh_seen_players', False)
+
+    @refresh_seen_players.setter
+    def refresh_seen_players(self, value: bool):
+        self._refresh_seen_players = value
+
     @property
     def app_dir(self) -> Path:
         if self._app_dir is None:
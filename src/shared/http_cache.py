@@ -0,0 +1,262 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+import httpx
+from ansimarkup import ansiprint as print
+
+from model.game_state import GameState
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+How long, in seconds, to keep a response that describes a game in each
+GameState.  None means the response never expires.
+"""
+GameStateTTL = {
+    GameState.Future: 60 * 60,
+    GameState.Pregame: 5 * 60,
+    GameState.Live: 30,
+    GameState.Final: 60 * 60,
+    GameState.Official: None
+}
+
+# Player profiles change at most daily while a player is active.
+ActivePlayerTTL = 24 * 60 * 60
+DefaultTTL = 60 * 60
+DefaultMaxBytes = 1024 * 1024 * 1024
+
+"""
+Persistent cache of NHL API responses, stored in its own SQLite file.
+
+Entries are addressed by a hash of the endpoint, resource and query
+parameters.  How long an entry lives depends on the data it holds, see
+get_ttl.  When the cache grows past max_bytes the least recently used
+entries are evicted.  Safe to use from several threads at once.
+"""
+class ResponseCache:
+
+    def __init__(self, db_name=None, max_bytes=DefaultMaxBytes):
+        self.db_name = db_name if db_name is not None else Utility.get_cache_name()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.db_name, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "url TEXT NOT NULL, "
+            "body BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "created REAL NOT NULL, "
+            "expires REAL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access "
+            "ON responses (last_access)"
+        )
+        self._total_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_url(endpoint, resource, query_params=None):
+        url = f"{endpoint.value}{resource}"
+        if query_params:
+            url = f"{url}?{urlencode(sorted(query_params.items()))}"
+        return url
+
+    @staticmethod
+    def make_key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    """
+    Number of seconds a response may be cached for, or None if it never
+    changes.  Box scores are cached according to their GameState, schedules
+    are immutable once every game on them is official, and player
+    profiles are immutable once the player has retired.
+    """
+    @staticmethod
+    def get_ttl(payload):
+        if not isinstance(payload, dict):
+            return DefaultTTL
+        if Keys.game_state in payload:
+            return ResponseCache.get_game_state_ttl(payload[Keys.game_state])
+        games = payload.get(Keys.games)
+        if Keys.game_week in payload:
+            games = [
+                game for day in payload[Keys.game_week]
+                for game in day.get(Keys.games, [])
+            ]
+        if isinstance(games, list) and games:
+            ttls = [
+                ResponseCache.get_game_state_ttl(game.get(Keys.game_state))
+                for game in games
+            ]
+            if all(ttl is None for ttl in ttls):
+                return None
+            return min(ttl for ttl in ttls if ttl is not None)
+        if Keys.is_Active in payload:
+            return ActivePlayerTTL if payload[Keys.is_Active] else None
+        return DefaultTTL
+
+    @staticmethod
+    def get_game_state_ttl(game_state):
+        try:
+            return GameStateTTL[GameState(game_state)]
+        except ValueError:
+            # Unknown states (e.g. 'CRIT' late in close games) are live games.
+            return GameStateTTL[GameState.Live]
+
+    def get(self, url):
+        now = time.time()
+        key = ResponseCache.make_key(url)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, url, body, ttl):
+        now = time.time()
+        key = ResponseCache.make_key(url)
+        expires = now + ttl if ttl is not None else None
+        with self._lock:
+            previous = self._connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, body, size, created, expires, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, body, len(body), now, expires, now)
+            )
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(self.max_bytes)
+
+    """
+    Remove expired entries, then evict least recently used entries until the
+    cache fits in max_bytes.  Returns the number of entries removed.
+    """
+    def prune(self, max_bytes=None):
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        with self._lock:
+            removed = self._connection.execute(
+                "DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?",
+                (time.time(),)
+            ).rowcount
+            self._total_bytes = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            removed += self._evict(max_bytes)
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        logger.info(f"Pruned response cache. Entries removed: '{removed}'.")
+        return removed
+
+    def clear(self):
+        with self._lock:
+            removed = self._connection.execute("DELETE FROM responses").rowcount
+            self._total_bytes = 0
+            self._connection.execute("VACUUM")
+        logger.info(f"Cleared response cache. Entries removed: '{removed}'.")
+        return removed
+
+    def _evict(self, max_bytes):
+        removed = 0
+        rows = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall()
+        for key, size in rows:
+            if self._total_bytes <= max_bytes:
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            entries, total_bytes, immutable, expired = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), "
+                "COALESCE(SUM(expires IS NULL), 0), "
+                "COALESCE(SUM(expires IS NOT NULL AND expires <= ?), 0) "
+                "FROM responses",
+                (now,)
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "maxBytes": self.max_bytes,
+            "immutableEntries": immutable,
+            "expiredEntries": expired,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def report(self):
+        stats = self.stats()
+        print("\n<b><green>RESPONSE CACHE:</green></b>")
+        Utility.print_table([
+            ["Entries", str(stats["entries"])],
+            ["Permanent entries", str(stats["immutableEntries"])],
+            ["Expired entries", str(stats["expiredEntries"])],
+            ["Size (MB)", f"{stats['bytes'] / 1024 / 1024:.1f}"],
+            ["Max size (MB)", f"{stats['maxBytes'] / 1024 / 1024:.1f}"]
+        ])
+        print("\n")
+
+"""
+Drop-in replacement for the nhlpy HttpClient that answers requests from a
+ResponseCache when it can and stores successful responses otherwise.
+"""
+class CachingHttpClient:
+
+    def __init__(self, http_client, cache: ResponseCache):
+        self._http_client = http_client
+        self._config = http_client._config
+        self.cache = cache
+
+    def get(self, endpoint, resource, query_params=None) -> httpx.Response:
+        url = ResponseCache.make_url(endpoint, resource, query_params)
+        body = self.cache.get(url)
+        if body is not None:
+            logger.info(f"Response cache hit. Url: '{url}'.")
+            return httpx.Response(
+                200,
+                content=body,
+                headers={"content-type": "application/json"},
+                request=httpx.Request("GET", url)
+            )
+
+        response = self._http_client.get(
+            endpoint=endpoint, resource=resource, query_params=query_params
+        )
+        try:
+            ttl = ResponseCache.get_ttl(response.json())
+        except ValueError:
+            return response
+        self.cache.put(url, response.content, ttl)
+        return response
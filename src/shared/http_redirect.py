@@ -0,0 +1,37 @@
+from urllib.parse import urlparse
+
+import httpx
+
+from shared.logging_config import LoggingConfig
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+Drop-in replacement for the nhlpy HttpClient that sends every request to a
+different host, for example the mock API started by 'serve-mock'.  The path
+of each NHL endpoint is kept, so 'https://api-web.nhle.com/v1/schedule/now'
+becomes '<base_url>/v1/schedule/now'.  Connections are pooled and shared
+between threads.
+"""
+class RedirectingHttpClient:
+
+    def __init__(self, http_client, base_url):
+        self._http_client = http_client
+        self._config = http_client._config
+        self.base_url = base_url.rstrip("/")
+        self._session = httpx.Client(
+            timeout=self._config.timeout,
+            follow_redirects=self._config.follow_redirects
+        )
+        logger.info(f"Redirecting NHL API requests. BaseUrl: '{self.base_url}'.")
+
+    def get_url(self, endpoint, resource):
+        return f"{self.base_url}{urlparse(endpoint.value).path}{resource}"
+
+    def get(self, endpoint, resource, query_params=None) -> httpx.Response:
+        response = self._session.get(
+            url=self.get_url(endpoint, resource), params=query_params
+        )
+        # Raise the same exceptions as the NHL API client would.
+        self._http_client._handle_response(response, resource)
+        return response
@@ -1,9 +1,11 @@
 import logging
+import multiprocessing
 
 from pythonjsonlogger import jsonlogger
 
 
 class LoggingConfig:
+    _log_started = False
 
     @staticmethod
     def get_logger(name):
@@ -12,7 +14,13 @@ class LoggingConfig:
 
         # If logger with name was already created, don't muck with the handlers
         if not logger.handlers:
-            handler = logging.FileHandler("buildData.log", 'w+')
+            # The log is started afresh once per run.  It is then only ever
+            # appended to, so worker processes of a sharded build can share
+            # it with the parent.
+            if multiprocessing.parent_process() is None and not LoggingConfig._log_started:
+                open("buildData.log", 'w').close()
+                LoggingConfig._log_started = True
+            handler = logging.FileHandler("buildData.log", 'a')
             formatter = jsonlogger.JsonFormatter("%(asctime)s %(name)s %(levelname)s %(message)s")
             handler.setFormatter(formatter)
             logger.addHandler(handler)
@@ -0,0 +1,259 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import zstandard
+from ansimarkup import ansiprint as print
+
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility
+
+logger = LoggingConfig.get_logger(__name__)
+
+BoxScoreKind = "boxscore"
+PlayerKind = "player"
+
+# Payloads of a kind stored before its dictionary is trained from them.
+TrainingSamples = 200
+DictionaryBytes = 112 * 1024
+# Payloads are compressed once, on the fetch threads while they wait on the
+# network, and read back many times, so a slower, smaller level pays off.
+CompressionLevel = 9
+
+"""
+Permanent archive of the raw box score and player profile payloads fetched
+from the NHL API, stored in its own SQLite file, so the data set can be
+derived again from them without downloading anything, see 'rebuild'.
+
+Payloads are keyed by kind and game or player ID; fetching one again
+replaces it.  They are stored as compact JSON compressed with zstd.  The
+payloads of a kind share most of their structure, so once TrainingSamples of
+a kind are stored a compression dictionary is trained from them and used
+for every payload of the kind from then on, which compresses them much
+better than zstd can on its own.  Safe to use from several threads at once.
+"""
+class PayloadArchive:
+
+    def __init__(self, db_name=None):
+        self.db_name = db_name if db_name is not None else Utility.get_archive_name()
+        # Reentrant, training a dictionary looks it up with the lock held.
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._dictionaries = {}
+        self._connection = sqlite3.connect(
+            self.db_name, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS payloads ("
+            "kind TEXT NOT NULL, "
+            "id INTEGER NOT NULL, "
+            "season INTEGER, "
+            "dictionary INTEGER, "
+            "body BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "archived TEXT NOT NULL, "
+            "PRIMARY KEY (kind, id))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS dictionaries ("
+            "id INTEGER PRIMARY KEY, "
+            "kind TEXT NOT NULL, "
+            "data BLOB NOT NULL, "
+            "created TEXT NOT NULL)"
+        )
+
+    def put_box_score(self, box_score):
+        self.put(BoxScoreKind, box_score[Keys.id], box_score, box_score.get(Keys.season))
+
+    def get_box_score(self, game_id):
+        return self.get(BoxScoreKind, game_id)
+
+    def put_player(self, player_id, payload):
+        self.put(PlayerKind, player_id, payload)
+
+    def get_player(self, player_id):
+        return self.get(PlayerKind, player_id)
+
+    def get_player_entry(self, player_id):
+        return self.get_entry(PlayerKind, player_id)
+
+    def put(self, kind, id, payload, season=None):
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        dictionary_id = self.get_dictionary_id(kind)
+        body = self.get_compressor(dictionary_id).compress(raw)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO payloads "
+                "(kind, id, season, dictionary, body, size, archived) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind, id, season, dictionary_id, body, len(raw),
+                    datetime.now(timezone.utc).isoformat()
+                )
+            )
+            if dictionary_id is None:
+                self.train_dictionary(kind)
+
+    """
+    The archived payload, or None if there is none.
+    """
+    def get(self, kind, id):
+        entry = self.get_entry(kind, id)
+        return entry[0] if entry is not None else None
+
+    """
+    The archived payload and the time it was archived, or None if there is
+    none.
+    """
+    def get_entry(self, kind, id):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT dictionary, body, archived FROM payloads WHERE kind = ? AND id = ?",
+                (kind, id)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(self.get_decompressor(row[0]).decompress(row[1])), row[2]
+
+    """
+    (ID, season, archived time) of every payload of a kind, in ID order.
+    """
+    def get_entries(self, kind):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT id, season, archived FROM payloads WHERE kind = ? ORDER BY id",
+                (kind,)
+            ).fetchall()
+
+    """
+    Train the kind's dictionary once enough payloads are stored without one,
+    and compress those payloads again with it.  Called with the lock held.
+    """
+    def train_dictionary(self, kind):
+        rows = self._connection.execute(
+            "SELECT id, body FROM payloads WHERE kind = ? AND dictionary IS NULL",
+            (kind,)
+        ).fetchall()
+        if len(rows) < TrainingSamples:
+            return
+
+        decompressor = self.get_decompressor(None)
+        samples = {id: decompressor.decompress(body) for id, body in rows}
+        data = zstandard.train_dictionary(DictionaryBytes, list(samples.values()))
+        self._connection.execute("BEGIN")
+        dictionary_id = self._connection.execute(
+            "INSERT INTO dictionaries (kind, data, created) VALUES (?, ?, ?)",
+            (kind, data.as_bytes(), datetime.now(timezone.utc).isoformat())
+        ).lastrowid
+        compressor = self.get_compressor(dictionary_id)
+        self._connection.executemany(
+            "UPDATE payloads SET dictionary = ?, body = ? WHERE kind = ? AND id = ?",
+            [
+                (dictionary_id, compressor.compress(raw), kind, id)
+                for id, raw in samples.items()
+            ]
+        )
+        self._connection.execute("COMMIT")
+        self._dictionaries[kind] = dictionary_id
+        logger.info(
+            f"Trained payload dictionary. Kind: '{kind}', Id: '{dictionary_id}', "
+            f"Samples: '{len(samples)}'."
+        )
+
+    """
+    The newest dictionary of a kind, or None if none has been trained yet.
+    Another process may train it, so the lookup repeats until one is found.
+    """
+    def get_dictionary_id(self, kind):
+        dictionary_id = self._dictionaries.get(kind)
+        if dictionary_id is None:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT MAX(id) FROM dictionaries WHERE kind = ?", (kind,)
+                ).fetchone()
+            dictionary_id = row[0]
+            if dictionary_id is not None:
+                self._dictionaries[kind] = dictionary_id
+        return dictionary_id
+
+    def get_dictionary(self, dictionary_id):
+        with self._lock:
+            data = self._connection.execute(
+                "SELECT data FROM dictionaries WHERE id = ?", (dictionary_id,)
+            ).fetchone()[0]
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dictionary.precompute_compress(level=CompressionLevel)
+        return dictionary
+
+    """
+    zstd compressors and decompressors can't be shared between threads, each
+    thread keeps its own for every dictionary it uses.
+    """
+    def get_compressor(self, dictionary_id):
+        return self.get_codec("compressors", dictionary_id, lambda dictionary: (
+            zstandard.ZstdCompressor(level=CompressionLevel, dict_data=dictionary)
+        ))
+
+    def get_decompressor(self, dictionary_id):
+        return self.get_codec("decompressors", dictionary_id, lambda dictionary: (
+            zstandard.ZstdDecompressor(dict_data=dictionary)
+        ))
+
+    def get_codec(self, name, dictionary_id, create):
+        codecs = getattr(self._local, name, None)
+        if codecs is None:
+            codecs = {}
+            setattr(self._local, name, codecs)
+        codec = codecs.get(dictionary_id)
+        if codec is None:
+            dictionary = (
+                self.get_dictionary(dictionary_id) if dictionary_id is not None else None
+            )
+            codec = codecs[dictionary_id] = create(dictionary)
+        return codec
+
+    def stats(self):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT kind, COUNT(*), COALESCE(SUM(size), 0), "
+                "COALESCE(SUM(LENGTH(body)), 0), COUNT(DISTINCT season), "
+                "COALESCE(SUM(dictionary IS NOT NULL), 0) "
+                "FROM payloads GROUP BY kind ORDER BY kind"
+            ).fetchall()
+            dictionaries = dict(self._connection.execute(
+                "SELECT kind, COUNT(*) FROM dictionaries GROUP BY kind"
+            ).fetchall())
+        return {
+            kind: {
+                "entries": entries,
+                "rawBytes": raw_bytes,
+                "storedBytes": stored_bytes,
+                "seasons": seasons,
+                "dictionaryEntries": dictionary_entries,
+                "dictionaries": dictionaries.get(kind, 0)
+            }
+            for kind, entries, raw_bytes, stored_bytes, seasons, dictionary_entries in rows
+        }
+
+    def report(self):
+        table = [["Kind", "Entries", "Seasons", "Raw (MB)", "Stored (MB)", "Ratio", "Dictionaries"]]
+        for kind, stats in self.stats().items():
+            table.append([
+                kind,
+                str(stats["entries"]),
+                str(stats["seasons"]),
+                f"{stats['rawBytes'] / 1024 / 1024:.1f}",
+                f"{stats['storedBytes'] / 1024 / 1024:.1f}",
+                f"{stats['rawBytes'] / stats['storedBytes']:.1f}x" if stats["storedBytes"] else "-",
+                str(stats["dictionaries"])
+            ])
+        print("\n<b><green>PAYLOAD ARCHIVE:</green></b>")
+        Utility.print_table(table, hasHeader=True)
+        print("\n")
+
+    def close(self):
+        self._connection.close()
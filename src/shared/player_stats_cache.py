@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from ansimarkup import ansiprint as print
+
+from shared.constants.json import JSON as Keys
+from shared.http_cache import ActivePlayerTTL
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility
+
+logger = LoggingConfig.get_logger(__name__)
+
+DefaultMaxEntries = 4096
+
+"""
+In-memory cache of player career stats payloads, as returned by the NHL
+API's player_career_stats, shared by everything in the process that looks
+players up.
+
+Entries of active players expire 'max_age' seconds after the payload was
+fetched, entries of retired players never do.  Once the cache holds
+max_entries players the least recently used one is evicted.  With an
+'archive' the cache is backed on disk: payloads put in the cache are
+archived, and a player missing from memory is looked up in the archive,
+so later runs start warm.  Safe to use from several threads at once.
+"""
+class PlayerStatsCache:
+
+    def __init__(self, max_entries=DefaultMaxEntries, max_age=ActivePlayerTTL, archive=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.archive = archive
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    """
+    The player's cached payload, or None if it isn't cached or has expired.
+    """
+    def get(self, player_id):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(player_id)
+            if entry is not None:
+                payload, _, expires = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(player_id)
+                    self.hits += 1
+                    return payload
+                del self._entries[player_id]
+                self.expirations += 1
+
+        payload = self.get_archived(player_id, now)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+        return payload
+
+    """
+    Cache a payload fetched at 'fetched' (a timestamp, now by default), and
+    archive it unless it came from the archive.
+    """
+    def put(self, player_id, payload, fetched=None, archive=True):
+        fetched = fetched if fetched is not None else time.time()
+        ttl = self.get_ttl(payload)
+        expires = fetched + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[player_id] = (payload, fetched, expires)
+            self._entries.move_to_end(player_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        if archive and self.archive is not None:
+            try:
+                self.archive.put_player(player_id, payload)
+            except Exception as e:
+                logger.exception(
+                    f"Exception archiving player payload. PlayerId: '{player_id}', "
+                    f"Exception: '{str(e)}'.",
+                    stack_info=True
+                )
+
+    """
+    When the player's cached payload was fetched, as a timestamp, or None if
+    the player isn't cached.
+    """
+    def get_fetched(self, player_id):
+        with self._lock:
+            entry = self._entries.get(player_id)
+        return entry[1] if entry is not None else None
+
+    """
+    A payload from the archive that hasn't expired, which is then cached in
+    memory.
+    """
+    def get_archived(self, player_id, now):
+        if self.archive is None:
+            return None
+        entry = self.archive.get_player_entry(player_id)
+        if entry is None:
+            return None
+        payload, archived = entry
+        fetched = datetime.fromisoformat(archived).timestamp()
+        ttl = self.get_ttl(payload)
+        if ttl is not None and fetched + ttl <= now:
+            return None
+        self.put(player_id, payload, fetched, archive=False)
+        return payload
+
+    """
+    Seconds an entry lives: max_age while the player is active, None once
+    the player has retired, since their stats no longer change.
+    """
+    def get_ttl(self, payload):
+        return self.max_age if payload.get(Keys.is_Active, True) else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions
+            }
+
+    def report(self):
+        stats = self.stats()
+        logger.info(f"Player stats cache stats. Stats: '{stats}'.")
+        print("\n<b><green>PLAYER STATS CACHE:</green></b>")
+        Utility.print_table([
+            ["Entries", f"{stats['entries']} of {stats['maxEntries']}"],
+            ["Hits", str(stats["hits"])],
+            ["Archive hits", str(stats["diskHits"])],
+            ["Misses", str(stats["misses"])],
+            ["Expired", str(stats["expirations"])],
+            ["Evicted", str(stats["evictions"])]
+        ])
+        print("\n")
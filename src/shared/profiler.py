@@ -0,0 +1,353 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from enum import Enum
+
+import httpx
+from ansimarkup import ansiprint as print
+
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility
+
+logger = LoggingConfig.get_logger(__name__)
+
+# Seconds between stack samples taken by the sampling profiler.
+SampleInterval = 0.005
+# Functions listed in the printed CPU profile summary.
+TopFunctions = 15
+
+"""
+The CPU profiler run alongside a profiled command.  cProfile traces every
+call but only on the main thread.  The sampling profiler records the stacks
+of every thread, including the builder's fetch and write workers, and writes
+them in the collapsed format read by flame graph tools.
+"""
+class CpuProfiler(str, Enum):
+    off = "off"
+    cprofile = "cprofile"
+    sample = "sample"
+
+"""
+Where the time goes in a command: wall and CPU time per stage and the count
+and latency of API requests, by endpoint.
+
+Stages are recorded whether or not profiling was asked for, which costs a
+couple of clock reads per stage or pipeline item.  API requests are only
+timed once 'enabled' is set before the client is created, see
+ProfilingHttpClient.  Safe to use from several threads.
+"""
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    """
+    Time the code run inside the with block as the named stage.  CPU time is
+    the whole process's, so it includes any worker threads the stage uses.
+    """
+    @contextmanager
+    def stage(self, name, items=0):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall, time.process_time() - cpu, items)
+
+    """
+    Add to the totals of a stage.  Stages recorded more than once, like the
+    games of several shards, are summed.
+    """
+    def record(self, name, wall_seconds, cpu_seconds, items=0):
+        with self._lock:
+            stage = self.stages.setdefault(
+                name, {"calls": 0, "items": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0}
+            )
+            stage["calls"] += 1
+            stage["items"] += items
+            stage["wallSeconds"] += wall_seconds
+            stage["cpuSeconds"] += cpu_seconds
+
+    def record_request(self, endpoint, seconds, failed):
+        with self._lock:
+            request = self.requests.setdefault(endpoint, {"errors": 0, "latencies": []})
+            request["latencies"].append(seconds)
+            request["errors"] += int(failed)
+
+    """
+    Everything recorded, as plain data that can be sent between processes
+    and merged into another profiler.
+    """
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "requests": {
+                    endpoint: {"errors": request["errors"], "latencies": list(request["latencies"])}
+                    for endpoint, request in self.requests.items()
+                }
+            }
+
+    def merge(self, snapshot):
+        for name, stage in snapshot["stages"].items():
+            with self._lock:
+                totals = self.stages.setdefault(
+                    name, {"calls": 0, "items": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0}
+                )
+                for key, value in stage.items():
+                    totals[key] += value
+        for endpoint, request in snapshot["requests"].items():
+            with self._lock:
+                totals = self.requests.setdefault(endpoint, {"errors": 0, "latencies": []})
+                totals["errors"] += request["errors"]
+                totals["latencies"].extend(request["latencies"])
+
+    """
+    Latency statistics for each endpoint, in milliseconds.
+    """
+    def get_request_stats(self):
+        stats = {}
+        with self._lock:
+            requests = {endpoint: dict(request) for endpoint, request in self.requests.items()}
+        for endpoint, request in sorted(requests.items()):
+            latencies = sorted(request["latencies"])
+            if not latencies:
+                continue
+            stats[endpoint] = {
+                "calls": len(latencies),
+                "errors": request["errors"],
+                "totalSeconds": round(sum(latencies), 3),
+                "meanMs": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50Ms": round(Profiler.get_percentile(latencies, 0.5) * 1000, 1),
+                "p95Ms": round(Profiler.get_percentile(latencies, 0.95) * 1000, 1),
+                "maxMs": round(latencies[-1] * 1000, 1)
+            }
+        return stats
+
+    @staticmethod
+    def get_percentile(values, fraction):
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    """
+    Profile the command run inside the with block, if profiling is enabled:
+    run the chosen CPU profiler, then print the summary and write it as JSON
+    to 'profile_file'.  Stage names and key order are stable, so files from
+    two versions can be diffed.
+    """
+    @contextmanager
+    def session(self, command, profile_file, cpu_profiler=CpuProfiler.off):
+        if not self.enabled:
+            yield
+            return
+
+        if profile_file is None:
+            profile_file = f"{command}.profile.json"
+        cpu_file = None
+        started = datetime.now(timezone.utc)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        profile = sampler = None
+        if cpu_profiler == CpuProfiler.cprofile:
+            profile = cProfile.Profile()
+            profile.enable()
+        elif cpu_profiler == CpuProfiler.sample:
+            sampler = StackSampler()
+            sampler.start()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            if profile is not None:
+                profile.disable()
+                cpu_file = Profiler.get_sibling_file(profile_file, ".prof")
+                profile.dump_stats(cpu_file)
+            elif sampler is not None:
+                sampler.stop()
+                cpu_file = Profiler.get_sibling_file(profile_file, ".folded")
+                sampler.write(cpu_file)
+
+            summary = {
+                "command": command,
+                "started": started.isoformat(),
+                "wallSeconds": round(wall, 3),
+                "cpuSeconds": round(cpu, 3),
+                "stages": {
+                    name: {
+                        key: round(value, 3) if isinstance(value, float) else value
+                        for key, value in stage.items()
+                    }
+                    for name, stage in self.snapshot()["stages"].items()
+                },
+                "api": self.get_request_stats(),
+                "cpuProfile": cpu_file
+            }
+            with open(profile_file, "w", encoding="utf-8") as file:
+                json.dump(summary, file, indent=4)
+            logger.info(f"Profile written. File: '{profile_file}', Summary: '{summary}'.")
+            self.report(summary, profile_file)
+            if profile is not None:
+                Profiler.print_top_functions(profile)
+            elif sampler is not None:
+                sampler.report()
+
+    @staticmethod
+    def get_sibling_file(profile_file, suffix):
+        stem = profile_file[:-len(".json")] if profile_file.endswith(".json") else profile_file
+        return stem + suffix
+
+    def report(self, summary, profile_file):
+        stages_table = [["Stage", "Calls", "Items", "Wall (s)", "CPU (s)", "CPU/Wall"]]
+        for name, stage in summary["stages"].items():
+            stages_table.append([
+                name,
+                str(stage["calls"]),
+                str(stage["items"]),
+                f"{stage['wallSeconds']:.3f}",
+                f"{stage['cpuSeconds']:.3f}",
+                f"{stage['cpuSeconds'] / stage['wallSeconds']:.0%}" if stage["wallSeconds"] else "-"
+            ])
+        stages_table.append([
+            "Total",
+            "-",
+            "-",
+            f"{summary['wallSeconds']:.3f}",
+            f"{summary['cpuSeconds']:.3f}",
+            f"{summary['cpuSeconds'] / summary['wallSeconds']:.0%}" if summary["wallSeconds"] else "-"
+        ])
+        print("\n<b><green>PROFILE:</green></b>")
+        print(
+            "<blue>Stages run side by side, like the box score pipeline and sharded "
+            "builds, overlap, so their times can add up to more than the total.</blue>"
+        )
+        Utility.print_table(stages_table, hasHeader=True)
+
+        if summary["api"]:
+            api_table = [["Endpoint", "Calls", "Errors", "Mean (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)"]]
+            for endpoint, stats in summary["api"].items():
+                api_table.append([
+                    endpoint,
+                    str(stats["calls"]),
+                    str(stats["errors"]),
+                    f"{stats['meanMs']:.1f}",
+                    f"{stats['p50Ms']:.1f}",
+                    f"{stats['p95Ms']:.1f}",
+                    f"{stats['maxMs']:.1f}"
+                ])
+            print("\n<b><green>API LATENCY:</green></b>")
+            Utility.print_table(api_table, hasHeader=True)
+        print(f"\n<blue>Profile written to '{profile_file}'.</blue>")
+        if summary["cpuProfile"]:
+            print(f"<blue>CPU profile written to '{summary['cpuProfile']}'.</blue>")
+        print("\n")
+
+    @staticmethod
+    def print_top_functions(profile):
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(TopFunctions)
+        print("<b><green>CPU PROFILE (main thread):</green></b>")
+        sys.stdout.write(output.getvalue())
+
+"""
+Samples the stack of every thread at a fixed interval, see CpuProfiler.
+"""
+class StackSampler:
+
+    def __init__(self, interval=SampleInterval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})")
+                    frame = frame.f_back
+                stack.reverse()
+                # Pool threads are numbered, group them by pool.
+                thread_name = names.get(thread_id, str(thread_id)).rsplit("-", 1)[0]
+                self.stacks[";".join([thread_name] + stack)] += 1
+            self.samples += 1
+
+    def write(self, file_name):
+        with open(file_name, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    """
+    Print the functions most often found at the top of a stack.  Threads are
+    sampled whether they are running or waiting, so waits on locks, queues
+    and sockets show up too.
+    """
+    def report(self):
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values())
+        table = [["Function", "Samples", "Share"]]
+        for function, count in leaves.most_common(TopFunctions):
+            table.append([function, str(count), f"{count / total:.1%}"])
+        print(
+            f"<b><green>STACK SAMPLES ({self.samples} rounds, all threads, running "
+            f"or waiting):</green></b>"
+        )
+        Utility.print_table(table, hasHeader=True)
+        print("\n")
+
+"""
+Drop-in replacement for the nhlpy HttpClient that times every request sent
+and records it with a Profiler, by endpoint.  Endpoints are named by the
+lower case parts of the resource path, so 'gamecenter/2023020001/boxscore'
+is 'gamecenter/boxscore'.
+"""
+class ProfilingHttpClient:
+
+    def __init__(self, http_client, profiler: Profiler):
+        self._http_client = http_client
+        self._config = http_client._config
+        self.profiler = profiler
+
+    @staticmethod
+    def get_endpoint(resource):
+        parts = resource.split("?")[0].strip("/").split("/")
+        return "/".join(part for part in parts if part.islower()) or "/"
+
+    def get(self, endpoint, resource, query_params=None) -> httpx.Response:
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self._http_client.get(
+                endpoint=endpoint, resource=resource, query_params=query_params
+            )
+            failed = False
+            return response
+        finally:
+            self.profiler.record_request(
+                ProfilingHttpClient.get_endpoint(resource), time.perf_counter() - start, failed
+            )
@@ -0,0 +1,220 @@
+import random
+import threading
+import time
+
+import httpx
+from ansimarkup import ansiprint as print
+from nhlpy.http_client import RateLimitExceededException, ServerErrorException
+
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility
+
+logger = LoggingConfig.get_logger(__name__)
+
+# Seconds to wait after a throttled response before the concurrency limit may
+# be cut again, so a burst of failures from one overloaded moment counts once.
+DecreaseCooldown = 1.0
+BackoffBase = 0.5
+BackoffMax = 30.0
+
+"""
+Paces and limits the requests made to the NHL API, shared by every thread.
+
+Requests are spaced by a token bucket refilled at 'max_rps' tokens a second,
+with up to one second of burst.  The number of requests in flight is capped
+by a limit that adapts AIMD style: each successful response raises it by
+1/limit, about one per round of requests, and a throttled (429) or failed
+(5xx) response halves it.  The limit never goes above 'max_concurrency' or
+below 1.
+"""
+class RateLimiter:
+
+    def __init__(self, max_rps=None, max_concurrency=8, max_retries=4):
+        self.max_rps = max_rps
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.transport_errors = 0
+        self.gave_up = 0
+        self.first_request = None
+        self.last_response = None
+        self._tokens = max_rps if max_rps else 0.0
+        self._refilled = time.monotonic()
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._bucket_lock = threading.Lock()
+        self._random = random.Random()
+
+    """
+    Wait until a request may be sent.  Every acquire must be followed by a
+    release.
+    """
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= max(1, int(self.limit)):
+                self._condition.wait()
+            self.in_flight += 1
+            self.requests += 1
+            if self.first_request is None:
+                self.first_request = time.monotonic()
+        self._take_token()
+
+    def _take_token(self):
+        if not self.max_rps:
+            return
+        with self._bucket_lock:
+            now = time.monotonic()
+            self._tokens = min(
+                float(self.max_rps), self._tokens + (now - self._refilled) * self.max_rps
+            )
+            self._refilled = now
+            # Going into debt reserves the next token for this request.
+            self._tokens -= 1
+            wait = -self._tokens / self.max_rps if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+    """
+    Record the outcome of a request, 'success', 'throttled', 'server_error',
+    'transport_error' or None when the response says nothing about load (for
+    example a 404), and adjust the concurrency limit.
+    """
+    def release(self, outcome):
+        with self._condition:
+            self.in_flight -= 1
+            self.last_response = time.monotonic()
+            if outcome == "success":
+                self.successes += 1
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            elif outcome in ("throttled", "server_error"):
+                if outcome == "throttled":
+                    self.throttled += 1
+                else:
+                    self.server_errors += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= DecreaseCooldown:
+                    self._last_decrease = now
+                    self.limit = max(1.0, self.limit / 2)
+                    logger.info(
+                        f"API concurrency limit reduced. Outcome: '{outcome}', "
+                        f"Limit: '{self.limit:.1f}'."
+                    )
+            elif outcome == "transport_error":
+                self.transport_errors += 1
+            self._condition.notify_all()
+
+    def record_retry(self):
+        with self._condition:
+            self.retries += 1
+
+    def record_gave_up(self):
+        with self._condition:
+            self.gave_up += 1
+
+    """
+    Seconds to wait before retry number 'attempt' (from 0): exponential
+    backoff with full jitter.
+    """
+    def get_backoff(self, attempt):
+        return self._random.uniform(0, min(BackoffMax, BackoffBase * 2 ** attempt))
+
+    """
+    Completed requests per second since the first request was sent.
+    """
+    @property
+    def achieved_rps(self):
+        if self.first_request is None or self.last_response is None:
+            return 0.0
+        elapsed = self.last_response - self.first_request
+        return self.successes / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "serverErrors": self.server_errors,
+            "transportErrors": self.transport_errors,
+            "gaveUp": self.gave_up,
+            "achievedRps": round(self.achieved_rps, 1),
+            "maxRps": self.max_rps,
+            "concurrencyLimit": round(self.limit, 1),
+            "maxConcurrency": self.max_concurrency
+        }
+
+    def report(self):
+        stats = self.stats()
+        logger.info(f"API client stats. Stats: '{stats}'.")
+        print("\n<b><green>API REQUESTS:</green></b>")
+        Utility.print_table([
+            ["Requests sent", str(stats["requests"])],
+            ["  Retries", str(stats["retries"])],
+            ["  Throttled (429)", str(stats["throttled"])],
+            ["  Server errors (5xx)", str(stats["serverErrors"])],
+            ["  Transport errors", str(stats["transportErrors"])],
+            ["Requests given up", str(stats["gaveUp"])],
+            ["Achieved requests/s", f"{stats['achievedRps']:.1f}"],
+            ["Max requests/s", str(stats["maxRps"] or "unlimited")],
+            ["Concurrency limit", f"{stats['concurrencyLimit']:.1f} of {stats['maxConcurrency']}"]
+        ])
+        print("\n")
+
+"""
+Drop-in replacement for the nhlpy HttpClient that sends every request
+through a RateLimiter and retries throttled, failed (5xx) and dropped
+requests with jittered exponential backoff.  Other errors, like 404s, are
+raised straight away.
+"""
+class RateLimitedHttpClient:
+
+    def __init__(self, http_client, limiter: RateLimiter):
+        self._http_client = http_client
+        self._config = http_client._config
+        self.limiter = limiter
+
+    def get(self, endpoint, resource, query_params=None) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = self._http_client.get(
+                    endpoint=endpoint, resource=resource, query_params=query_params
+                )
+            except RateLimitExceededException as e:
+                self.limiter.release("throttled")
+                error = e
+            except ServerErrorException as e:
+                self.limiter.release("server_error")
+                error = e
+            except httpx.TransportError as e:
+                self.limiter.release("transport_error")
+                error = e
+            except Exception:
+                self.limiter.release(None)
+                raise
+            else:
+                self.limiter.release("success")
+                return response
+
+            if attempt >= self.limiter.max_retries:
+                self.limiter.record_gave_up()
+                logger.warning(
+                    f"Giving up on request. Resource: '{resource}', "
+                    f"Attempts: '{attempt + 1}', Exception: '{str(error)}'."
+                )
+                raise error
+            backoff = self.limiter.get_backoff(attempt)
+            self.limiter.record_retry()
+            logger.info(
+                f"Retrying request. Resource: '{resource}', Attempt: '{attempt + 1}', "
+                f"Backoff: '{backoff:.2f}', Exception: '{str(error)}'."
+            )
+            time.sleep(backoff)
+            attempt += 1
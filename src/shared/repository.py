@@ -0,0 +1,960 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility
+
+logger = LoggingConfig.get_logger(__name__)
+
+"""
+Column definitions for each table.  Column names match the JSON keys used by
+the NHL API so rows read back from the database have the same shape as the
+data they were built from.
+"""
+Schema = {
+    DB.games_table_name: {
+        Keys.game_id: "INTEGER PRIMARY KEY",
+        Keys.season: "INTEGER NOT NULL",
+        Keys.game_type: "INTEGER",
+        Keys.game_state: "TEXT",
+        Keys.game_date: "TEXT",
+        Keys.home_team_id: "INTEGER",
+        Keys.away_team_id: "INTEGER",
+        Keys.home_score: "INTEGER",
+        Keys.away_score: "INTEGER"
+    },
+    DB.skater_stats_table_name: {
+        Keys.game_id: "INTEGER NOT NULL",
+        Keys.player_id: "INTEGER NOT NULL",
+        Keys.team_id: "INTEGER",
+        Keys.position: "TEXT",
+        Keys.goals: "INTEGER",
+        Keys.assists: "INTEGER",
+        Keys.points: "INTEGER",
+        Keys.plus_minus: "INTEGER",
+        Keys.pim: "INTEGER",
+        Keys.hits: "INTEGER",
+        Keys.power_play_goals: "INTEGER",
+        Keys.sog: "INTEGER",
+        Keys.faceoff_winning_pctg: "REAL",
+        Keys.toi: "TEXT",
+        Keys.blocked_shots: "INTEGER",
+        Keys.shifts: "INTEGER",
+        Keys.giveaways: "INTEGER",
+        Keys.takeaways: "INTEGER"
+    },
+    DB.goalie_stats_table_name: {
+        Keys.game_id: "INTEGER NOT NULL",
+        Keys.player_id: "INTEGER NOT NULL",
+        Keys.team_id: "INTEGER",
+        Keys.even_strength_shots_against: "TEXT",
+        Keys.power_play_shots_against: "TEXT",
+        Keys.shorthanded_shots_against: "TEXT",
+        Keys.save_shots_against: "TEXT",
+        Keys.save_pctg: "REAL",
+        Keys.even_strength_goals_against: "INTEGER",
+        Keys.power_play_goals_against: "INTEGER",
+        Keys.shorthanded_goals_against: "INTEGER",
+        Keys.pim: "INTEGER",
+        Keys.goals_against: "INTEGER",
+        Keys.toi: "TEXT",
+        Keys.starter: "INTEGER",
+        Keys.decision: "TEXT",
+        Keys.shots_against: "INTEGER",
+        Keys.saves: "INTEGER"
+    },
+    DB.players_table_name: {
+        Keys.player_id: "INTEGER PRIMARY KEY",
+        Keys.current_team_id: "INTEGER",
+        Keys.first_name: "TEXT",
+        Keys.last_name: "TEXT",
+        Keys.height_in_cm: "INTEGER",
+        Keys.weight_in_kg: "INTEGER"
+    },
+    DB.meta_table_name: {
+        DB.name_column: "TEXT PRIMARY KEY",
+        DB.value_column: "TEXT"
+    },
+    DB.watermarks_table_name: {
+        Keys.season: "INTEGER NOT NULL",
+        Keys.team_id: "INTEGER NOT NULL",
+        Keys.last_game_date: "TEXT NOT NULL",
+        Keys.last_game_id: "INTEGER NOT NULL"
+    },
+    DB.player_refresh_table_name: {
+        Keys.player_id: "INTEGER PRIMARY KEY",
+        Keys.last_refreshed: "TEXT NOT NULL",
+        Keys.is_Active: "INTEGER NOT NULL"
+    },
+    DB.build_plan_table_name: {
+        Keys.id: "INTEGER PRIMARY KEY",
+        Keys.season: "INTEGER",
+        Keys.game_type: "INTEGER",
+        Keys.game_state: "TEXT"
+    },
+    DB.player_index_table_name: {
+        Keys.player_id: "INTEGER PRIMARY KEY",
+        Keys.first_game_date: "TEXT",
+        Keys.first_game_id: "INTEGER",
+        Keys.last_game_date: "TEXT",
+        Keys.last_game_id: "INTEGER",
+        Keys.last_seen: "TEXT"
+    },
+    DB.player_seasons_table_name: {
+        Keys.player_id: "INTEGER NOT NULL",
+        Keys.season: "INTEGER NOT NULL"
+    }
+}
+
+"""
+Primary key of each table, used as the conflict target for upserts.
+"""
+PrimaryKeys = {
+    DB.games_table_name: [Keys.game_id],
+    DB.skater_stats_table_name: [Keys.game_id, Keys.player_id],
+    DB.goalie_stats_table_name: [Keys.game_id, Keys.player_id],
+    DB.players_table_name: [Keys.player_id],
+    DB.meta_table_name: [DB.name_column],
+    DB.watermarks_table_name: [Keys.season, Keys.team_id],
+    DB.player_refresh_table_name: [Keys.player_id],
+    DB.build_plan_table_name: [Keys.id],
+    DB.player_index_table_name: [Keys.player_id],
+    DB.player_seasons_table_name: [Keys.player_id, Keys.season]
+}
+
+Indexes = {
+    DB.games_table_name: [
+        [Keys.season],
+        [Keys.game_date],
+        [Keys.home_team_id],
+        [Keys.away_team_id]
+    ],
+    DB.skater_stats_table_name: [
+        [Keys.player_id],
+        [Keys.team_id]
+    ],
+    DB.goalie_stats_table_name: [
+        [Keys.player_id],
+        [Keys.team_id]
+    ],
+    DB.player_seasons_table_name: [
+        [Keys.season]
+    ]
+}
+
+"""
+Tables whose row count and data size are kept as counters in the meta table
+by triggers, so reporting on them never scans the table.  The data size is
+an estimate of the bytes of data stored, see get_size_sql, not the space
+used on disk.
+"""
+CountedTables = [
+    DB.games_table_name,
+    DB.skater_stats_table_name,
+    DB.goalie_stats_table_name,
+    DB.players_table_name,
+    DB.player_index_table_name
+]
+
+"""
+Raised when opening a database that was written by an older version of the
+builder.  Run the 'migrate' command to upgrade it.
+"""
+class SchemaOutOfDateError(Exception):
+    pass
+
+"""
+Storage for the data set, backed by typed and indexed SQLite tables.
+
+Writes are grouped into transactions: the first write after a commit starts
+a new transaction and nothing is visible to other connections until commit
+is called.  The connection may be handed between threads, but only one
+thread may use it at a time.
+"""
+class Repository:
+
+    def __init__(self, db_name=None, read_only=False, check_schema=True):
+        self.db_name = db_name if db_name is not None else Utility.get_db_name()
+        self.read_only = read_only
+        if read_only:
+            uri = f"{Path(self.db_name).absolute().as_uri()}?mode=ro"
+            self._connection = sqlite3.connect(
+                uri, uri=True, isolation_level=None, check_same_thread=False
+            )
+        else:
+            self._connection = sqlite3.connect(
+                self.db_name, isolation_level=None, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.row_factory = sqlite3.Row
+
+        if check_schema:
+            version = self.get_schema_version()
+            if version < DB.schema_version:
+                self._connection.close()
+                raise SchemaOutOfDateError(
+                    f"Database '{self.db_name}' has schema version {version}, "
+                    f"expected {DB.schema_version}."
+                )
+            if not read_only:
+                self.create_schema()
+                self.commit()
+
+    """
+    The schema version of the database.  Databases without any of the data set
+    tables are considered current, SqliteDict databases written before the
+    schema was versioned report version 1 or 2.
+    """
+    def get_schema_version(self):
+        version = self.execute("PRAGMA user_version").fetchone()[0]
+        if version > 0:
+            return version
+
+        legacy_tables = self.get_legacy_tables()
+        if not legacy_tables:
+            return DB.schema_version
+        if DB.meta_table_name in legacy_tables:
+            row = self.execute(
+                f'SELECT value FROM "{DB.meta_table_name}" WHERE key = ?',
+                ("schema",)
+            ).fetchone()
+            if row is not None:
+                return 2
+        return 1
+
+    """
+    Names of data set tables still in the SqliteDict (key, value) format.
+    """
+    def get_legacy_tables(self):
+        legacy_tables = []
+        for table_name in Schema:
+            columns = [
+                row[1] for row in
+                self.execute(f'PRAGMA table_info("{table_name}")')
+            ]
+            if columns == ["key", "value"]:
+                legacy_tables.append(table_name)
+        return legacy_tables
+
+    def execute(self, sql, parameters=()):
+        return self._connection.execute(sql, parameters)
+
+    def create_schema(self):
+        self.begin()
+        for table_name, columns in Schema.items():
+            definitions = [f'"{name}" {definition}' for name, definition in columns.items()]
+            if len(PrimaryKeys[table_name]) > 1:
+                key = ", ".join(f'"{name}"' for name in PrimaryKeys[table_name])
+                definitions.append(f"PRIMARY KEY ({key})")
+            self.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table_name}" ({", ".join(definitions)})'
+            )
+            for index_columns in Indexes.get(table_name, []):
+                index_name = f"idx_{table_name}_{'_'.join(index_columns)}"
+                names = ", ".join(f'"{name}"' for name in index_columns)
+                self.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({names})'
+                )
+        self.create_counters()
+        self.execute(f"PRAGMA user_version = {DB.schema_version}")
+
+    """
+    Create the triggers that keep the counters in the meta table up to date.
+    They run inside the statement that changes the table, so the counters
+    commit or roll back with the rows they count.  The triggers are recreated
+    every time, so they always match the current columns.
+    """
+    def create_counters(self):
+        for table_name in CountedTables:
+            for name in [DB.row_count_prefix + table_name, DB.data_bytes_prefix + table_name]:
+                self.execute(
+                    f'INSERT OR IGNORE INTO "{DB.meta_table_name}" '
+                    f'("{DB.name_column}", "{DB.value_column}") VALUES (?, 0)',
+                    (name,)
+                )
+
+            # An update replaces the old row's values with the new row's.
+            events = {
+                "INSERT": [("NEW", 1)],
+                "DELETE": [("OLD", -1)],
+                "UPDATE": [("NEW", 1), ("OLD", -1)]
+            }
+            for event, rows in events.items():
+                statements = []
+                for row, sign in rows:
+                    if event != "UPDATE":
+                        statements.append(Repository.get_counter_update_sql(
+                            DB.row_count_prefix + table_name, str(sign)
+                        ))
+                    statements.append(Repository.get_counter_update_sql(
+                        DB.data_bytes_prefix + table_name,
+                        f"{sign} * ({Repository.get_size_sql(table_name, row)})"
+                    ))
+                    if table_name == DB.games_table_name:
+                        season = f'{row}."{Keys.season}"'
+                        statements.append(Repository.get_counter_sql(
+                            f"'{DB.season_games_prefix}' || {season}", str(sign)
+                        ))
+                        statements.append(Repository.get_season_updated_sql(season))
+                trigger_name = f"count_{table_name}_{event.lower()}"
+                self.execute(f'DROP TRIGGER IF EXISTS "{trigger_name}"')
+                self.execute(
+                    f'CREATE TRIGGER "{trigger_name}" AFTER {event} ON "{table_name}" '
+                    f"BEGIN {' '.join(statements)} END"
+                )
+
+    """
+    SQL expression for the data size of a row of the table: eight bytes for
+    each number column plus the length in bytes of each text value.  Only
+    the text columns are read, which keeps the triggers cheap.  'row'
+    qualifies the columns, for example 'NEW' in a trigger.
+    """
+    @staticmethod
+    def get_size_sql(table_name, row=None):
+        prefix = f"{row}." if row else ""
+        text_columns = [
+            name for name, definition in Schema[table_name].items()
+            if definition.startswith("TEXT")
+        ]
+        number_bytes = 8 * (len(Schema[table_name]) - len(text_columns))
+        return " + ".join([str(number_bytes)] + [
+            f'COALESCE(LENGTH(CAST({prefix}"{column}" AS BLOB)), 0)'
+            for column in text_columns
+        ])
+
+    """
+    Trigger statement adding 'amount' to a meta counter that already exists.
+    """
+    @staticmethod
+    def get_counter_update_sql(name, amount):
+        return (
+            f'UPDATE "{DB.meta_table_name}" SET "{DB.value_column}" = '
+            f'"{DB.value_column}" + {amount} WHERE "{DB.name_column}" = '
+            f"'{name}';"
+        )
+
+    """
+    Trigger statement adding 'amount' to the meta counter named by the SQL
+    expression 'name', starting it at zero if it does not exist yet.
+    """
+    @staticmethod
+    def get_counter_sql(name, amount):
+        return (
+            f'INSERT INTO "{DB.meta_table_name}" ("{DB.name_column}", "{DB.value_column}") '
+            f'VALUES ({name}, {amount}) ON CONFLICT ("{DB.name_column}") DO UPDATE SET '
+            f'"{DB.value_column}" = "{DB.value_column}" + excluded."{DB.value_column}";'
+        )
+
+    """
+    Trigger statement recording now as the time a game of the season given
+    by the SQL expression 'season' was last written.
+    """
+    @staticmethod
+    def get_season_updated_sql(season):
+        return (
+            f'INSERT INTO "{DB.meta_table_name}" ("{DB.name_column}", "{DB.value_column}") '
+            f"VALUES ('{DB.season_updated_prefix}' || {season}, "
+            f"json_quote(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))) "
+            f'ON CONFLICT ("{DB.name_column}") DO UPDATE SET '
+            f'"{DB.value_column}" = excluded."{DB.value_column}";'
+        )
+
+    """
+    Recompute every counter from the tables, replacing the stored values.
+    This scans the counted tables, it is only needed when the counters are
+    first added.
+    """
+    def seed_counters(self):
+        self.begin()
+        self.execute(
+            f'DELETE FROM "{DB.meta_table_name}" WHERE "{DB.name_column}" LIKE ?',
+            (f"{DB.season_games_prefix}%",)
+        )
+        for table_name in CountedTables:
+            rows, data_bytes = self.execute(
+                f'SELECT COUNT(*), COALESCE(SUM({Repository.get_size_sql(table_name)}), 0) '
+                f'FROM "{table_name}"'
+            ).fetchone()
+            self.set_meta(DB.row_count_prefix + table_name, rows)
+            self.set_meta(DB.data_bytes_prefix + table_name, data_bytes)
+        for season, games in self.execute(
+            f'SELECT "{Keys.season}", COUNT(*) FROM "{DB.games_table_name}" '
+            f'GROUP BY "{Keys.season}"'
+        ).fetchall():
+            self.set_meta(f"{DB.season_games_prefix}{season}", games)
+
+    """
+    The counters kept by the triggers: a dict of table name to row count and
+    data size, and a dict of season to number of games stored.
+    """
+    def get_counters(self):
+        tables = {table_name: {"rows": 0, "dataBytes": 0} for table_name in CountedTables}
+        seasons = {}
+        rows = self.execute(
+            f'SELECT "{DB.name_column}", "{DB.value_column}" FROM "{DB.meta_table_name}" '
+            f'WHERE "{DB.name_column}" LIKE ? OR "{DB.name_column}" LIKE ? '
+            f'OR "{DB.name_column}" LIKE ?',
+            (
+                f"{DB.row_count_prefix}%",
+                f"{DB.data_bytes_prefix}%",
+                f"{DB.season_games_prefix}%"
+            )
+        )
+        for name, value in rows:
+            value = int(value)
+            if name.startswith(DB.season_games_prefix):
+                if value:
+                    seasons[int(name[len(DB.season_games_prefix):])] = value
+            elif name.startswith(DB.row_count_prefix):
+                tables[name[len(DB.row_count_prefix):]]["rows"] = value
+            else:
+                tables[name[len(DB.data_bytes_prefix):]]["dataBytes"] = value
+        return tables, dict(sorted(seasons.items()))
+
+    """
+    When a game of each season was last written, as a dict of season to ISO
+    timestamp.  Seasons last written before these times were recorded are
+    missing.
+    """
+    def get_season_updates(self):
+        rows = self.execute(
+            f'SELECT "{DB.name_column}", "{DB.value_column}" FROM "{DB.meta_table_name}" '
+            f'WHERE "{DB.name_column}" LIKE ?',
+            (f"{DB.season_updated_prefix}%",)
+        )
+        return {
+            int(name[len(DB.season_updated_prefix):]): json.loads(value)
+            for name, value in rows
+        }
+
+    """
+    The rows of a table as tuples in column order, sorted by primary key.
+    With 'season', only the rows of that season's games are returned; stat
+    lines take their season from their game.
+    """
+    def get_rows(self, table_name, season=None):
+        names = ", ".join(f't."{name}"' for name in Schema[table_name])
+        key = ", ".join(f't."{name}"' for name in PrimaryKeys[table_name])
+        sql = f'SELECT {names} FROM "{table_name}" t'
+        parameters = ()
+        if season is not None:
+            if table_name != DB.games_table_name:
+                sql += (
+                    f' JOIN "{DB.games_table_name}" g '
+                    f'ON g."{Keys.game_id}" = t."{Keys.game_id}"'
+                )
+            season_column = "t" if table_name == DB.games_table_name else "g"
+            sql += f' WHERE {season_column}."{Keys.season}" = ?'
+            parameters = (season,)
+        cursor = self._connection.cursor()
+        # Plain tuples, the rows are read by column rather than by name.
+        cursor.row_factory = None
+        return cursor.execute(f"{sql} ORDER BY {key}", parameters).fetchall()
+
+    def begin(self):
+        if not self._connection.in_transaction:
+            self.execute("BEGIN")
+
+    def commit(self):
+        if self._connection.in_transaction:
+            self.execute("COMMIT")
+
+    def rollback(self):
+        if self._connection.in_transaction:
+            self.execute("ROLLBACK")
+
+    def close(self):
+        self._connection.close()
+
+    """
+    Delete every row in the data set.  The ingest history is kept.
+    """
+    def clear(self):
+        history = self.get_ingest_history()
+        self.begin()
+        # Without the counter triggers SQLite can empty a table in one step
+        # instead of row by row.  The counters restart at zero.
+        for table_name in CountedTables:
+            for event in ["insert", "delete", "update"]:
+                self.execute(f'DROP TRIGGER IF EXISTS "count_{table_name}_{event}"')
+        for table_name in Schema:
+            self.execute(f'DELETE FROM "{table_name}"')
+        self.create_counters()
+        self.set_meta(Keys.ingest_history, history)
+
+    """
+    Insert or replace rows in the named table.  Columns missing from a row are
+    stored as NULL.
+    """
+    def upsert(self, table_name, rows):
+        columns = list(Schema[table_name])
+        values = ", ".join(f":{name}" for name in columns)
+        self.begin()
+        self._connection.executemany(
+            Repository.get_upsert_sql(table_name, f"VALUES ({values})"),
+            ({name: row.get(name) for name in columns} for row in rows)
+        )
+
+    """
+    SQL inserting the rows produced by 'source' (a VALUES clause or a SELECT
+    of every column) into the table, updating rows whose key already exists.
+    """
+    @staticmethod
+    def get_upsert_sql(table_name, source):
+        columns = list(Schema[table_name])
+        key = PrimaryKeys[table_name]
+        names = ", ".join(f'"{name}"' for name in columns)
+        updates = ", ".join(
+            f'"{name}" = excluded."{name}"' for name in columns if name not in key
+        )
+        conflict = ", ".join(f'"{name}"' for name in key)
+        return (
+            f'INSERT INTO "{table_name}" ({names}) {source} '
+            f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
+        )
+
+    """
+    Copy the games, stat lines, player index and watermarks of another
+    database written by a sharded build into this one and commit.  Rows already present are
+    replaced, so merging the same shard twice is harmless.
+    """
+    def merge(self, db_name):
+        self.commit()
+        self.execute("ATTACH DATABASE ? AS shard", (db_name,))
+        try:
+            self.begin()
+            for table_name in [
+                DB.games_table_name,
+                DB.skater_stats_table_name,
+                DB.goalie_stats_table_name
+            ]:
+                names = ", ".join(f'"{name}"' for name in Schema[table_name])
+                # 'WHERE true' keeps SQLite from reading ON CONFLICT as a join.
+                self.execute(Repository.get_upsert_sql(
+                    table_name, f'SELECT {names} FROM shard."{table_name}" WHERE true'
+                ))
+            names = ", ".join(f'"{name}"' for name in Schema[DB.player_index_table_name])
+            self.execute(Repository.get_player_index_sql(
+                f'SELECT {names} FROM shard."{DB.player_index_table_name}" WHERE true'
+            ))
+            self.execute(
+                f'INSERT OR IGNORE INTO "{DB.player_seasons_table_name}" '
+                f'SELECT "{Keys.player_id}", "{Keys.season}" '
+                f'FROM shard."{DB.player_seasons_table_name}"'
+            )
+            for row in self.execute(
+                f'SELECT "{Keys.season}", "{Keys.team_id}", "{Keys.last_game_date}", '
+                f'"{Keys.last_game_id}" FROM shard."{DB.watermarks_table_name}"'
+            ).fetchall():
+                self.advance_watermark(*row)
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        finally:
+            self.execute("DETACH DATABASE shard")
+
+    def count(self, table_name):
+        return self.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+
+    """
+    Whether a game and its stat lines are stored.  A game row without any
+    skater stat lines was only partially written and is reported as missing
+    so it gets fetched again.
+    """
+    def has_game(self, game_id):
+        return self.execute(
+            f'SELECT 1 FROM "{DB.games_table_name}" WHERE "{Keys.game_id}" = ? '
+            f'AND EXISTS (SELECT 1 FROM "{DB.skater_stats_table_name}" '
+            f'WHERE "{Keys.game_id}" = ?)',
+            (game_id, game_id)
+        ).fetchone() is not None
+
+    """
+    Write a game and its player stat lines, add its players to the player
+    index and advance both teams' watermarks.  The rows become visible
+    together on the next commit.
+    """
+    def add_game(self, game_row, skater_rows, goalie_rows):
+        self.upsert(DB.games_table_name, [game_row])
+        self.upsert(DB.skater_stats_table_name, skater_rows)
+        self.upsert(DB.goalie_stats_table_name, goalie_rows)
+        self.index_players(
+            game_row, [row[Keys.player_id] for row in skater_rows + goalie_rows]
+        )
+        if game_row.get(Keys.game_date) is None:
+            return
+        for team_column in [Keys.home_team_id, Keys.away_team_id]:
+            if game_row.get(team_column) is not None:
+                self.advance_watermark(
+                    game_row[Keys.season],
+                    game_row[team_column],
+                    game_row[Keys.game_date],
+                    game_row[Keys.game_id]
+                )
+
+    def get_games(self, season=None, team_id=None):
+        sql = f'SELECT * FROM "{DB.games_table_name}" WHERE 1 = 1'
+        parameters = []
+        if season is not None:
+            sql += f' AND "{Keys.season}" = ?'
+            parameters.append(season)
+        if team_id is not None:
+            sql += f' AND (? IN ("{Keys.home_team_id}", "{Keys.away_team_id}"))'
+            parameters.append(team_id)
+        sql += f' ORDER BY "{Keys.game_date}", "{Keys.game_id}"'
+        return [dict(row) for row in self.execute(sql, parameters)]
+
+    """
+    The home and away rosters for a stored game, in the same shape as the
+    playerByGameStats block of a box score.
+    """
+    def get_rosters(self, game_id):
+        game = self.execute(
+            f'SELECT "{Keys.home_team_id}" FROM "{DB.games_table_name}" '
+            f'WHERE "{Keys.game_id}" = ?',
+            (game_id,)
+        ).fetchone()
+        if game is None:
+            return None
+
+        rosters = {}
+        for team_key in [Keys.home_team, Keys.away_team]:
+            rosters[team_key] = {Keys.forwards: [], Keys.defense: [], Keys.goalies: []}
+
+        for table_name in [DB.skater_stats_table_name, DB.goalie_stats_table_name]:
+            rows = self.execute(
+                f'SELECT * FROM "{table_name}" WHERE "{Keys.game_id}" = ?',
+                (game_id,)
+            )
+            for row in rows:
+                row = dict(row)
+                team_key = (
+                    Keys.home_team if row[Keys.team_id] == game[Keys.home_team_id]
+                    else Keys.away_team
+                )
+                if table_name == DB.goalie_stats_table_name:
+                    group = Keys.goalies
+                elif row[Keys.position] == "D":
+                    group = Keys.defense
+                else:
+                    group = Keys.forwards
+                rosters[team_key][group].append(row)
+
+        return rosters[Keys.home_team], rosters[Keys.away_team]
+
+    """
+    The stat rows of the players in a stat table from games played before a
+    date.  With season_only, only games of the season being played on that
+    date, the latest season with a game on or before it, are read.
+    """
+    def get_player_stats(self, table_name, player_ids, before_date, season_only=False):
+        placeholders = ", ".join("?" for _ in player_ids)
+        sql = (
+            f'SELECT s.* FROM "{table_name}" s '
+            f'JOIN "{DB.games_table_name}" g ON g."{Keys.game_id}" = s."{Keys.game_id}" '
+            f'WHERE s."{Keys.player_id}" IN ({placeholders}) AND g."{Keys.game_date}" < ?'
+        )
+        parameters = [*player_ids, before_date]
+        if season_only:
+            sql += (
+                f' AND g."{Keys.season}" = (SELECT MAX("{Keys.season}") '
+                f'FROM "{DB.games_table_name}" WHERE "{Keys.game_date}" <= ?)'
+            )
+            parameters.append(before_date)
+        return [dict(row) for row in self.execute(sql, parameters)]
+
+    """
+    IDs of every player with a stat line in the data set, read from the
+    player index.
+    """
+    def get_player_ids(self):
+        return {
+            row[0] for row in self.execute(
+                f'SELECT "{Keys.player_id}" FROM "{DB.player_index_table_name}"'
+            )
+        }
+
+    """
+    IDs of players who appeared in a game stored after their profile was last
+    refreshed, or who were never refreshed.  Players indexed by the migration
+    to schema version 7 have no sighting recorded and are only returned once
+    they are seen in a new game.
+    """
+    def get_seen_player_ids(self):
+        return {
+            row[0] for row in self.execute(
+                f'SELECT i."{Keys.player_id}" FROM "{DB.player_index_table_name}" i '
+                f'LEFT JOIN "{DB.player_refresh_table_name}" r '
+                f'ON r."{Keys.player_id}" = i."{Keys.player_id}" '
+                f'WHERE i."{Keys.last_seen}" IS NOT NULL AND '
+                f'(r."{Keys.last_refreshed}" IS NULL OR '
+                f'i."{Keys.last_seen}" > r."{Keys.last_refreshed}")'
+            )
+        }
+
+    """
+    A player's index entry, with the seasons they appeared in as a sorted
+    list, or None if the player has no stat lines.
+    """
+    def get_player_index(self, player_id):
+        row = self.execute(
+            f'SELECT * FROM "{DB.player_index_table_name}" WHERE "{Keys.player_id}" = ?',
+            (player_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        seasons = self.execute(
+            f'SELECT "{Keys.season}" FROM "{DB.player_seasons_table_name}" '
+            f'WHERE "{Keys.player_id}" = ? ORDER BY "{Keys.season}"',
+            (player_id,)
+        )
+        return {**dict(row), Keys.seasons: [season[0] for season in seasons]}
+
+    """
+    Record that the given players appeared in a game: widen each player's
+    first/last game to include it, add the game's season and mark them seen
+    now.
+    """
+    def index_players(self, game_row, player_ids):
+        seen = datetime.now(timezone.utc).isoformat()
+        game_date = game_row.get(Keys.game_date)
+        game_id = game_row[Keys.game_id]
+        self.begin()
+        self._connection.executemany(
+            Repository.get_player_index_sql("VALUES (?, ?, ?, ?, ?, ?)"),
+            [
+                (player_id, game_date, game_id, game_date, game_id, seen)
+                for player_id in player_ids
+            ]
+        )
+        self._connection.executemany(
+            f'INSERT OR IGNORE INTO "{DB.player_seasons_table_name}" '
+            f'("{Keys.player_id}", "{Keys.season}") VALUES (?, ?)',
+            [(player_id, game_row[Keys.season]) for player_id in player_ids]
+        )
+
+    """
+    SQL inserting player index rows produced by 'source', merging rows for
+    players already indexed: the earliest first game and latest last game
+    are kept, ordered by game date and then game ID, along with the latest
+    sighting.  Games without a date never replace a dated one.
+    """
+    @staticmethod
+    def get_player_index_sql(source):
+        table = f'"{DB.player_index_table_name}"'
+        names = ", ".join(f'"{name}"' for name in Schema[DB.player_index_table_name])
+        updates = []
+        for date_column, id_column, comparison in [
+            (Keys.first_game_date, Keys.first_game_id, "<"),
+            (Keys.last_game_date, Keys.last_game_id, ">")
+        ]:
+            replace = (
+                f'excluded."{date_column}" IS NOT NULL AND ('
+                f'{table}."{date_column}" IS NULL OR '
+                f'(excluded."{date_column}", excluded."{id_column}") {comparison} '
+                f'({table}."{date_column}", {table}."{id_column}"))'
+            )
+            for column in [date_column, id_column]:
+                updates.append(
+                    f'"{column}" = CASE WHEN {replace} '
+                    f'THEN excluded."{column}" ELSE {table}."{column}" END'
+                )
+        updates.append(
+            f'"{Keys.last_seen}" = COALESCE(MAX({table}."{Keys.last_seen}", '
+            f'excluded."{Keys.last_seen}"), {table}."{Keys.last_seen}", '
+            f'excluded."{Keys.last_seen}")'
+        )
+        return (
+            f"INSERT INTO {table} ({names}) {source} "
+            f'ON CONFLICT ("{Keys.player_id}") DO UPDATE SET {", ".join(updates)}'
+        )
+
+    """
+    Rebuild the player index from the stat lines already in the data set.
+    No sightings are recorded, see get_seen_player_ids.
+    """
+    def seed_player_index(self):
+        self.begin()
+        for table_name in [DB.skater_stats_table_name, DB.goalie_stats_table_name]:
+            self.execute(Repository.get_player_index_sql(
+                f'SELECT s."{Keys.player_id}", g."{Keys.game_date}", s."{Keys.game_id}", '
+                f'g."{Keys.game_date}", s."{Keys.game_id}", NULL '
+                f'FROM "{table_name}" s LEFT JOIN "{DB.games_table_name}" g '
+                f'ON g."{Keys.game_id}" = s."{Keys.game_id}" WHERE true'
+            ))
+            self.execute(
+                f'INSERT OR IGNORE INTO "{DB.player_seasons_table_name}" '
+                f'SELECT DISTINCT s."{Keys.player_id}", g."{Keys.season}" '
+                f'FROM "{table_name}" s JOIN "{DB.games_table_name}" g '
+                f'ON g."{Keys.game_id}" = s."{Keys.game_id}"'
+            )
+
+    def has_player(self, player_id):
+        return self.execute(
+            f'SELECT 1 FROM "{DB.players_table_name}" WHERE "{Keys.player_id}" = ?',
+            (player_id,)
+        ).fetchone() is not None
+
+    def upsert_player(self, player_row):
+        self.upsert(DB.players_table_name, [player_row])
+
+    def delete_player(self, player_id):
+        self.begin()
+        self.execute(
+            f'DELETE FROM "{DB.players_table_name}" WHERE "{Keys.player_id}" = ?',
+            (player_id,)
+        )
+
+    """
+    Record when a player's profile was last fetched.
+    """
+    def set_player_refreshed(self, player_id, timestamp: datetime, is_active):
+        self.upsert(DB.player_refresh_table_name, [{
+            Keys.player_id: player_id,
+            Keys.last_refreshed: timestamp.isoformat(),
+            Keys.is_Active: int(bool(is_active))
+        }])
+
+    """
+    IDs of players whose profiles do not need to be fetched again: those
+    refreshed at or after the given time and, if include_retired, retired
+    players, whose profiles no longer change.
+    """
+    def get_fresh_player_ids(self, since: datetime, include_retired=True):
+        sql = (
+            f'SELECT "{Keys.player_id}" FROM "{DB.player_refresh_table_name}" '
+            f'WHERE "{Keys.last_refreshed}" >= ?'
+        )
+        if include_retired:
+            sql += f' OR "{Keys.is_Active}" = 0'
+        return {row[0] for row in self.execute(sql, (since.isoformat(),))}
+
+    """
+    Replace the stored build plan with the given schedule entries.
+    """
+    def save_plan(self, games):
+        self.begin()
+        self.execute(f'DELETE FROM "{DB.build_plan_table_name}"')
+        self.upsert(DB.build_plan_table_name, games)
+
+    def get_plan(self):
+        return [
+            dict(row) for row in self.execute(
+                f'SELECT * FROM "{DB.build_plan_table_name}" ORDER BY "{Keys.id}"'
+            )
+        ]
+
+    def clear_plan(self):
+        self.begin()
+        self.execute(f'DELETE FROM "{DB.build_plan_table_name}"')
+
+    """
+    Values in the meta table are stored as JSON.
+    """
+    def get_meta(self, name, default=None):
+        row = self.execute(
+            f'SELECT "{DB.value_column}" FROM "{DB.meta_table_name}" '
+            f'WHERE "{DB.name_column}" = ?',
+            (name,)
+        ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def set_meta(self, name, value):
+        self.upsert(DB.meta_table_name, [{
+            DB.name_column: name,
+            DB.value_column: json.dumps(value)
+        }])
+
+    def delete_meta(self, name):
+        self.begin()
+        self.execute(
+            f'DELETE FROM "{DB.meta_table_name}" WHERE "{DB.name_column}" = ?',
+            (name,)
+        )
+
+    """
+    Ingest history, oldest first, see Builder.record_ingest.  Only the most
+    recent 'limit' entries are kept.
+    """
+    def get_ingest_history(self):
+        return self.get_meta(Keys.ingest_history, [])
+
+    def add_ingest_record(self, entry, limit=100):
+        history = self.get_ingest_history()
+        history.append(entry)
+        self.set_meta(Keys.ingest_history, history[-limit:])
+
+    def get_last_update(self, table_name):
+        value = Utility.json_value_or_default(
+            self.get_meta(table_name, {}), Keys.last_update, default=None
+        )
+        return datetime.fromisoformat(value) if value is not None else None
+
+    def set_last_update(self, table_name, timestamp: datetime):
+        self.set_meta(table_name, {Keys.last_update: timestamp.isoformat()})
+
+    """
+    Record that a team's game has been written.  The watermark for the season
+    and team only ever moves forward, so games written out of date order
+    never move it back.
+    """
+    def advance_watermark(self, season, team_id, game_date, game_id):
+        self.begin()
+        self.execute(
+            f'INSERT INTO "{DB.watermarks_table_name}" '
+            f'("{Keys.season}", "{Keys.team_id}", "{Keys.last_game_date}", "{Keys.last_game_id}") '
+            f"VALUES (?, ?, ?, ?) "
+            f'ON CONFLICT ("{Keys.season}", "{Keys.team_id}") DO UPDATE SET '
+            f'"{Keys.last_game_date}" = excluded."{Keys.last_game_date}", '
+            f'"{Keys.last_game_id}" = excluded."{Keys.last_game_id}" '
+            f'WHERE (excluded."{Keys.last_game_date}", excluded."{Keys.last_game_id}") > '
+            f'("{DB.watermarks_table_name}"."{Keys.last_game_date}", '
+            f'"{DB.watermarks_table_name}"."{Keys.last_game_id}")',
+            (season, team_id, game_date, game_id)
+        )
+
+    """
+    The watermarks for a season as a dict of team ID to (last game date, last
+    game ID).
+    """
+    def get_watermarks(self, season):
+        rows = self.execute(
+            f'SELECT "{Keys.team_id}", "{Keys.last_game_date}", "{Keys.last_game_id}" '
+            f'FROM "{DB.watermarks_table_name}" WHERE "{Keys.season}" = ?',
+            (season,)
+        )
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    """
+    Rebuild the watermarks from the games already in the data set.
+    """
+    def seed_watermarks(self):
+        self.begin()
+        for team_column in [Keys.home_team_id, Keys.away_team_id]:
+            rows = self.execute(
+                f'SELECT "{Keys.season}", "{team_column}", "{Keys.game_date}", "{Keys.game_id}" '
+                f'FROM "{DB.games_table_name}" '
+                f'WHERE "{team_column}" IS NOT NULL AND "{Keys.game_date}" IS NOT NULL'
+            ).fetchall()
+            for row in rows:
+                self.advance_watermark(*row)
+
+    """
+    Seasons that have been fully built after they ended.  Incremental builds
+    do not look at these seasons again.
+    """
+    def get_complete_seasons(self):
+        return set(self.get_meta(Keys.complete_seasons, []))
+
+    def set_season_complete(self, season):
+        seasons = self.get_complete_seasons()
+        seasons.add(int(season))
+        self.set_meta(Keys.complete_seasons, sorted(seasons))
@@ -1,6 +1,3 @@
-from sqlitedict import SqliteDict
-
-
 class Utility:
     """
     Check the json_data for a value associated with the provided key.  If no
@@ -64,7 +61,49 @@ class Utility:
     @staticmethod
     def get_db_name():
         return "NHLPredictor.sqlite"
-    
+
+    """
+    Database a sharded build writes one season's games to before they are
+    merged into the main database.
+    """
+    @staticmethod
+    def get_shard_name(season):
+        return f"NHLPredictor.{season}.sqlite"
+
+    @staticmethod
+    def get_cache_name():
+        return "NHLCache.sqlite"
+
+    @staticmethod
+    def get_archive_name():
+        return "NHLArchive.sqlite"
+
+    """
+    Directory the data set is exported to as Parquet, see Exporter.
+    """
+    @staticmethod
+    def get_export_dir():
+        return "NHLPredictor.parquet"
+
+    """
+    Directory training data is cached in, see FeatureCache.
+    """
+    @staticmethod
+    def get_feature_cache_dir():
+        return "NHLFeatures.cache"
+
+    """
+    Point an NHLClient and each of its API groups at a different HttpClient,
+    for example one that wraps the original client.
+    """
+    @staticmethod
+    def set_http_client(client, http_client):
+        original = client._http_client
+        client._http_client = http_client
+        for api in vars(client).values():
+            if getattr(api, "client", None) is original:
+                api.client = http_client
+
     """
     Some goalies stats are represented as a save/try pair.  For example, see
     shots against stats that are shown like 21/27 where 21 is the number of
@@ -76,29 +115,3 @@ class Utility:
         parts = [int(part) for part in parts]
 
         return tuple(parts)
-
-    @staticmethod
-    def get_db_connections(
-        *names,
-        update_db: bool = False,
-        read_only: bool = False
-    ):
-        DBs = {}
-        if update_db:
-            # Empty the database on open
-            flag = "w"
-        else:
-            # Open for read/write without modification
-            flag = "c"
-        if read_only:
-            # Process readonly flag last as we want it to take precedence.
-            flag = "r"
-
-        for name in names:
-            DBs[name] = SqliteDict(
-                Utility.get_db_name(),
-                tablename=name,
-                autocommit=True,
-                flag=flag
-            )
-        return DBs
\ No newline at end of file
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model.average_player_summarizer import AveragePlayerSummarizer
+from shared.logging_config import LoggingConfig
+from shared.utility import Utility
+
+logger = LoggingConfig.get_logger(__name__)
+
+# Version of the cache files' layout.  Raising it rebuilds every entry.
+CacheVersion = 1
+
+"""
+Training data parsed from CSV files, kept as NumPy arrays that are memory
+mapped when read back, so repeated training runs open the data without
+parsing or copying it.
+
+Each set of data files is one entry: '<key>.features.npy' holding the
+feature matrix, '<key>.targets.npy' holding the target vector and a
+'<key>.json' sidecar with the column names from the summarizer's headers and
+a fingerprint of the sources.  The fingerprint covers the size and
+modification time of every data file and the summarizer's name and version,
+so the entry is rebuilt whenever a file or the summarizer changes.
+"""
+class FeatureCache:
+
+    def __init__(self, directory=None, summarizer=None):
+        self.directory = Path(
+            directory if directory is not None else Utility.get_feature_cache_dir()
+        )
+        self.summarizer = summarizer if summarizer is not None else AveragePlayerSummarizer()
+
+    """
+    The features of the rows in the data files as a DataFrame and their
+    targets as an array, both backed by read-only memory maps of the cache.
+    The files are parsed, and the cache entry written, only if the entry is
+    missing or out of date.
+    """
+    def load(self, data_files):
+        data_files = [str(Path(data_file).absolute()) for data_file in data_files]
+        key = hashlib.sha1("\n".join(data_files).encode("utf-8")).hexdigest()[:16]
+        fingerprint = self.get_fingerprint(data_files)
+        sidecar = self.read_sidecar(key)
+        if sidecar is not None and sidecar["fingerprint"] == fingerprint:
+            logger.info(f"Feature cache hit. Key: '{key}', Rows: '{sidecar['rows']}'.")
+        else:
+            logger.info(f"Feature cache miss. Key: '{key}', Files: '{data_files}'.")
+            features, targets = FeatureCache.read_csv(data_files, self.get_headers())
+            sidecar = self.write(key, fingerprint, features, targets)
+        return self.open(key, sidecar)
+
+    """
+    The feature matrix and target vector of the rows in the data files.  The
+    target is the last column.
+    """
+    @staticmethod
+    def read_csv(data_files, headers):
+        data = pd.concat(map(pd.read_csv, data_files), ignore_index=True)
+        if len(data.columns) != len(headers):
+            raise ValueError(
+                f"Data files have {len(data.columns)} columns, the summarizer's "
+                f"headers have {len(headers)}."
+            )
+        values = data.to_numpy(dtype=np.float64)
+        return values[:, :-1], values[:, -1]
+
+    def get_headers(self):
+        return self.summarizer.get_headers()
+
+    def get_fingerprint(self, data_files):
+        files = []
+        for data_file in data_files:
+            stat = os.stat(data_file)
+            files.append([data_file, stat.st_size, stat.st_mtime_ns])
+        return {
+            "cacheVersion": CacheVersion,
+            "summarizer": self.summarizer.name,
+            "summarizerVersion": self.summarizer.version,
+            "files": files
+        }
+
+    def get_path(self, key, suffix):
+        return self.directory / f"{key}{suffix}"
+
+    def read_sidecar(self, key):
+        path = self.get_path(key, ".json")
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    """
+    Store a cache entry.  The sidecar is written last, so an entry whose
+    arrays were only partly written is never read.
+    """
+    def write(self, key, fingerprint, features, targets):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for suffix, values in [(".features.npy", features), (".targets.npy", targets)]:
+            path = self.get_path(key, suffix)
+            temp_path = self.get_path(key, suffix + ".tmp")
+            with open(temp_path, "wb") as file:
+                np.save(file, np.ascontiguousarray(values))
+            os.replace(temp_path, path)
+
+        headers = self.get_headers()
+        sidecar = {
+            "fingerprint": fingerprint,
+            "columns": headers[:-1],
+            "target": headers[-1],
+            "rows": len(targets),
+            "created": datetime.now(timezone.utc).isoformat()
+        }
+        path = self.get_path(key, ".json")
+        temp_path = self.get_path(key, ".json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(sidecar, file, indent=4)
+        os.replace(temp_path, path)
+        logger.info(f"Feature cache entry written. Key: '{key}', Rows: '{len(targets)}'.")
+        return sidecar
+
+    def open(self, key, sidecar):
+        features = np.load(self.get_path(key, ".features.npy"), mmap_mode="r")
+        targets = np.load(self.get_path(key, ".targets.npy"), mmap_mode="r")
+        # A single float block, which pandas wraps without copying.
+        return pd.DataFrame(features, columns=sidecar["columns"], copy=False), targets
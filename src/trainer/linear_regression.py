@@ -5,6 +5,13 @@ import statsmodels.api as sm
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score
 
+from shared.execution_context import ExecutionContext
+from trainer.feature_cache import FeatureCache
+
+execution_context = ExecutionContext()
+
+TestDataFile = "currentSeason.csv"
+
 
 class TrainLinearRegression:
 
@@ -13,42 +20,54 @@ class TrainLinearRegression:
         # Dump all lines when printing pandas data. TODO: Delete this.
         # pd.set_option("display.max_rows", None, "display.max_columns", None)
 
-        train = pd.concat(map(pd.read_csv, data_files), ignore_index=True)
-        targetsColumnName = train.columns[len(train.columns)-1]
-        train_targets = train[targetsColumnName].to_list()
-        train.drop(targetsColumnName, axis=1, inplace=True)
+        profiler = execution_context.profiler
+        with profiler.stage("data load", len(data_files) + 1):
+            if execution_context.use_feature_cache:
+                cache = FeatureCache()
+                train, train_targets = cache.load(data_files)
+                test, test_targets = cache.load([TestDataFile])
+            else:
+                train = pd.concat(map(pd.read_csv, data_files), ignore_index=True)
+                test = pd.read_csv(TestDataFile)
+                targetsColumnName = train.columns[len(train.columns)-1]
+                train_targets = train[targetsColumnName].to_list()
+                train.drop(targetsColumnName, axis=1, inplace=True)
 
-        test = pd.read_csv("currentSeason.csv")
-        test_targets = test[targetsColumnName].to_list()
-        test.drop(targetsColumnName, axis=1, inplace=True)
+                test_targets = test[targetsColumnName].to_list()
+                test.drop(targetsColumnName, axis=1, inplace=True)
         
         # create LR model
         model = LinearRegression()
 
         # Fit
-        model.fit(train, train_targets)
+        with profiler.stage("fit", len(train)):
+            model.fit(train, train_targets)
 
         # TODO: Clean up the presentation of stats here.
 
         # r-squared
-        train_pred = model.predict(train)
+        with profiler.stage("predict", len(train)):
+            train_pred = model.predict(train)
         r_squared = r2_score(train_targets, train_pred)
         print("R-squared: ", r_squared)
 
         # P-Values
-        x_intercept = sm.add_constant(train)
-        model_sm = sm.OLS(train_targets, x_intercept).fit()
+        with profiler.stage("statistics"):
+            x_intercept = sm.add_constant(train)
+            model_sm = sm.OLS(train_targets, x_intercept).fit()
         print("P-Values: ", model_sm.pvalues)
         
         print("Mean squared error: %.2f" % mean_squared_error(train_targets, train_pred))
 
-        test_pred = model.predict(test)
+        with profiler.stage("predict", len(test)):
+            test_pred = model.predict(test)
         r_squared = r2_score(test_targets, test_pred)
         print("R-squared: ", r_squared)
 
         # P-Values
-        x_intercept = sm.add_constant(test)
-        model_sm = sm.OLS(test_targets, x_intercept).fit()
+        with profiler.stage("statistics"):
+            x_intercept = sm.add_constant(test)
+            model_sm = sm.OLS(test_targets, x_intercept).fit()
         print("P-Values: ", model_sm.pvalues)
         
         print("Mean squared error: %.2f" % mean_squared_error(test_targets, test_pred))
@@ -0,0 +1,133 @@
+import os
+import tempfile
+
+import pytest
+
+"""
+Modules open buildData.log in the working directory when they are imported,
+and databases default to it too, so the tests run in a scratch directory.
+Nothing from src is imported before this.
+"""
+def pytest_sessionstart(session):
+    os.chdir(tempfile.mkdtemp(prefix="nhlstats-tests-"))
+
+
+@pytest.fixture
+def repository(tmp_path):
+    from shared.repository import Repository
+
+    repository = Repository(str(tmp_path / "NHLPredictor.sqlite"))
+    yield repository
+    repository.close()
+
+"""
+Point the shared ExecutionContext at a stand-in NHLClient for one test.
+"""
+@pytest.fixture
+def client():
+    from shared.execution_context import ExecutionContext
+
+    context = ExecutionContext()
+    previous = getattr(context, '_client', None)
+
+    def use(stub):
+        context._client = stub
+        return stub
+
+    yield use
+    context._client = previous
+
+"""
+A finished game's box score, trimmed to a few players per roster.  Stats
+some players don't have are left out, the way the NHL API leaves them out.
+"""
+@pytest.fixture
+def box_score():
+    from shared.constants.json import JSON as Keys
+
+    def skater(player_id, position, goals, toi, faceoffs=None):
+        player = {
+            Keys.player_id: player_id,
+            "sweaterNumber": player_id % 100,
+            "name": {"default": f"Player {player_id}"},
+            Keys.position: position,
+            Keys.goals: goals,
+            Keys.assists: 1,
+            Keys.points: goals + 1,
+            Keys.plus_minus: -1,
+            Keys.pim: 2,
+            Keys.hits: 3,
+            Keys.power_play_goals: 0,
+            Keys.sog: goals + 2,
+            Keys.toi: toi,
+            Keys.blocked_shots: 1,
+            Keys.shifts: 20,
+            Keys.giveaways: 0,
+            Keys.takeaways: 1
+        }
+        if faceoffs is not None:
+            player[Keys.faceoff_winning_pctg] = faceoffs
+        return player
+
+    def goalie(player_id, saves, shots, starter):
+        even_strength = f"{saves - 1}/{shots - 1}" if shots else "0/0"
+        return {
+            Keys.player_id: player_id,
+            "name": {"default": f"Player {player_id}"},
+            Keys.even_strength_shots_against: even_strength,
+            Keys.power_play_shots_against: "1/1" if shots else "0/0",
+            Keys.shorthanded_shots_against: "0/0",
+            Keys.save_shots_against: f"{saves}/{shots}",
+            Keys.save_pctg: saves / shots if shots else 0,
+            Keys.even_strength_goals_against: shots - saves,
+            Keys.power_play_goals_against: 0,
+            Keys.shorthanded_goals_against: 0,
+            Keys.pim: 0,
+            Keys.goals_against: shots - saves,
+            Keys.toi: "60:00" if starter else "00:00",
+            Keys.starter: starter,
+            Keys.shots_against: shots,
+            Keys.saves: saves
+        }
+
+    return {
+        Keys.id: 2023020001,
+        Keys.season: 20232024,
+        Keys.game_type: 2,
+        Keys.game_state: "OFF",
+        Keys.game_date: "2023-10-10",
+        Keys.home_team: {Keys.id: 1, Keys.score: 3},
+        Keys.away_team: {Keys.id: 2, Keys.score: 1},
+        Keys.player_by_game_stats: {
+            Keys.home_team: {
+                Keys.forwards: [
+                    skater(8470001, "C", 2, "18:30", 0.55),
+                    skater(8470002, "L", 1, "15:05")
+                ],
+                Keys.defense: [skater(8470003, "D", 0, "22:45")],
+                Keys.goalies: [goalie(8470004, 29, 30, True), goalie(8470005, 0, 0, False)]
+            },
+            Keys.away_team: {
+                # No faceoffs taken by anyone, like a game where the stat is missing.
+                Keys.forwards: [skater(8470011, "C", 1, "19:00"), skater(8470012, "R", 0, "12:10")],
+                Keys.defense: [skater(8470013, "D", 0, "24:00")],
+                Keys.goalies: [goalie(8470014, 27, 30, True)]
+            }
+        }
+    }
+
+"""
+A payload archive in the test's temporary directory, shared through the
+ExecutionContext for the test.
+"""
+@pytest.fixture
+def archive(tmp_path):
+    from shared.execution_context import ExecutionContext
+    from shared.payload_archive import PayloadArchive
+
+    context = ExecutionContext()
+    previous = getattr(context, '_payload_archive', None)
+    archive = context._payload_archive = PayloadArchive(str(tmp_path / "NHLArchive.sqlite"))
+    yield archive
+    context._payload_archive = previous
+    archive.close()
@@ -0,0 +1,28 @@
+from builder.box_score_decoder import (BoxScoreDecoder, GoalieFields,
+                                       SkaterFields)
+from shared.constants.json import JSON as Keys
+
+
+def test_decode_reads_fields_with_defaults(box_score):
+    game_row, skater_rows, goalie_rows = BoxScoreDecoder.decode(box_score)
+
+    assert game_row[Keys.game_id] == 2023020001
+    assert (game_row[Keys.home_team_id], game_row[Keys.away_team_id]) == (1, 2)
+    assert [row[Keys.player_id] for row in skater_rows] == [
+        8470001, 8470002, 8470003, 8470011, 8470012, 8470013
+    ]
+    assert [row[Keys.team_id] for row in goalie_rows] == [1, 1, 2]
+
+    skater_keys = [Keys.game_id, Keys.team_id] + [key for key, _ in SkaterFields]
+    goalie_keys = [Keys.game_id, Keys.team_id] + [key for key, _ in GoalieFields]
+    assert all(list(row) == skater_keys for row in skater_rows)
+    assert all(list(row) == goalie_keys for row in goalie_rows)
+    assert skater_rows[0][Keys.faceoff_winning_pctg] == 0.55
+    assert skater_rows[1][Keys.faceoff_winning_pctg] == 0
+    assert goalie_rows[0][Keys.decision] == 0
+    assert "name" not in skater_rows[0]
+
+
+def test_decode_without_rosters(box_score):
+    del box_score[Keys.player_by_game_stats]
+    assert BoxScoreDecoder.decode(box_score) is None
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from builder.builder import Builder, GameTables
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+from shared.execution_context import ExecutionContext
+
+
+def test_report_has_update_time_of_every_game_table(repository, box_score):
+    failed_games = Builder.process_games(
+        [{Keys.id: box_score[Keys.id], Keys.season: box_score[Keys.season]}],
+        repository,
+        report=False,
+        fetch=lambda game_id: box_score
+    )
+
+    tables = Builder.get_report(repository)["tables"]
+    assert failed_games == []
+    for table_name in GameTables:
+        assert tables[table_name]["lastUpdated"] is not None, table_name
+    assert tables[DB.player_index_table_name]["rows"] == 9
+    assert tables[DB.players_table_name]["lastUpdated"] is None
+
+
+@pytest.fixture
+def refreshed(repository):
+    now = datetime.now(timezone.utc)
+    repository.set_player_refreshed(1, now - timedelta(hours=1), True)
+    repository.set_player_refreshed(2, now - timedelta(hours=48), True)
+    repository.set_player_refreshed(3, now - timedelta(days=400), False)
+    repository.set_player_refreshed(5, now - timedelta(hours=1), True)
+    repository.index_players(
+        {Keys.game_id: 2023020001, Keys.season: 20232024, Keys.game_date: "2023-10-10"},
+        [5]
+    )
+    return repository
+
+
+def test_stale_players_skip_fresh_and_retired_profiles(refreshed):
+    assert Builder.get_stale_players([5, 4, 3, 2, 1], refreshed) == [2, 4]
+
+
+def test_stale_players_follow_max_age(refreshed, monkeypatch):
+    monkeypatch.setattr(ExecutionContext(), "_player_max_age", 72, raising=False)
+    assert Builder.get_stale_players([1, 2, 3, 4, 5], refreshed) == [4]
+    monkeypatch.setattr(ExecutionContext(), "_player_max_age", 0, raising=False)
+    assert Builder.get_stale_players([1, 2, 3, 4, 5], refreshed) == [1, 2, 4, 5]
+
+
+def test_full_refresh_skips_only_players_refreshed_by_the_build(refreshed, monkeypatch):
+    monkeypatch.setattr(ExecutionContext(), "_refresh_all_players", True, raising=False)
+    assert Builder.get_stale_players([1, 2, 3, 4, 5], refreshed) == [1, 2, 3, 4, 5]
+
+    build_started = datetime.now(timezone.utc) - timedelta(hours=2)
+    assert Builder.get_stale_players([1, 2, 3, 4, 5], refreshed, build_started) == [2, 3, 4]
+
+
+def test_seen_players_are_refreshed(refreshed, monkeypatch):
+    monkeypatch.setattr(ExecutionContext(), "_refresh_seen_players", True, raising=False)
+    assert Builder.get_stale_players([1, 2, 3, 4, 5], refreshed) == [2, 4, 5]
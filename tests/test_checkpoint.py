@@ -0,0 +1,138 @@
+import copy
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from builder.builder import Builder
+from builder.checkpoint import BuildStage, Checkpoint
+from builder.game_plan import GamePlan
+from shared.constants.json import JSON as Keys
+from shared.execution_context import ExecutionContext
+from shared.player_stats_cache import PlayerStatsCache
+from shared.repository import Repository
+
+Season = 20232024
+
+
+def test_checkpoint_round_trip(repository):
+    started = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    Checkpoint(
+        [str(Season)], True, started, BuildStage.Players, [Season], [20222023], [Season]
+    ).save(repository)
+
+    checkpoint = Checkpoint.load(repository)
+
+    assert checkpoint.seasons == [Season]
+    assert checkpoint.incremental
+    assert checkpoint.started == started
+    assert checkpoint.stage == BuildStage.Players
+    assert (checkpoint.full_seasons, checkpoint.failed_seasons, checkpoint.watermark_seasons) == (
+        {Season}, {20222023}, {Season}
+    )
+
+
+def test_checkpoint_clear_removes_the_plan(repository):
+    Checkpoint([Season]).save(repository)
+    repository.save_plan([{Keys.id: 2023020001, Keys.season: Season}])
+
+    Checkpoint.clear(repository)
+
+    assert Checkpoint.load(repository) is None
+    assert repository.get_plan() == []
+
+
+"""
+An interrupted build in the working directory: two planned games, the first
+of them stored before the interruption.  Box scores and player profiles are
+served by stand-ins that record what was asked for.
+"""
+@pytest.fixture
+def interrupted(box_score, client, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Schedules must not be fetched again when resuming.
+    client(object())
+    monkeypatch.setattr(ExecutionContext(), "_player_stats_cache", PlayerStatsCache(), raising=False)
+
+    second_score = copy.deepcopy(box_score)
+    second_score[Keys.id] = 2023020002
+    box_scores = {2023020001: box_score, 2023020002: second_score}
+    calls = {"games": [], "players": []}
+
+    def fetch_box_score(game_id):
+        calls["games"].append(game_id)
+        return box_scores[game_id]
+
+    def fetch_player(player_id):
+        calls["players"].append(player_id)
+        return {Keys.is_Active: True, Keys.current_team_id: 1}
+
+    monkeypatch.setattr(Builder, "fetch_box_score", staticmethod(fetch_box_score))
+    monkeypatch.setattr(Builder, "fetch_player", staticmethod(fetch_player))
+
+    repository = Repository()
+    plan = GamePlan()
+    for game_id in box_scores:
+        plan.add_game(
+            {Keys.id: game_id, Keys.season: Season, Keys.game_type: 2, Keys.game_state: "OFF"},
+            repository
+        )
+    plan.save(repository)
+    Builder.process_games([plan.games[2023020001]], repository, report=False)
+    calls["games"].clear()
+    repository.close()
+    return calls
+
+
+def resume(stage, started=None):
+    repository = Repository()
+    try:
+        Checkpoint([Season], started=started, stage=stage, full_seasons=[Season]).save(repository)
+        repository.commit()
+    finally:
+        repository.close()
+
+    Builder.resume(None)
+
+    repository = Repository()
+    try:
+        assert Checkpoint.load(repository) is None
+        assert repository.get_plan() == []
+        return repository.has_game(2023020002)
+    finally:
+        repository.close()
+
+
+def test_resume_fetches_only_games_not_yet_stored(interrupted):
+    assert resume(BuildStage.Games)
+    assert interrupted["games"] == [2023020002]
+    assert len(interrupted["players"]) == 9
+
+
+def test_resume_in_players_stage_skips_profiles_refreshed_by_the_build(interrupted, monkeypatch):
+    monkeypatch.setattr(ExecutionContext(), "_player_max_age", 0, raising=False)
+    started = datetime.now(timezone.utc) - timedelta(minutes=5)
+    repository = Repository()
+    try:
+        repository.set_player_refreshed(8470001, datetime.now(timezone.utc), True)
+        repository.set_player_refreshed(8470002, started - timedelta(minutes=1), True)
+        repository.commit()
+    finally:
+        repository.close()
+
+    assert not resume(BuildStage.Players, started)
+    assert interrupted["games"] == []
+    assert 8470001 not in interrupted["players"]
+    assert 8470002 in interrupted["players"]
+    assert len(interrupted["players"]) == 8
+
+
+def test_resume_without_checkpoint_does_nothing(interrupted):
+    Builder.resume(None)
+
+    repository = Repository()
+    try:
+        assert not repository.has_game(2023020002)
+        assert len(repository.get_plan()) == 2
+    finally:
+        repository.close()
+    assert interrupted == {"games": [], "players": []}
@@ -0,0 +1,113 @@
+import copy
+
+import pytest
+
+from builder.builder import Builder
+from builder.exporter import DataFileName, Exporter, SeasonTables
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+from shared.repository import Repository
+
+
+def add_game(box_score, game_id, season):
+    box_score = copy.deepcopy(box_score)
+    box_score[Keys.id] = game_id
+    box_score[Keys.season] = season
+    repository = Repository()
+    try:
+        Builder.process_games(
+            [{Keys.id: game_id, Keys.season: season}],
+            repository,
+            report=False,
+            fetch=lambda _: box_score
+        )
+    finally:
+        repository.close()
+
+
+"""
+A data set in the working directory with a game in each of two seasons, and
+the partitions each export wrote.
+"""
+@pytest.fixture
+def written(box_score, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    add_game(box_score, 2022020001, 20222023)
+    add_game(box_score, 2023020001, 20232024)
+
+    written = []
+    write_partition = Exporter.write_partition
+
+    def record(repository, directory, table_name, season):
+        written.append(directory.relative_to(tmp_path / "export").as_posix())
+        return write_partition(repository, directory, table_name, season)
+
+    monkeypatch.setattr(Exporter, "write_partition", staticmethod(record))
+    return written
+
+
+def partitions(*seasons):
+    return sorted(
+        f"{table_name}/season={season}" for season in seasons for table_name in SeasonTables
+    )
+
+
+def test_export_writes_every_partition(written, tmp_path):
+    Exporter.export(tmp_path / "export")
+
+    assert sorted(written) == sorted(partitions(20222023, 20232024) + [DB.players_table_name])
+    games = Exporter.read(DB.games_table_name, export_dir=tmp_path / "export")
+    assert sorted(games[Keys.season]) == [20222023, 20232024]
+    skaters = Exporter.read(
+        DB.skater_stats_table_name, [Keys.player_id], [20232024], tmp_path / "export"
+    )
+    assert len(skaters) == 6
+
+
+def test_export_rewrites_only_changed_seasons(written, box_score, tmp_path):
+    Exporter.export(tmp_path / "export")
+    written.clear()
+
+    Exporter.export(tmp_path / "export")
+    assert written == []
+
+    add_game(box_score, 2023020002, 20232024)
+    Exporter.export(tmp_path / "export")
+    assert sorted(written) == partitions(20232024)
+
+    written.clear()
+    Exporter.export(tmp_path / "export", full=True)
+    assert len(written) == 7
+
+
+def test_export_rewrites_missing_files(written, tmp_path):
+    Exporter.export(tmp_path / "export")
+    written.clear()
+    (tmp_path / "export" / DB.games_table_name / "season=20222023" / DataFileName).unlink()
+
+    Exporter.export(tmp_path / "export")
+
+    assert written == [f"{DB.games_table_name}/season=20222023"]
+
+
+def test_export_removes_seasons_no_longer_stored(written, tmp_path):
+    Exporter.export(tmp_path / "export")
+    repository = Repository()
+    try:
+        repository.begin()
+        repository.execute(
+            f'DELETE FROM "{DB.games_table_name}" WHERE "{Keys.season}" = ?', (20222023,)
+        )
+        repository.commit()
+    finally:
+        repository.close()
+    written.clear()
+
+    Exporter.export(tmp_path / "export")
+
+    assert written == []
+    for partition in partitions(20222023):
+        assert not (tmp_path / "export" / partition).exists()
+    assert sorted(Exporter.read_manifest(tmp_path / "export")["partitions"]) == sorted(
+        partitions(20232024) + [DB.players_table_name]
+    )
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from trainer.feature_cache import FeatureCache
+
+
+class StubSummarizer:
+
+    def __init__(self, version="1"):
+        self.name = "stub"
+        self.version = version
+
+    def get_headers(self):
+        return ["goals", "shots", "homeWin"]
+
+
+def write_csv(path, rows):
+    path.write_text(
+        "goals,shots,homeWin\n" + "".join(f"{a},{b},{c}\n" for a, b, c in rows),
+        encoding="utf-8"
+    )
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    parses = []
+    read_csv = FeatureCache.read_csv
+
+    def record(data_files, headers):
+        parses.append(data_files)
+        return read_csv(data_files, headers)
+
+    monkeypatch.setattr(FeatureCache, "read_csv", staticmethod(record))
+    return parses
+
+
+def test_second_load_is_served_from_cache(tmp_path, parses):
+    data_file = write_csv(tmp_path / "data.csv", [(1, 20, 1), (3, 31, 0)])
+    cache = FeatureCache(tmp_path / "cache", StubSummarizer())
+
+    cache.load([data_file])
+    features, targets = cache.load([data_file])
+
+    assert len(parses) == 1
+    assert list(features.columns) == ["goals", "shots"]
+    assert features.to_numpy().tolist() == [[1.0, 20.0], [3.0, 31.0]]
+    assert targets.tolist() == [1.0, 0.0]
+    assert isinstance(targets, np.memmap)
+    assert not targets.flags.writeable
+
+
+def test_changed_data_file_is_parsed_again(tmp_path, parses):
+    data_file = write_csv(tmp_path / "data.csv", [(1, 20, 1)])
+    cache = FeatureCache(tmp_path / "cache", StubSummarizer())
+    cache.load([data_file])
+
+    write_csv(data_file, [(1, 20, 1), (2, 25, 0)])
+    _, targets = cache.load([data_file])
+
+    assert len(parses) == 2
+    assert targets.tolist() == [1.0, 0.0]
+
+
+def test_new_summarizer_version_rebuilds_entry(tmp_path, parses):
+    data_file = write_csv(tmp_path / "data.csv", [(1, 20, 1)])
+    FeatureCache(tmp_path / "cache", StubSummarizer("1")).load([data_file])
+    FeatureCache(tmp_path / "cache", StubSummarizer("2")).load([data_file])
+    FeatureCache(tmp_path / "cache", StubSummarizer("2")).load([data_file])
+
+    assert len(parses) == 2
+
+
+def test_each_set_of_files_has_its_own_entry(tmp_path, parses):
+    first = write_csv(tmp_path / "first.csv", [(1, 20, 1)])
+    second = write_csv(tmp_path / "second.csv", [(2, 25, 0)])
+    cache = FeatureCache(tmp_path / "cache", StubSummarizer())
+
+    cache.load([first])
+    _, targets = cache.load([first, second])
+    cache.load([first])
+
+    assert len(parses) == 2
+    assert targets.tolist() == [1.0, 0.0]
+
+
+def test_files_not_matching_the_headers_are_rejected(tmp_path, parses):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("goals,homeWin\n1,1\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        FeatureCache(tmp_path / "cache", StubSummarizer()).load([data_file])
+    assert not (tmp_path / "cache").exists()
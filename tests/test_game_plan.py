@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+from builder.builder import Builder
+from builder.game_plan import GamePlan
+from shared.constants.json import JSON as Keys
+
+# Ended on Aug 1 2023, see GamePlan.get_season_end.
+EndedSeason = 20222023
+
+
+class StubSchedule:
+
+    def __init__(self, fail=False, games=()):
+        self.fail = fail
+        self.games = list(games)
+        self.weekly_calls = 0
+        self.team_calls = 0
+
+    def weekly_schedule(self, date):
+        self.weekly_calls += 1
+        if self.fail:
+            raise ConnectionError("Schedule unavailable.")
+        return {Keys.game_week: []}
+
+    def team_season_schedule(self, team, season):
+        self.team_calls += 1
+        return {Keys.games: self.games}
+
+
+def add_stored_game(repository):
+    repository.add_game(
+        {
+            Keys.game_id: 2022021300,
+            Keys.season: EndedSeason,
+            Keys.game_type: 2,
+            Keys.game_state: "OFF",
+            Keys.game_date: "2023-04-10",
+            Keys.home_team_id: 1,
+            Keys.away_team_id: 2
+        },
+        [{Keys.game_id: 2022021300, Keys.player_id: 8470000, Keys.team_id: 1}],
+        []
+    )
+    repository.commit()
+
+
+def build_incrementally(repository):
+    plan = GamePlan.create([EndedSeason], repository, incremental=True)
+    Builder.record_progress(plan, [], repository)
+    repository.commit()
+    return plan
+
+
+def test_incremental_build_completes_ended_season(repository, client):
+    add_stored_game(repository)
+    schedule = client(SimpleNamespace(schedule=StubSchedule())).schedule
+
+    first = build_incrementally(repository)
+    assert first.weekly_schedule_calls > 0
+    assert EndedSeason in repository.get_complete_seasons()
+
+    schedule.weekly_calls = 0
+    second = build_incrementally(repository)
+    assert second.schedule_calls == 0
+    assert second.complete_seasons_skipped == 1
+    assert schedule.weekly_calls == 0
+    assert schedule.team_calls == 0
+
+
+def test_failed_weekly_schedule_leaves_season_incomplete(repository, client):
+    add_stored_game(repository)
+    client(SimpleNamespace(schedule=StubSchedule(fail=True)))
+
+    plan = build_incrementally(repository)
+    assert EndedSeason in plan.failed_seasons
+    assert EndedSeason not in plan.watermark_seasons
+    assert EndedSeason not in repository.get_complete_seasons()
+
+
+def test_games_on_both_schedules_are_counted_once(repository, client):
+    add_stored_game(repository)
+    games = [
+        # Already processed.
+        {Keys.id: 2022021300, Keys.game_type: 2, Keys.game_state: "OFF"},
+        {Keys.id: 2022010001, Keys.game_type: 1, Keys.game_state: "OFF"},
+        {Keys.id: 2022021301, Keys.game_type: 2, Keys.game_state: "FUT"},
+        {Keys.id: 2022021302, Keys.game_type: 2, Keys.game_state: "OFF"}
+    ]
+    schedule = client(SimpleNamespace(schedule=StubSchedule(games=games))).schedule
+
+    plan = GamePlan.create([EndedSeason], repository)
+
+    assert list(plan.games) == [2022021302]
+    assert plan.processed_games == 1
+    assert plan.unsupported_type_games == 1
+    assert plan.unsupported_state_games == 1
+    assert plan.duplicate_games == (schedule.team_calls - 1) * len(games)
+    assert plan.skipped_games == schedule.team_calls * len(games) - 1
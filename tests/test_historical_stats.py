@@ -0,0 +1,107 @@
+import copy
+
+import numpy as np
+import pytest
+
+from builder.builder import Builder
+from model.historical_stats import HistoricalStats
+from model.summary_engine import GoalieColumns, Pair, SkaterColumns, SkaterWidth
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+
+Goals = [key for key, _ in SkaterColumns].index(Keys.goals)
+# Pairs fill two columns of a goalie's averages.
+Saves = [key for key, kind in GoalieColumns for _ in range(2 if kind == Pair else 1)].index(Keys.saves)
+
+
+"""
+Three games of the fixture's rosters: one last season and two this season,
+with a different number of goals by player 8470001 in each.  The player
+stats the repository reads are recorded.
+"""
+@pytest.fixture
+def reads(repository, box_score, monkeypatch):
+    games = [
+        (2022020001, 20222023, "2023-01-10", 4),
+        (2023020001, 20232024, "2023-10-10", 2),
+        (2023020002, 20232024, "2023-10-12", 0)
+    ]
+    box_scores = {}
+    for game_id, season, game_date, goals in games:
+        box_scores[game_id] = copy.deepcopy(box_score)
+        box_scores[game_id].update({Keys.id: game_id, Keys.season: season, Keys.game_date: game_date})
+        forwards = box_scores[game_id][Keys.player_by_game_stats][Keys.home_team][Keys.forwards]
+        forwards[0][Keys.goals] = goals
+    Builder.process_games(
+        [{Keys.id: game_id} for game_id in box_scores],
+        repository,
+        report=False,
+        fetch=box_scores.get
+    )
+
+    reads = []
+    get_player_stats = repository.get_player_stats
+
+    def record(table_name, player_ids, before_date, season_only=False):
+        reads.append((table_name, list(player_ids)))
+        return get_player_stats(table_name, player_ids, before_date, season_only)
+
+    monkeypatch.setattr(repository, "get_player_stats", record)
+    return reads
+
+
+def get_goals(stats, as_of_date, season_only=False):
+    return stats.get_averages(
+        DB.skater_stats_table_name, [8470001], as_of_date, season_only
+    )[0, Goals]
+
+
+def test_averages_cover_games_before_the_date(repository, reads):
+    stats = HistoricalStats(repository)
+
+    assert get_goals(stats, "2023-10-11") == 3.0
+    assert get_goals(stats, "2023-10-13") == 2.0
+    assert get_goals(stats, "2023-10-10") == 4.0
+    assert get_goals(stats, "2023-01-10") == 0.0
+
+
+def test_season_only_averages_cover_the_current_season(repository, reads):
+    stats = HistoricalStats(repository)
+
+    assert get_goals(stats, "2023-10-13", season_only=True) == 1.0
+    assert get_goals(stats, "2023-10-11", season_only=True) == 2.0
+    # The season has started but the player hasn't played in it yet.
+    assert get_goals(stats, "2023-10-10", season_only=True) == 0.0
+
+
+def test_averages_follow_the_order_of_the_players(repository, reads):
+    stats = HistoricalStats(repository)
+
+    skaters = stats.get_averages(
+        DB.skater_stats_table_name, [9999999, 8470001, 8470001], "2023-10-13", False
+    )
+    goalies = stats.get_averages(DB.goalie_stats_table_name, [8470004], "2023-10-13", False)
+
+    assert skaters.shape == (3, SkaterWidth)
+    assert not skaters[0].any()
+    assert np.array_equal(skaters[1], skaters[2])
+    assert skaters[1, Goals] == 2.0
+    assert goalies[0, Saves] == 29.0
+
+
+def test_averages_are_read_once_per_player_and_date(repository, reads):
+    stats = HistoricalStats(repository)
+    table_name = DB.skater_stats_table_name
+
+    stats.get_averages(table_name, [8470001, 8470002], "2023-10-13", False)
+    stats.get_averages(table_name, [8470002, 8470001], "2023-10-13", False)
+    stats.get_averages(table_name, [8470001, 8470003, 8470003], "2023-10-13", False)
+    stats.get_averages(table_name, [8470001], "2023-10-13", True)
+    stats.get_averages(table_name, [8470001], "2023-10-11", False)
+
+    assert reads == [
+        (table_name, [8470001, 8470002]),
+        (table_name, [8470003]),
+        (table_name, [8470001]),
+        (table_name, [8470001])
+    ]
@@ -0,0 +1,142 @@
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from nhlpy.http_client import ServerErrorException
+
+from shared import http_cache
+from shared.constants.json import JSON as Keys
+from shared.http_cache import CachingHttpClient, ResponseCache
+
+Endpoint = SimpleNamespace(value="https://api-web.nhle.com/v1/")
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache.sqlite"))
+
+
+class StubHttpClient:
+
+    def __init__(self, *responses):
+        self._config = object()
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, endpoint, resource, query_params=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def json_response(payload):
+    return httpx.Response(200, content=json.dumps(payload).encode("utf-8"))
+
+
+@pytest.mark.parametrize("game_state, ttl", [
+    ("FUT", 60 * 60),
+    ("PRE", 5 * 60),
+    ("LIVE", 30),
+    ("CRIT", 30),
+    ("FINAL", 60 * 60),
+    ("OFF", None)
+])
+def test_box_score_ttl_follows_game_state(game_state, ttl):
+    assert ResponseCache.get_ttl({Keys.game_state: game_state}) == ttl
+
+
+def test_schedule_ttl_follows_its_least_final_game():
+    def schedule(*states):
+        return {Keys.games: [{Keys.game_state: state} for state in states]}
+
+    assert ResponseCache.get_ttl(schedule("OFF", "OFF")) is None
+    assert ResponseCache.get_ttl(schedule("OFF", "FUT", "LIVE")) == 30
+    assert ResponseCache.get_ttl({Keys.game_week: [
+        {Keys.games: [{Keys.game_state: "OFF"}]},
+        {Keys.games: [{Keys.game_state: "FUT"}]}
+    ]}) == 60 * 60
+    assert ResponseCache.get_ttl({Keys.is_Active: True}) == http_cache.ActivePlayerTTL
+    assert ResponseCache.get_ttl({Keys.is_Active: False}) is None
+    assert ResponseCache.get_ttl({}) == http_cache.DefaultTTL
+
+
+def test_entries_expire_after_their_ttl(cache, clock):
+    cache.put("live", b"{}", 30)
+    cache.put("official", b"{}", None)
+
+    clock.now += 29
+    assert cache.get("live") == b"{}"
+    clock.now += 1
+    assert cache.get("live") is None
+    clock.now += 365 * 24 * 60 * 60
+    assert cache.get("official") == b"{}"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    assert cache.prune() == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=30)
+    for url in ["a", "b", "c"]:
+        cache.put(url, b"x" * 10, None)
+        clock.now += 1
+    assert cache.get("a") is not None
+    clock.now += 1
+
+    cache.put("d", b"x" * 10, None)
+
+    assert [cache.get(url) is not None for url in ["a", "b", "c", "d"]] == [
+        True, False, True, True
+    ]
+    assert cache.evictions == 1
+    assert cache.stats()["bytes"] == 30
+
+
+def test_client_answers_repeats_from_cache(cache, clock):
+    payload = {Keys.id: 2023020001, Keys.game_state: "OFF"}
+    inner = StubHttpClient(json_response(payload))
+    client = CachingHttpClient(inner, cache)
+
+    first = client.get(Endpoint, "gamecenter/2023020001/boxscore")
+    second = client.get(Endpoint, "gamecenter/2023020001/boxscore")
+
+    assert inner.calls == 1
+    assert first.json() == second.json() == payload
+
+
+def test_client_does_not_cache_errors(cache, clock):
+    inner = StubHttpClient(
+        ServerErrorException("Unavailable.", 503),
+        httpx.Response(200, content=b"<html>Maintenance</html>"),
+        json_response({Keys.game_state: "OFF"})
+    )
+    client = CachingHttpClient(inner, cache)
+
+    with pytest.raises(ServerErrorException):
+        client.get(Endpoint, "schedule/now")
+    assert client.get(Endpoint, "schedule/now").content == b"<html>Maintenance</html>"
+    assert client.get(Endpoint, "schedule/now").json() == {Keys.game_state: "OFF"}
+
+    assert inner.calls == 3
+    assert cache.stats()["entries"] == 1
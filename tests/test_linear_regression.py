@@ -0,0 +1,25 @@
+import pickle
+from types import SimpleNamespace
+
+from predictor.linear_regression import PredictLinearRegression
+from shared.execution_context import ExecutionContext
+from shared.profiler import Profiler
+
+
+class StubSchedule:
+
+    def daily_schedule(self, date):
+        return {"games": [{"id": 2023020001}, {"id": 2023020002}], "numberOfGames": 2}
+
+
+def test_schedule_fetch_is_profiled_with_its_games(client, tmp_path, monkeypatch):
+    profiler = Profiler()
+    monkeypatch.setattr(ExecutionContext(), "_profiler", profiler, raising=False)
+    client(SimpleNamespace(schedule=StubSchedule()))
+    model_file_name = tmp_path / "model.pkl"
+    model_file_name.write_bytes(pickle.dumps({}))
+
+    PredictLinearRegression.predict(None, model_file_name, "2023-10-10", None, None, False)
+
+    assert profiler.stages["schedule fetch"]["calls"] == 1
+    assert profiler.stages["schedule fetch"]["items"] == 2
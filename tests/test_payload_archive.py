@@ -0,0 +1,70 @@
+import copy
+
+from shared import payload_archive
+from shared.constants.json import JSON as Keys
+from shared.payload_archive import BoxScoreKind, PayloadArchive, PlayerKind
+
+
+def create_box_scores(box_score, count, first_id=2023020001):
+    box_scores = []
+    for game_id in range(first_id, first_id + count):
+        box_score = copy.deepcopy(box_score)
+        box_score[Keys.id] = game_id
+        box_score[Keys.home_team][Keys.score] = game_id % 7
+        box_scores.append(box_score)
+    return box_scores
+
+
+def test_payloads_round_trip(archive, box_score):
+    player = {Keys.player_id: 8470001, Keys.is_Active: True}
+    archive.put_box_score(box_score)
+    archive.put_player(8470001, player)
+
+    assert archive.get_box_score(2023020001) == box_score
+    payload, archived = archive.get_player_entry(8470001)
+    assert payload == player
+    assert archived is not None
+    assert archive.get_box_score(2023020002) is None
+    assert archive.get_player(2023020001) is None
+    assert [entry[:2] for entry in archive.get_entries(BoxScoreKind)] == [(2023020001, 20232024)]
+
+
+def test_fetching_again_replaces_payload(archive, box_score):
+    archive.put_box_score(box_score)
+    box_score = copy.deepcopy(box_score)
+    box_score[Keys.home_team][Keys.score] = 4
+
+    archive.put_box_score(box_score)
+
+    assert archive.get_box_score(2023020001)[Keys.home_team][Keys.score] == 4
+    assert archive.stats()[BoxScoreKind]["entries"] == 1
+
+
+def test_dictionary_is_trained_once_enough_payloads_are_stored(archive, box_score, monkeypatch):
+    monkeypatch.setattr(payload_archive, "TrainingSamples", 50)
+    monkeypatch.setattr(payload_archive, "DictionaryBytes", 4 * 1024)
+    box_scores = create_box_scores(box_score, 50)
+    for box_score in box_scores[:-1]:
+        archive.put_box_score(box_score)
+    assert archive.stats()[BoxScoreKind]["dictionaries"] == 0
+    stored_bytes = archive.stats()[BoxScoreKind]["storedBytes"]
+
+    archive.put_box_score(box_scores[-1])
+    late_score = create_box_scores(box_score, 1, 2023020100)[0]
+    archive.put_box_score(late_score)
+    archive.put_player(8470001, {Keys.player_id: 8470001})
+
+    stats = archive.stats()
+    assert stats[BoxScoreKind]["dictionaries"] == 1
+    assert stats[BoxScoreKind]["dictionaryEntries"] == 51
+    assert stats[BoxScoreKind]["storedBytes"] < stored_bytes
+    assert stats[PlayerKind]["dictionaryEntries"] == 0
+
+    # A new archive reads the dictionary back from the file.
+    reopened = PayloadArchive(archive.db_name)
+    try:
+        for box_score in box_scores + [late_score]:
+            assert reopened.get_box_score(box_score[Keys.id]) == box_score
+        assert reopened.get_player(8470001) == {Keys.player_id: 8470001}
+    finally:
+        reopened.close()
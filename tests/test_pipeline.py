@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from builder.pipeline import Pipeline, Stage
+
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
+
+
+def create_pipeline(sink, fail_on=None, queue_size=2):
+    def parse(item):
+        if item == fail_on:
+            raise ValueError(f"Cannot parse {item}.")
+        return item * 10
+
+    return Pipeline(
+        [Stage("fetch", lambda item: item, workers=4), Stage("parse", parse, workers=2)],
+        Stage("write", sink),
+        queue_size=queue_size
+    )
+
+
+def test_run_passes_every_item_through():
+    written = []
+    pipeline = create_pipeline(written.append)
+
+    pipeline.run(range(50))
+
+    assert sorted(written) == [item * 10 for item in range(50)]
+    assert [stats["items"] for stats in pipeline.get_stats()] == [50, 50, 50]
+    assert pipeline_threads() == []
+
+
+def test_empty_input_finishes_every_stage():
+    written = []
+    pipeline = create_pipeline(written.append)
+
+    pipeline.run([])
+
+    assert written == []
+    assert pipeline_threads() == []
+    for stage in pipeline.stages + [pipeline.sink]:
+        assert stage.items == 0
+        assert stage.finished is not None
+    # End of stream markers are not items waiting in the queues.
+    for stats in pipeline.get_stats():
+        assert (stats["queueAverage"], stats["queueMax"]) == (0.0, 0)
+
+
+def test_worker_error_reaches_caller():
+    written = []
+    # Far more items than the queues hold, so stages are blocked on full
+    # queues when the error is raised.
+    pipeline = create_pipeline(written.append, fail_on=7)
+
+    with pytest.raises(ValueError, match="Cannot parse 7."):
+        pipeline.run(range(1000))
+
+    assert 70 not in written
+    assert len(written) < 1000
+    assert pipeline_threads() == []
+
+
+def test_sink_error_reaches_caller():
+    def sink(item):
+        raise RuntimeError("Database is locked.")
+
+    pipeline = create_pipeline(sink)
+
+    with pytest.raises(RuntimeError, match="Database is locked."):
+        pipeline.run(range(1000))
+
+    assert pipeline.sink.items == 0
+    assert pipeline_threads() == []
+
+
+def test_source_error_reaches_caller():
+    def source():
+        yield 1
+        raise OSError("Schedule unavailable.")
+
+    pipeline = create_pipeline(lambda item: None)
+
+    with pytest.raises(OSError, match="Schedule unavailable."):
+        pipeline.run(source())
+
+    assert pipeline_threads() == []
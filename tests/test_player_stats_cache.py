@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from shared.constants.json import JSON as Keys
+from shared.player_stats_cache import PlayerStatsCache
+
+Active = {Keys.is_Active: True}
+Retired = {Keys.is_Active: False}
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock.time)
+    return clock
+
+
+def counters(cache):
+    stats = cache.stats()
+    return {key: stats[key] for key in ["hits", "diskHits", "misses", "expirations", "evictions"]}
+
+
+def test_least_recently_used_player_is_evicted(clock):
+    cache = PlayerStatsCache(max_entries=2)
+    cache.put(1, Active)
+    cache.put(2, Active)
+    assert cache.get(1) == Active
+
+    cache.put(3, Active)
+
+    assert cache.get(2) is None
+    assert [cache.get(player_id) for player_id in [1, 3]] == [Active, Active]
+    assert cache.stats()["entries"] == 2
+    assert counters(cache) == {
+        "hits": 3, "diskHits": 0, "misses": 1, "expirations": 0, "evictions": 1
+    }
+
+
+def test_only_active_players_expire(clock):
+    cache = PlayerStatsCache(max_age=60)
+    cache.put(1, Active)
+    cache.put(2, Retired)
+
+    clock.now += 59
+    assert cache.get(1) == Active
+    clock.now += 1
+    assert cache.get(1) is None
+    clock.now += 10 * 365 * 24 * 60 * 60
+    assert cache.get(2) == Retired
+
+    assert cache.get_fetched(1) is None
+    assert counters(cache) == {
+        "hits": 2, "diskHits": 0, "misses": 1, "expirations": 1, "evictions": 0
+    }
+
+
+def test_archive_backs_the_cache(archive, clock):
+    PlayerStatsCache(archive=archive).put(1, Active)
+    PlayerStatsCache(archive=archive).put(2, Active, archive=False)
+
+    cache = PlayerStatsCache(max_age=60, archive=archive)
+    assert cache.get(1) == Active
+    assert cache.get(1) == Active
+    assert cache.get(2) is None
+    # Entries read from the archive keep the time they were archived.
+    assert abs(cache.get_fetched(1) - clock.now) < 5
+
+    clock.now += 61
+    assert PlayerStatsCache(max_age=60, archive=archive).get(1) is None
+    assert counters(cache) == {
+        "hits": 1, "diskHits": 1, "misses": 1, "expirations": 0, "evictions": 0
+    }
@@ -0,0 +1,131 @@
+import time
+
+import httpx
+import pytest
+from nhlpy.http_client import (RateLimitExceededException,
+                               ResourceNotFoundException, ServerErrorException)
+
+from shared import rate_limiter
+from shared.rate_limiter import RateLimitedHttpClient, RateLimiter
+
+
+class StubHttpClient:
+
+    def __init__(self, *outcomes):
+        self._config = object()
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, endpoint, resource, query_params=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock.monotonic)
+    return clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    return sleeps
+
+
+def send(limiter, outcome):
+    limiter.acquire()
+    limiter.release(outcome)
+
+
+def test_success_raises_limit_by_reciprocal_up_to_max(clock):
+    limiter = RateLimiter(max_concurrency=8)
+    limiter.limit = 4.0
+
+    send(limiter, "success")
+    assert limiter.limit == pytest.approx(4.25)
+
+    for _ in range(100):
+        send(limiter, "success")
+    assert limiter.limit == 8.0
+    assert limiter.successes == 101
+
+
+@pytest.mark.parametrize("outcome", ["throttled", "server_error"])
+def test_failure_halves_limit_once_per_cooldown(clock, outcome):
+    limiter = RateLimiter(max_concurrency=8)
+
+    send(limiter, outcome)
+    assert limiter.limit == 4.0
+
+    clock.now += rate_limiter.DecreaseCooldown / 2
+    send(limiter, outcome)
+    assert limiter.limit == 4.0
+
+    clock.now += rate_limiter.DecreaseCooldown
+    send(limiter, outcome)
+    assert limiter.limit == 2.0
+
+    for _ in range(5):
+        clock.now += rate_limiter.DecreaseCooldown
+        send(limiter, outcome)
+    assert limiter.limit == 1.0
+
+
+def test_not_found_is_raised_without_retry(clock, sleeps):
+    inner = StubHttpClient(ResourceNotFoundException("Not found."))
+    limiter = RateLimiter()
+    client = RateLimitedHttpClient(inner, limiter)
+
+    with pytest.raises(ResourceNotFoundException):
+        client.get("api_web", "gamecenter/0/boxscore")
+
+    assert inner.calls == 1
+    assert sleeps == []
+    assert (limiter.retries, limiter.gave_up, limiter.in_flight) == (0, 0, 0)
+    assert limiter.limit == limiter.max_concurrency
+
+
+def test_retries_until_success(clock, sleeps):
+    inner = StubHttpClient(
+        RateLimitExceededException("Slow down."),
+        httpx.ConnectError("Connection reset."),
+        "response"
+    )
+    limiter = RateLimiter()
+    client = RateLimitedHttpClient(inner, limiter)
+
+    assert client.get("api_web", "schedule/now") == "response"
+    assert inner.calls == 3
+    assert len(sleeps) == 2
+    assert (limiter.retries, limiter.throttled, limiter.transport_errors) == (2, 1, 1)
+
+
+def test_gives_up_after_max_retries(clock, sleeps):
+    errors = [ServerErrorException(f"Error {attempt}.", 503) for attempt in range(4)]
+    inner = StubHttpClient(*errors)
+    limiter = RateLimiter(max_retries=3)
+    client = RateLimitedHttpClient(inner, limiter)
+
+    with pytest.raises(ServerErrorException) as raised:
+        client.get("api_web", "schedule/now")
+
+    assert raised.value is errors[-1]
+    assert inner.calls == 4
+    assert len(sleeps) == 3
+    assert all(0 <= sleep <= rate_limiter.BackoffMax for sleep in sleeps)
+    assert (limiter.retries, limiter.gave_up, limiter.in_flight) == (3, 1, 0)
@@ -0,0 +1,32 @@
+import copy
+
+from builder.builder import Builder
+from shared.constants.json import JSON as Keys
+from shared.repository import Repository
+
+
+def test_rebuild_retries_unreadable_box_scores(box_score, archive, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    corrupt_score = copy.deepcopy(box_score)
+    corrupt_score[Keys.id] = 2023020002
+    archive.put_box_score(box_score)
+    archive.put_box_score(corrupt_score)
+    archive._connection.execute(
+        "UPDATE payloads SET body = ? WHERE id = ?", (b"not zstd", 2023020002)
+    )
+
+    Builder.rebuild_from_archive()
+
+    repository = Repository()
+    try:
+        assert repository.has_game(2023020001)
+        assert not repository.has_game(2023020002)
+        assert repository.get_meta(Keys.retry_games) == [{
+            Keys.id: 2023020002,
+            Keys.season: 20232024,
+            Keys.game_type: 2,
+            Keys.game_state: "OFF"
+        }]
+        assert repository.get_ingest_history()[-1]["gamesFailed"] == 1
+    finally:
+        repository.close()
@@ -0,0 +1,168 @@
+from shared.constants.database import Database as DB
+from shared.constants.json import JSON as Keys
+from shared.repository import CountedTables, Repository
+
+Season = 20232024
+
+
+def create_game(game_id, game_date, home_team_id, away_team_id, player_ids):
+    game_row = {
+        Keys.game_id: game_id,
+        Keys.season: Season,
+        Keys.game_type: 2,
+        Keys.game_state: "OFF",
+        Keys.game_date: game_date,
+        Keys.home_team_id: home_team_id,
+        Keys.away_team_id: away_team_id,
+        Keys.home_score: 3,
+        Keys.away_score: 2
+    }
+    skater_rows = [
+        {
+            Keys.game_id: game_id,
+            Keys.player_id: player_id,
+            Keys.team_id: home_team_id,
+            Keys.position: "C",
+            Keys.goals: game_id % 3,
+            Keys.toi: "15:30"
+        }
+        for player_id in player_ids
+    ]
+    goalie_rows = [{
+        Keys.game_id: game_id,
+        Keys.player_id: 8479999,
+        Keys.team_id: home_team_id,
+        Keys.save_shots_against: "28/30",
+        Keys.toi: "60:00"
+    }]
+    return game_row, skater_rows, goalie_rows
+
+
+Games = [
+    create_game(2023020001, "2023-10-10", 1, 2, [8470001, 8470002]),
+    create_game(2023020002, "2023-10-12", 2, 3, [8470002, 8470003]),
+    create_game(2023020003, "2023-10-11", 1, 3, [8470001, 8470003]),
+    create_game(2023020004, "2023-10-14", 3, 1, [8470004])
+]
+
+
+def assert_counters_match(repository):
+    tables, _ = repository.get_counters()
+    for table_name in CountedTables:
+        assert tables[table_name]["rows"] == repository.count(table_name), table_name
+
+
+def test_upsert_replaces_existing_rows(repository):
+    game_row, skater_rows, goalie_rows = Games[0]
+    repository.add_game(game_row, skater_rows, goalie_rows)
+    repository.add_game(
+        {**game_row, Keys.home_score: 4},
+        [{**row, Keys.goals: 5} for row in skater_rows],
+        goalie_rows
+    )
+    repository.commit()
+
+    assert repository.count(DB.games_table_name) == 1
+    assert repository.count(DB.skater_stats_table_name) == 2
+    assert repository.count(DB.goalie_stats_table_name) == 1
+    assert repository.count(DB.player_index_table_name) == 3
+    assert repository.get_games()[0][Keys.home_score] == 4
+    assert [row[0] for row in repository.execute(
+        f'SELECT "{Keys.goals}" FROM "{DB.skater_stats_table_name}"'
+    )] == [5, 5]
+
+
+def test_counters_follow_inserts_upserts_and_deletes(repository):
+    for game in Games:
+        repository.add_game(*game)
+    repository.upsert_player({Keys.player_id: 8470001, Keys.first_name: "First"})
+    repository.commit()
+    assert_counters_match(repository)
+
+    for game_row, skater_rows, goalie_rows in Games:
+        repository.add_game(game_row, skater_rows, goalie_rows)
+    repository.upsert_player({Keys.player_id: 8470001, Keys.last_name: "Last"})
+    repository.commit()
+    assert_counters_match(repository)
+
+    repository.delete_player(8470001)
+    repository.execute(
+        f'DELETE FROM "{DB.skater_stats_table_name}" WHERE "{Keys.game_id}" = ?',
+        (Games[0][0][Keys.game_id],)
+    )
+    repository.commit()
+    assert_counters_match(repository)
+    assert repository.count(DB.players_table_name) == 0
+
+
+def test_clear_keeps_ingest_history(repository):
+    for game in Games:
+        repository.add_game(*game)
+    repository.add_ingest_record({"gamesAdded": 4})
+    repository.add_ingest_record({"gamesAdded": 0})
+    repository.commit()
+
+    repository.clear()
+    repository.commit()
+
+    assert repository.get_ingest_history() == [{"gamesAdded": 4}, {"gamesAdded": 0}]
+    assert repository.count(DB.games_table_name) == 0
+    assert repository.get_watermarks(Season) == {}
+    assert_counters_match(repository)
+    repository.add_game(*Games[0])
+    repository.commit()
+    assert_counters_match(repository)
+
+
+def test_watermark_never_moves_backwards(repository):
+    repository.advance_watermark(Season, 1, "2023-10-12", 2023020010)
+    repository.advance_watermark(Season, 1, "2023-10-11", 2023020020)
+    repository.advance_watermark(Season, 1, "2023-10-12", 2023020005)
+    assert repository.get_watermarks(Season) == {1: ("2023-10-12", 2023020010)}
+
+    repository.advance_watermark(Season, 1, "2023-10-12", 2023020011)
+    assert repository.get_watermarks(Season) == {1: ("2023-10-12", 2023020011)}
+
+    # Games written out of date order.
+    for game in reversed(Games):
+        repository.add_game(*game)
+    repository.commit()
+    assert repository.get_watermarks(Season) == {
+        1: ("2023-10-14", 2023020004),
+        2: ("2023-10-12", 2023020002),
+        3: ("2023-10-14", 2023020004)
+    }
+
+
+def test_merge_matches_single_process_build(repository, tmp_path):
+    for game in Games:
+        repository.add_game(*game)
+    repository.commit()
+
+    merged = Repository(str(tmp_path / "merged.sqlite"))
+    # Shards split by game, with one game in both.
+    for name, games in [("shard0", Games[:3]), ("shard1", Games[2:])]:
+        shard = Repository(str(tmp_path / f"{name}.sqlite"))
+        for game in games:
+            shard.add_game(*game)
+        shard.commit()
+        shard.close()
+        merged.merge(str(tmp_path / f"{name}.sqlite"))
+    try:
+        for table_name in [
+            DB.games_table_name,
+            DB.skater_stats_table_name,
+            DB.goalie_stats_table_name,
+            DB.player_seasons_table_name
+        ]:
+            assert merged.get_rows(table_name) == repository.get_rows(table_name), table_name
+        # Every column but when the player was last seen.
+        assert (
+            [row[:5] for row in merged.get_rows(DB.player_index_table_name)]
+            == [row[:5] for row in repository.get_rows(DB.player_index_table_name)]
+        )
+        assert merged.get_watermarks(Season) == repository.get_watermarks(Season)
+        assert merged.get_counters()[0] == repository.get_counters()[0]
+        assert_counters_match(merged)
+    finally:
+        merged.close()
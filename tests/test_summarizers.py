@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from model import summarizers
+from model.average_player_summarizer import AveragePlayerSummarizer
+from model.summarizer import Summarizer, SummarizerRegistry
+from model.summarizers import Summarizers
+from shared.constants.json import JSON as Keys
+
+
+class ConstantSummarizer(Summarizer):
+    name = "constant"
+    version = "1"
+
+    def summarize_many(self, games):
+        return np.ones((len(games), 1))
+
+    def get_schema(self):
+        return [("constant", np.dtype(np.float64))]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(
+        SummarizerRegistry, "_summarizers", dict(SummarizerRegistry._summarizers)
+    )
+    return SummarizerRegistry
+
+
+def test_choices_are_registered_names():
+    assert [choice.value for choice in Summarizers] == SummarizerRegistry.get_names()
+    summarizer = Summarizers.get_summarizer(Summarizers("average"))
+    assert isinstance(summarizer, AveragePlayerSummarizer)
+
+
+def test_plugins_register_from_entry_points(registry, monkeypatch):
+    def load_broken():
+        raise ImportError("No module named 'broken'.")
+
+    plugins = [
+        SimpleNamespace(name="constant", load=lambda: ConstantSummarizer),
+        SimpleNamespace(name="broken", load=load_broken)
+    ]
+    monkeypatch.setattr(
+        summarizers, "entry_points",
+        lambda group: plugins if group == summarizers.PluginGroup else []
+    )
+
+    summarizers.register_plugins()
+
+    assert registry.get_names() == ["average", "constant"]
+    assert isinstance(registry.create("constant"), ConstantSummarizer)
+
+
+def test_summarize_batches_matches_summarize_many(box_score):
+    player_stats = box_score[Keys.player_by_game_stats]
+    games = [(player_stats[Keys.home_team], player_stats[Keys.away_team])] * 5
+    summarizer = AveragePlayerSummarizer()
+
+    summaries = summarizer.summarize_batches(games, batch_size=2)
+
+    assert summaries.shape == (5, len(summarizer.get_schema()))
+    np.testing.assert_array_equal(summaries, summarizer.summarize_many(games))
+
+
+def test_summarize_batches_checks_schema():
+    class WrongSummarizer(ConstantSummarizer):
+        def summarize_many(self, games):
+            return np.ones((len(games), 2))
+
+    with pytest.raises(Exception, match="returned"):
+        WrongSummarizer().summarize_batches([None])
@@ -0,0 +1,81 @@
+import inspect
+
+import numpy as np
+
+from builder.box_score_decoder import BoxScoreDecoder
+from model.average_player_summarizer import AveragePlayerSummarizer
+from model.player_info import GoalieInfo, SkaterInfo
+from model.summary_engine import FloatColumns, SummaryEngine
+from shared.constants.json import JSON as Keys
+
+
+def summarize_players(info_class, players):
+    names = list(inspect.signature(info_class.__init__).parameters)[1:]
+    infos = [info_class.from_json(player) for player in players]
+    return info_class(*[sum(getattr(info, name) for info in infos) for name in names])
+
+
+"""
+A roster summarized the way AveragePlayerSummarizer did before SummaryEngine:
+a PlayerInfo per player, each stat summed from the int 0.
+"""
+def summarize_roster_per_player(roster):
+    return {
+        Keys.forwards: summarize_players(SkaterInfo, roster[Keys.forwards]),
+        Keys.defense: summarize_players(SkaterInfo, roster[Keys.defense]),
+        Keys.goalies: summarize_players(GoalieInfo, roster[Keys.goalies])
+    }
+
+
+def to_csv(summary):
+    return ",".join(repr(summary[group]) for group in [Keys.forwards, Keys.defense, Keys.goalies])
+
+
+def get_rosters(box_score):
+    player_stats = box_score[Keys.player_by_game_stats]
+    return player_stats[Keys.home_team], player_stats[Keys.away_team]
+
+
+def test_summarize_matches_per_player_summaries(box_score):
+    home, away = get_rosters(box_score)
+
+    summaries = AveragePlayerSummarizer().summarize(home, away)
+
+    for summary, roster in zip(summaries, [home, away]):
+        values = summary.split(",")
+        expected = to_csv(summarize_roster_per_player(roster)).split(",")
+        assert [float(value) for value in values] == [float(value) for value in expected]
+        # PlayerInfo wrote '0' for a fraction or time on ice missing from
+        # every player of a group, see AveragePlayerSummarizer.version.
+        assert ["." in value for value in values] == FloatColumns
+        assert all(
+            value == expected_value
+            for value, expected_value in zip(values, expected) if float(expected_value)
+        )
+
+
+def test_summarize_games_matches_per_player_summaries(box_score):
+    home, away = get_rosters(box_score)
+
+    summaries = SummaryEngine.summarize_games([(home, away), (away, home)])
+
+    home_values, away_values = [
+        [float(value) for value in to_csv(summarize_roster_per_player(roster)).split(",")]
+        for roster in [home, away]
+    ]
+    assert summaries.shape == (2, 2 * len(home_values))
+    np.testing.assert_array_equal(summaries[0], home_values + away_values)
+    np.testing.assert_array_equal(summaries[1], away_values + home_values)
+
+
+def test_summarize_db_matches_per_player_summaries(box_score, repository):
+    repository.add_game(*BoxScoreDecoder.decode(box_score))
+    repository.commit()
+    home, away = repository.get_rosters(box_score[Keys.id])
+
+    summaries = AveragePlayerSummarizer().summarize_db(home, away)
+
+    assert [to_csv(summary) for summary in summaries] == [
+        to_csv(summarize_roster_per_player(home)),
+        to_csv(summarize_roster_per_player(away))
+    ]